@@ -0,0 +1,26 @@
+# asgi.py
+"""
+ASGI entry point for the KrishiSevak app, for uvicorn/hypercorn.
+
+    pip install uvicorn a2wsgi
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The Flask app is wrapped with a2wsgi's WSGIMiddleware. The event loop only moves bytes:
+each request runs on a bounded pool of ASGI_THREADS worker threads (default 16), so a slow
+/predict never stalls the loop or the chat routes. Streaming responses (the SSE chat
+endpoint, NDJSON /predict/batch) are forwarded chunk by chunk.
+
+(asgiref's WsgiToAsgi is not used: it runs every WSGI call on one shared thread.)
+"""
+import os
+
+from wsgi import app as wsgi_app
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError as e:
+    raise ImportError("asgi.py needs a2wsgi: pip install a2wsgi (or serve wsgi:app with waitress/gunicorn)") from e
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", "16"))
+
+app = WSGIMiddleware(wsgi_app, workers=ASGI_THREADS)
@@ -0,0 +1,241 @@
+# batching.py
+import threading
+import queue
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# ---------------------------
+# Dynamic micro-batching queue
+# - Callers submit one item and block until their own result is ready
+# - A background worker groups pending items until either max_batch_size
+#   is reached or max_wait_ms has passed since the first item arrived
+# - The whole group goes through run_batch(items) -> results in one call
+# - workers > 1 forms and runs that many batches at once (one per inference slot)
+# ---------------------------
+
+
+def percentiles_ms(values):
+    # values are durations in seconds; returns rounded milliseconds
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+    n = len(ordered)
+
+    def pick(p):
+        return round(ordered[min(n - 1, int(p * n))] * 1000.0, 3)
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(ordered[-1] * 1000.0, 3)}
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the batcher queue is at max_queue and cannot accept work."""
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10, max_queue=64,
+                 name="batcher", latency_window=2048, workers=1):
+        """
+        Args:
+            run_batch (callable): takes a list of items, returns a list of results (same order)
+            max_batch_size (int): largest batch handed to run_batch
+            max_wait_ms (float): how long the first item in a batch may wait for company
+            max_queue (int): pending items allowed before submit() rejects new work
+            name (str): worker thread name (shows up in stats)
+            latency_window (int): number of recent requests used for latency percentiles
+            workers (int): worker threads forming and running batches in parallel (run_batch must be thread-safe)
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self.name = name
+        self.workers = max(1, int(workers))
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._threads = []
+        self._stopping = False
+
+        # counters
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._batch_sizes = {}
+        self._latencies = deque(maxlen=latency_window)
+        self._queue_waits = deque(maxlen=latency_window)
+        self._batch_times = deque(maxlen=latency_window)
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def start(self):
+        with self._lock:
+            if self._running():
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._worker, daemon=True,
+                                 name=self.name if self.workers == 1 else f"{self.name}-{i}")
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5.0):
+        with self._lock:
+            threads = self._threads
+            self._stopping = True
+        for thread in threads:
+            thread.join(timeout)
+
+    def _running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    # ---------------------------
+    # Client side
+    # ---------------------------
+    def submit_async(self, item):
+        # Returns a Future; raises QueueFullError instead of blocking when saturated
+        if not self._running():
+            self.start()
+        fut = Future()
+        try:
+            with self._submit_lock:
+                self._queue.put_nowait((item, fut, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(f"{self.name} queue is full ({self.max_queue} pending)")
+        with self._lock:
+            self._submitted += 1
+        return fut
+
+    def submit(self, item, timeout=None):
+        return self.submit_async(item).result(timeout=timeout)
+
+    def submit_many(self, items, timeout=0.0):
+        # Enqueue a group back to back so the worker packs it into as few batches as possible.
+        # Admitted in chunks no larger than the free queue space; while the queue is full this
+        # waits up to `timeout` seconds for the worker to drain it (backpressure). Items still
+        # not admitted then get a future failed with QueueFullError, the rest run as usual.
+        if not self._running():
+            self.start()
+        items = list(items)
+        futures = [Future() for _ in items]
+        deadline = time.perf_counter() + max(0.0, float(timeout or 0.0))
+        admitted = 0
+        while admitted < len(items):
+            with self._submit_lock:
+                free = self.max_queue - self._queue.qsize()
+                enqueued = time.perf_counter()
+                for item, fut in zip(items[admitted:admitted + free], futures[admitted:admitted + free]):
+                    self._queue.put_nowait((item, fut, enqueued))
+                    admitted += 1
+            if admitted < len(items):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(min(0.005, remaining))
+        rejected = len(items) - admitted
+        if rejected:
+            error = QueueFullError(f"{self.name} queue stayed full; {rejected} of {len(items)} items not admitted "
+                                   f"({self.max_queue} pending)")
+            for fut in futures[admitted:]:
+                fut.set_exception(error)
+        with self._lock:
+            self._submitted += admitted
+            self._rejected += rejected
+        return futures
+
+    # ---------------------------
+    # Worker side
+    # ---------------------------
+    def _collect(self):
+        # Block for the first item, then gather more until full or the wait budget runs out
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # still drain anything already waiting, it costs nothing extra
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while not self._stopping:
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            items = [entry[0] for entry in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {len(items)} items")
+                error = None
+            except Exception as e:
+                results = None
+                error = e
+            finished = time.perf_counter()
+
+            for i, (_, fut, _) in enumerate(batch):
+                if error is None:
+                    fut.set_result(results[i])
+                else:
+                    fut.set_exception(error)
+
+            with self._lock:
+                self._batches += 1
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._batch_times.append(finished - started)
+                if error is None:
+                    self._completed += len(batch)
+                else:
+                    self._failed += len(batch)
+                for _, _, enqueued in batch:
+                    self._queue_waits.append(started - enqueued)
+                    self._latencies.append(finished - enqueued)
+
+    # ---------------------------
+    # Reporting
+    # ---------------------------
+    def stats(self):
+        with self._lock:
+            batches = self._batches
+            processed = self._completed + self._failed
+            return {
+                "name": self.name,
+                "config": {
+                    "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": self.max_wait * 1000.0,
+                    "max_queue": self.max_queue,
+                    "workers": self.workers,
+                },
+                "running": self._running(),
+                "queue_depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "batches": batches,
+                "avg_batch_size": round(processed / batches, 3) if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "latency_ms": percentiles_ms(self._latencies),
+                "queue_wait_ms": percentiles_ms(self._queue_waits),
+                "batch_run_ms": percentiles_ms(self._batch_times),
+            }
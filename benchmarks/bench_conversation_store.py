@@ -0,0 +1,129 @@
+# benchmarks/bench_conversation_store.py
+"""
+Micro-benchmark: the original list-of-dicts conversation storage vs InMemoryConversationStore.
+
+    python benchmarks/bench_conversation_store.py --conversations 5000 --messages 4
+
+Times the operations the routes perform (lookup for GET/POST message, delete, listing)
+against one heavy user. The list version scans on every lookup and rebuilds the list
+on delete, so its cost grows with history; the indexed store stays flat.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_store import InMemoryConversationStore  # noqa: E402
+
+
+class ListStore:
+    # The list-scanning storage chatbot+imagedetection_ui.py used before conversation_store.py
+    def __init__(self):
+        self.store = {"next_id": 1, "conversations": []}
+
+    def create(self):
+        cid = self.store["next_id"]
+        self.store["next_id"] += 1
+        self.store["conversations"].append({"id": cid, "title": "New Chat", "created_at": time.time(), "messages": []})
+        return cid
+
+    def append(self, cid, role, message):
+        conv = next((c for c in self.store["conversations"] if c["id"] == cid), None)
+        conv["messages"].append({"role": role, "message": message, "ts": time.time()})
+        if conv.get("title") == "New Chat":
+            conv["title"] = message if len(message) <= 60 else message[:57] + "..."
+
+    def get(self, cid):
+        conv = next((c for c in self.store["conversations"] if c["id"] == cid), None)
+        return {"id": conv["id"], "title": conv.get("title"), "messages": conv["messages"]}
+
+    def delete(self, cid):
+        self.store["conversations"] = [c for c in self.store["conversations"] if c["id"] != cid]
+
+    def listing(self):
+        out = []
+        for conv in self.store["conversations"]:
+            preview = ""
+            for m in conv["messages"]:
+                preview = m["message"]
+                break
+            out.append({"id": conv["id"], "title": conv.get("title") or (preview[:60] if preview else f"Chat {conv['id']}"),
+                        "preview": preview[:120] if preview else ""})
+        return out
+
+
+class IndexedStore:
+    def __init__(self):
+        self.store = InMemoryConversationStore()
+
+    def create(self):
+        return self.store.create_conversation("bench")["id"]
+
+    def append(self, cid, role, message):
+        self.store.append_message("bench", cid, role, message)
+
+    def get(self, cid):
+        return self.store.get_conversation("bench", cid)
+
+    def delete(self, cid):
+        self.store.delete_conversation("bench", cid)
+
+    def listing(self):
+        return self.store.list_conversations("bench")
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6  # microseconds per op
+
+
+def run(impl, conversations, messages, ops, seed):
+    rng = random.Random(seed)
+    store = impl()
+    ids = []
+    started = time.perf_counter()
+    for _ in range(conversations):
+        cid = store.create()
+        ids.append(cid)
+        for j in range(messages):
+            store.append(cid, "user" if j % 2 == 0 else "bot", f"what is leaf blast on rice {j}")
+    fill = time.perf_counter() - started
+
+    targets = [rng.choice(ids) for _ in range(ops)]
+    it = iter(targets)
+    results = {
+        "fill_s": fill,
+        "append_us": timed(lambda: store.append(next(it), "user", "hello"), ops),
+    }
+    it = iter(targets)
+    results["get_us"] = timed(lambda: store.get(next(it)), ops)
+    results["list_us"] = timed(store.listing, max(1, ops // 100))
+    doomed = iter(rng.sample(ids, min(ops, len(ids) // 2)))
+    results["delete_us"] = timed(lambda: store.delete(next(doomed)), min(ops, len(ids) // 2))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=4, help="messages per conversation")
+    parser.add_argument("--ops", type=int, default=1000, help="random operations timed per kind")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    print(f"{args.conversations} conversations x {args.messages} messages, {args.ops} ops per kind")
+    rows = {name: run(impl, args.conversations, args.messages, args.ops, args.seed)
+            for name, impl in (("list (old)", ListStore), ("indexed", IndexedStore))}
+    print(f"{'':12} {'fill s':>8} {'append us':>10} {'get us':>10} {'delete us':>10} {'list us':>10}")
+    for name, r in rows.items():
+        print(f"{name:12} {r['fill_s']:8.3f} {r['append_us']:10.2f} {r['get_us']:10.2f} "
+              f"{r['delete_us']:10.2f} {r['list_us']:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/bench_http_cache.py
+"""
+Benchmark: upstream calls and latency with and without the shared HTTP response cache.
+
+    python benchmarks/bench_http_cache.py --threads 8 --calls 400 --latency-ms 80
+    python benchmarks/bench_http_cache.py --burst 64
+
+Runs MandiPriceAPI.fetch_commodity_prices against a local stub of the data.gov.in resource
+(benchmarks/mandi_stub.py) in four scenarios:
+
+  dashboard     --threads clients repeating popular lookups (a few commodity/state filters,
+                picked with a skewed distribution), uncached vs cached
+  burst         --burst threads asking the same page at the same moment (coalescing)
+  revalidate    every entry expired, asked again: conditional GETs answered with 304
+  restart       a new cache on the same SQLite file answers from disk
+
+Prints upstream requests, hit rate and saved upstream calls from HTTPCache.stats().
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HTTPCache  # noqa: E402
+from mandi_stub import COMMODITIES, STATES, StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+
+def popular_filters(n, seed):
+    # Skewed like real traffic: the first few filter sets get most of the lookups
+    rng = random.Random(seed)
+    choices = [{"commodity": c} for c in COMMODITIES]
+    choices += [{"commodity": c, "state": s} for c in list(COMMODITIES)[:4] for s in STATES]
+    weights = [1.0 / (rank + 1) for rank in range(len(choices))]
+    return rng.choices(choices, weights=weights, k=n)
+
+
+def run_clients(threads, calls, fn):
+    # fn(i) for i in range(calls), spread over `threads` threads; returns (seconds, per-call ms)
+    times = []
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            fn(i)
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with lock:
+                times.append(elapsed)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started, times
+
+
+def report(name, server, cache, seconds, times):
+    stats = cache.stats() if cache is not None else {}
+    p50 = statistics.median(times) if times else 0.0
+    print(f"{name:<22} {len(times):>6} {server.requests:>9} {server.not_modified:>5} {seconds:8.2f} {p50:8.2f} "
+          f"{stats.get('hit_rate', 0.0):>8.0%} {stats.get('saved_upstream_calls', 0):>6} "
+          f"{stats.get('coalesced', 0):>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--burst", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=100, help="records per lookup")
+    args = parser.parse_args(argv)
+
+    mandi = load_mandi_module()
+    records = synthetic_records(args.records)
+    filters = popular_filters(args.calls, seed=1)
+    print(f"{args.records} records, {args.latency_ms:.0f} ms per upstream request\n")
+    print(f"{'scenario':<22} {'calls':>6} {'upstream':>9} {'304s':>5} {'seconds':>8} {'p50 ms':>8} "
+          f"{'hit rate':>8} {'saved':>6} {'coalesced':>9}")
+
+    with StubMandiServer(records, latency_ms=args.latency_ms) as server:
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=HTTPCache(default_ttl=0))
+        seconds, times = run_clients(args.threads, args.calls,
+                                     lambda i: api._get_page(args.limit, 0, filters[i])["records"])
+        report("dashboard, uncached", server, None, seconds, times)
+
+    with StubMandiServer(records, latency_ms=args.latency_ms) as server:
+        cache = HTTPCache()
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=cache, cache_ttl=3600)
+        seconds, times = run_clients(args.threads, args.calls,
+                                     lambda i: api.fetch_commodity_prices(args.limit, filters=filters[i]))
+        report("dashboard, cached", server, cache, seconds, times)
+
+    with StubMandiServer(records, latency_ms=args.latency_ms) as server:
+        cache = HTTPCache()
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=cache)
+        barrier = threading.Barrier(args.burst)
+
+        def same_page(_):
+            barrier.wait()
+            api.fetch_commodity_prices(args.limit, filters={"commodity": "Wheat"})
+
+        seconds, times = run_clients(args.burst, args.burst, same_page)
+        report(f"burst x{args.burst}", server, cache, seconds, times)
+
+    with StubMandiServer(records, latency_ms=args.latency_ms) as server:
+        cache = HTTPCache()
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=cache, cache_ttl=0.2)
+        distinct = [dict(f) for f in {tuple(sorted(f.items())) for f in filters}]
+        for f in distinct:
+            api.fetch_commodity_prices(args.limit, filters=f)
+        time.sleep(0.3)
+        server.requests = 0
+        seconds, times = run_clients(args.threads, len(distinct),
+                                     lambda i: api.fetch_commodity_prices(args.limit, filters=distinct[i]))
+        report("revalidate expired", server, cache, seconds, times)
+
+    with StubMandiServer(records, latency_ms=args.latency_ms) as server, tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "http_cache.db")
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=HTTPCache(disk_path=path), cache_ttl=3600)
+        for f in distinct:
+            api.fetch_commodity_prices(args.limit, filters=f)
+        server.requests = 0
+        cache = HTTPCache(disk_path=path)
+        api = mandi.MandiPriceAPI(None, api_url=server.url, cache=cache, cache_ttl=3600)
+        seconds, times = run_clients(args.threads, len(distinct),
+                                     lambda i: api.fetch_commodity_prices(args.limit, filters=distinct[i]))
+        report("restart, from disk", server, cache, seconds, times)
+        print(f"\ndisk hits after restart: {cache.stats()['disk_hits']} of {len(distinct)}")
+
+
+if __name__ == "__main__":
+    main()
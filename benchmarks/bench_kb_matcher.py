@@ -0,0 +1,97 @@
+# benchmarks/bench_kb_matcher.py
+"""
+Micro-benchmark: the original nested substring loop vs KnowledgeMatcher.
+
+    python benchmarks/bench_kb_matcher.py --queries 100000 --extra-crops 200
+
+Queries are synthetic: filler words plus 0-3 crop/disease mentions, some of them
+synonyms or misspellings. --extra-crops adds generated crops (each with a few
+diseases) to show how each approach scales with the size of the knowledge base.
+Also reports how many queries each approach answers at all.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kb_matcher import KnowledgeMatcher, typo_variants  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+
+FILLER = ("my the leaves have spots what is this how do i treat on field plant today please help "
+          "yellow brown some near stem after rain farmer crop kya hai").split()
+
+
+def old_lookup(knowledge_base, query):
+    # The loop conversation_message and chatbot.py used before kb_matcher.py
+    q_lower = query.lower()
+    for crop, diseases in knowledge_base.items():
+        if crop in q_lower:
+            for disease in diseases:
+                if disease in q_lower:
+                    return [(crop, disease)]
+            return [(crop, None)]
+    return []
+
+
+def synthetic_queries(knowledge_base, crop_aliases, disease_aliases, n, seed):
+    rng = random.Random(seed)
+    crops = list(knowledge_base)
+    queries = []
+    for _ in range(n):
+        words = rng.choices(FILLER, k=rng.randint(3, 12))
+        for _ in range(rng.randint(0, 3)):
+            crop = rng.choice(crops)
+            disease = rng.choice(list(knowledge_base[crop]))
+            style = rng.random()
+            if style < 0.6:
+                mention = f"{crop} {disease}"
+            elif style < 0.8:
+                crop_name = rng.choice(crop_aliases.get(crop) or [crop])
+                mention = f"{crop_name} {rng.choice(disease_aliases.get(disease) or [disease])}"
+            else:
+                typos = sorted(typo_variants(disease)) or [disease]
+                mention = f"{crop} {rng.choice(typos)}"
+            words.insert(rng.randint(0, len(words)), mention)
+        queries.append(" ".join(words))
+    return queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--extra-crops", type=int, default=0, help="generated crops added to the knowledge base")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    kb = KnowledgeBase.load()
+    knowledge_base = dict(kb.diseases)
+    for i in range(args.extra_crops):
+        knowledge_base[f"crop{i}"] = {f"disease{i}x{j}": "generated" for j in range(4)}
+
+    started = time.perf_counter()
+    matcher = KnowledgeMatcher(knowledge_base, kb.crop_aliases, kb.disease_aliases)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    queries = synthetic_queries(knowledge_base, kb.crop_aliases, kb.disease_aliases, args.queries, args.seed)
+    print(f"{len(knowledge_base)} crops, {len(matcher.terms)} patterns (compiled in {build_ms:.1f} ms), "
+          f"{len(queries)} queries")
+
+    results = {}
+    for name, fn in (("nested loop (old)", lambda q: old_lookup(knowledge_base, q)),
+                     ("matcher.find", matcher.find),
+                     ("matcher.lookup", matcher.lookup)):
+        started = time.perf_counter()
+        answered = sum(1 for q in queries if fn(q))
+        elapsed = time.perf_counter() - started
+        results[name] = (elapsed / len(queries) * 1e6, answered)
+
+    print(f"{'':20} {'us/query':>10} {'answered':>10}")
+    for name, (us, answered) in results.items():
+        print(f"{name:20} {us:10.2f} {answered:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_kb_retrieval.py
+"""
+Micro-benchmark: RetrievalIndex query latency as the knowledge base grows.
+
+    python benchmarks/bench_kb_retrieval.py --entries 100 1000 10000 --queries 2000
+
+Each size pads the real knowledge base with generated entries (synthetic crops,
+diseases and symptom text), then times uncached queries (p50/p99) and repeated
+(cached) queries. Per-query cost should stay roughly flat across sizes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batching import percentiles_ms  # noqa: E402
+from kb_retrieval import RetrievalIndex, entries_from_knowledge_base  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+
+SYMPTOMS = ("yellow brown orange black gray white red purple spots lesions pustules stripes mold powder "
+            "holes wilting curling rot streaks halo concentric water soaked cigar diamond shaped leaves stem "
+            "root fruit tip margin vein fungus bacteria virus insect mite fungicide resistant varieties rotation "
+            "seed treatment spray irrigation humid dry").split()
+
+
+def synthetic_entries(n, rng):
+    return [
+        {"crop": f"crop{i % max(1, n // 8)}", "disease": f"disease {i}",
+         "info": " ".join(rng.choices(SYMPTOMS, k=rng.randint(12, 30))), "aliases": []}
+        for i in range(n)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    kb = KnowledgeBase.load()
+    base = entries_from_knowledge_base(kb.diseases, kb.crop_aliases, kb.disease_aliases)
+    queries = [" ".join(rng.choices(SYMPTOMS, k=rng.randint(3, 8))) for _ in range(args.queries)]
+    print(f"{'entries':>8} {'features':>9} {'build ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'cached p50 ms':>14}")
+    for n in args.entries:
+        started = time.perf_counter()
+        index = RetrievalIndex(base + synthetic_entries(n, rng), cache_size=len(queries))
+        build_ms = (time.perf_counter() - started) * 1000.0
+
+        cold, warm = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.search(q, k=3)
+            cold.append(time.perf_counter() - t0)
+        for q in queries:
+            t0 = time.perf_counter()
+            index.search(q, k=3)
+            warm.append(time.perf_counter() - t0)
+        c, w = percentiles_ms(cold), percentiles_ms(warm)
+        print(f"{len(index.entries):8d} {len(index.vocab):9d} {build_ms:9.1f} {c['p50']:8.3f} {c['p99']:8.3f} "
+              f"{w['p50']:14.4f}")
+
+
+if __name__ == "__main__":
+    main()
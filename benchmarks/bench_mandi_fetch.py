@@ -0,0 +1,70 @@
+# benchmarks/bench_mandi_fetch.py
+"""
+Benchmark: pulling every mandi record page by page vs MandiPriceAPI.iter_all_records.
+
+    python benchmarks/bench_mandi_fetch.py --records 20000 --page-size 500 --latency-ms 50
+    python benchmarks/bench_mandi_fetch.py --fail-rate 0.05 --concurrency 4 16
+
+Runs against a local stub of the data.gov.in resource (benchmarks/mandi_stub.py) with added
+per-request latency. The baseline is the old pattern: one bare requests.get per page, a new
+connection each time, one page after another. Every run checks that all records arrived in
+offset order.
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+
+def sequential(url, page_size, total):
+    records = []
+    for offset in range(0, total, page_size):
+        response = requests.get(url, params={"format": "json", "limit": page_size, "offset": offset},
+                                headers={"Connection": "close"}, timeout=30)
+        response.raise_for_status()
+        records.extend(response.json()["records"])
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args(argv)
+
+    mandi = load_mandi_module()
+    expected = synthetic_records(args.records)
+    print(f"{args.records} records, {args.page_size} per page, {args.latency_ms:.0f} ms per request, "
+          f"{args.fail_rate:.0%} failures")
+    print(f"{'client':<22} {'seconds':>8} {'records/s':>10} {'requests':>9} {'connections':>12} {'503s':>5}  complete")
+
+    def report(name, run):
+        with StubMandiServer(expected, latency_ms=args.latency_ms, fail_rate=args.fail_rate) as server:
+            started = time.perf_counter()
+            try:
+                records = run(server.url)
+                ok = records == expected
+            except requests.RequestException as e:
+                records, ok = [], f"failed: {type(e).__name__}"
+            elapsed = time.perf_counter() - started
+            print(f"{name:<22} {elapsed:8.2f} {len(records) / elapsed:10.0f} {server.requests:9d} "
+                  f"{server.connections:12d} {server.failures:5d}  {ok}")
+
+    report("sequential, no session", lambda url: sequential(url, args.page_size, args.records))
+    for n in args.concurrency:
+        report(f"iter_all_records x{n}", lambda url: list(
+            mandi.MandiPriceAPI(None, api_url=url, backoff=0.05).iter_all_records(page_size=args.page_size,
+                                                                                  concurrency=n)))
+
+
+if __name__ == "__main__":
+    main()
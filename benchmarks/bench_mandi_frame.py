@@ -0,0 +1,115 @@
+# benchmarks/bench_mandi_frame.py
+"""
+Benchmark: memory and summary time for mandi records as dicts vs the typed DataFrame.
+
+    python benchmarks/bench_mandi_frame.py --records 1000000
+    python benchmarks/bench_mandi_frame.py --records 200000 --repeat 5
+    python benchmarks/bench_mandi_frame.py --markets 0      # the stub's near-unique market names
+
+Compares three representations of the same synthetic records (benchmarks/mandi_stub.py):
+the list of string-valued dicts the API returns, the object-column DataFrame the old
+get_price_summary built from it on every call, and records_to_frame's typed frame
+(categoricals, float32 prices, datetime64 dates). Market names are remapped to --markets
+distinct values, about the size of the real feed, since the stub makes almost every market
+name unique to keep record keys distinct. Sizes are pandas' deep memory_usage; the dict
+list is measured as the process RSS it added. Then times the old per-call summary against
+get_price_summary / price_stats on a frame parsed once.
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mandi_stub import STATES, load_mandi_module, synthetic_records  # noqa: E402
+
+
+def rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def frame_mib(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def old_summary(records):
+    # get_price_summary before typed frames: rebuild and re-parse on every call
+    df = pd.DataFrame(records)
+    for col in ["min_price", "max_price", "modal_price"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return {"total_records": len(records), "unique_commodities": df["commodity"].nunique(),
+            "unique_states": df["state"].nunique(), "unique_markets": df["market"].nunique(),
+            "latest_date": df["arrival_date"].max(), "avg_modal_price": df["modal_price"].mean()}
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--markets", type=int, default=3000, help="distinct market names (0 = keep the stub's)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    mandi = load_mandi_module()
+    gc.collect()
+    before = rss_mib()
+    records = synthetic_records(args.records, args.days)
+    if args.markets:
+        per_district = max(1, args.markets // sum(len(d) for d in STATES.values()))
+        for i, record in enumerate(records):
+            record["market"] = f"{record['district']} APMC {i % per_district + 1}"
+    gc.collect()
+    dicts = rss_mib() - before
+
+    objects = pd.DataFrame(records)
+    started = time.perf_counter()
+    typed = mandi.records_to_frame(records)
+    parse_ms = (time.perf_counter() - started) * 1000.0
+    started = time.perf_counter()
+    streamed = mandi.frame_from_records(iter(records))
+    stream_ms = (time.perf_counter() - started) * 1000.0
+    assert streamed.equals(typed), "chunked parse differs from one-shot parse"
+
+    print(f"{args.records} records over {args.days} days, {typed['market'].nunique()} markets\n")
+    print(f"{'representation':<34} {'MiB':>9} {'bytes/row':>10}")
+    for name, mib in [("list of dicts (RSS added)", dicts), ("object DataFrame", frame_mib(objects)),
+                      ("typed DataFrame", frame_mib(typed))]:
+        print(f"{name:<34} {mib:9.1f} {mib * 2 ** 20 / args.records:10.0f}")
+    print("\ntyped columns:")
+    for col, size in typed.memory_usage(deep=True, index=False).items():
+        print(f"  {col:<14} {str(typed[col].dtype)[:8]:<9} {size / 2 ** 20:7.1f} MiB")
+    print(f"\nparse once: {parse_ms:.0f} ms (chunked from an iterator: {stream_ms:.0f} ms)\n")
+
+    api = mandi.MandiPriceAPI(None)
+    rows = [
+        ("old get_price_summary(records)", lambda: old_summary(records)),
+        ("get_price_summary(frame)", lambda: api.get_price_summary(typed)),
+        ("price_stats by commodity", lambda: mandi.price_stats(typed, "commodity")),
+        ("price_stats by state, commodity", lambda: mandi.price_stats(typed, ["state", "commodity"])),
+        ("price_stats by market", lambda: mandi.price_stats(typed, "market")),
+    ]
+    print(f"{'summary':<34} {'p50 ms':>9}")
+    for name, fn in rows:
+        print(f"{name:<34} {timed(fn, args.repeat):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
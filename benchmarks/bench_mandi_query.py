@@ -0,0 +1,78 @@
+# benchmarks/bench_mandi_query.py
+"""
+Benchmark: mandi queries answered by mandi_query.py from the local store vs asking the API.
+
+    python benchmarks/bench_mandi_query.py --records 200000 --latency-ms 80
+
+Syncs a local stub of the data.gov.in resource (benchmarks/mandi_stub.py) into a temporary
+store once, then times each query locally (p50 over --repeat runs, no API calls) and the
+same question answered remotely by downloading every matching record (fetch_all_records).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from batching import percentiles_ms  # noqa: E402
+from mandi_query import MandiQuery  # noqa: E402
+from mandi_store import MandiStore  # noqa: E402
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    mandi = load_mandi_module()
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    queries = [
+        ("records commodity+state", "records", {"commodity": "Wheat", "state": "Punjab"}, {}),
+        ("records commodity, 7 days", "records", {"commodity": "Onion"}, {"date_from": week_ago}),
+        ("records market", "records", {"market": "Pune APMC 12"}, {}),
+        ("distinct commodity", "distinct", {}, {}),
+        ("distinct market in state", "distinct", {"state": "Gujarat"}, {}),
+        ("summary by state, commodity", "summary", {}, {}),
+        ("summary commodity, 7 days", "summary", {"state": "Karnataka"}, {"date_from": week_ago}),
+    ]
+    with tempfile.TemporaryDirectory() as tmp, MandiStore(os.path.join(tmp, "mandi.db")) as store, \
+            StubMandiServer(synthetic_records(args.records, args.days), latency_ms=args.latency_ms) as server:
+        api = mandi.MandiPriceAPI(None, api_url=server.url)
+        sync = store.sync(api)
+        print(f"synced {sync['fetched']} records in {sync['seconds']}s "
+              f"({os.path.getsize(store.path) / 1e6:.1f} MB + WAL)\n")
+        query = MandiQuery(store, api)
+        print(f"{'query':<30} {'rows':>6} {'local p50 ms':>13} {'local p99 ms':>13} "
+              f"{'api calls':>10} {'remote ms':>10}")
+        for name, kind, filters, dates in queries:
+            times = []
+            before = server.requests
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                if kind == "records":
+                    rows = query.records(**dates, **filters)
+                elif kind == "distinct":
+                    rows = query.distinct("market" if filters else "commodity", **dates, **filters)
+                else:
+                    rows = query.summary(["state", "commodity"] if not filters else ["commodity"], **dates, **filters)
+                times.append(time.perf_counter() - started)
+            calls = server.requests - before
+            lat = percentiles_ms(times)
+
+            started = time.perf_counter()
+            api.fetch_all_records(filters or None)  # dates are not filterable remotely except one day at a time
+            remote_ms = (time.perf_counter() - started) * 1000.0
+            print(f"{name:<30} {len(rows):6d} {lat['p50']:13.2f} {lat['p99']:13.2f} {calls:10d} {remote_ms:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
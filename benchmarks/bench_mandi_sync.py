@@ -0,0 +1,63 @@
+# benchmarks/bench_mandi_sync.py
+"""
+Benchmark: cost of repeated mandi syncs (mandi_store.py) as the source grows.
+
+    python benchmarks/bench_mandi_sync.py --records 50000 --new 500 --rounds 3
+
+Against a local stub of the data.gov.in resource (benchmarks/mandi_stub.py): one full sync,
+then rounds that append --new records to the source and sync again (the requests and time
+should track --new, not the total), then a round where the source is rotated (shuffled), which
+must fall back to a full pull without duplicating rows.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+from mandi_store import MandiStore  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--new", type=int, default=500, help="records appended to the source per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    mandi = load_mandi_module()
+    pool = synthetic_records(args.records + args.new * args.rounds, days=30)
+    source = pool[:args.records]
+    print(f"{'round':<12} {'mode':<12} {'source':>8} {'fetched':>8} {'written':>8} {'requests':>9} {'seconds':>8} "
+          f"{'stored':>8}")
+    with tempfile.TemporaryDirectory() as tmp, MandiStore(os.path.join(tmp, "mandi.db")) as store, \
+            StubMandiServer(source, latency_ms=args.latency_ms) as server:
+        api = mandi.MandiPriceAPI(None, api_url=server.url)
+
+        def sync_round(name):
+            before = server.requests
+            r = store.sync(api, page_size=args.page_size)
+            stored = store.conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+            print(f"{name:<12} {r['mode']:<12} {len(server.records):8d} {r['fetched']:8d} {r['written']:8d} "
+                  f"{server.requests - before:9d} {r['seconds']:8.2f} {stored:8d}")
+
+        sync_round("initial")
+        sync_round("unchanged")
+        for i in range(args.rounds):
+            server.records = server.records + pool[args.records + i * args.new:args.records + (i + 1) * args.new]
+            sync_round(f"+{args.new} #{i + 1}")
+        server.records = random.Random(1).sample(server.records, len(server.records))
+        sync_round("rotated")
+        expected = len({tuple(sorted(r.items())) for r in server.records})
+        print(f"distinct source records {expected}")
+
+
+if __name__ == "__main__":
+    main()
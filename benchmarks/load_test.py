@@ -0,0 +1,150 @@
+# benchmarks/load_test.py
+"""
+HTTP load test for a running KrishiSevak server (stdlib only).
+
+    waitress-serve --threads 16 --port 8000 wsgi:app &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --scenario chat --concurrency 32 --duration 20
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --scenario predict --image leaf.jpg
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --scenario mixed --image leaf.jpg
+
+Each client thread logs in once (its own session cookie) and then sends requests back to
+back for --duration seconds:
+    chat     POST /conversations/<id>/message with rotating questions
+    predict  POST /predict with --image (add --unique to defeat the prediction cache)
+    mixed    both, alternating
+Prints requests/sec, latency percentiles and status counts per endpoint.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import percentiles_ms  # noqa: E402
+
+QUESTIONS = [
+    "corn common rust", "what is potato late blight", "orange powder on wheat leaves",
+    "maize grey leaf spot treatment", "rice hispa", "tell me about wheat", "brown spots on paddy leaves",
+]
+
+
+class Client:
+    def __init__(self, base_url, user, password, timeout):
+        self.base = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        body = urllib.parse.urlencode({"username": user, "password": password}).encode()
+        self.opener.open(self.base + "/login", body, timeout=timeout).read()
+        self.conversation = self.call("POST", "/conversations")[1]["id"]
+
+    def call(self, method, path, body=None, headers=None):
+        req = urllib.request.Request(self.base + path, data=body, method=method, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                raw = resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            raw, status = e.read(), e.code
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+    def chat(self, i):
+        body = json.dumps({"query": QUESTIONS[i % len(QUESTIONS)]}).encode()
+        return self.call("POST", f"/conversations/{self.conversation}/message", body,
+                         {"Content-Type": "application/json"})[0]
+
+    def predict(self, image, unique):
+        if unique:
+            image = image + uuid.uuid4().bytes  # trailing bytes: same pixels, different cache key
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"leaf.jpg\"\r\n"
+                f"Content-Type: image/jpeg\r\n\r\n").encode() + image + f"\r\n--{boundary}--\r\n".encode()
+        return self.call("POST", "/predict", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})[0]
+
+
+def worker(args, image, deadline, results, lock):
+    client = Client(args.url, args.user, args.password, args.timeout)
+    i = 0
+    local = []
+    while time.perf_counter() < deadline:
+        kind = args.scenario if args.scenario != "mixed" else ("chat", "predict")[i % 2]
+        started = time.perf_counter()
+        try:
+            status = client.chat(i) if kind == "chat" else client.predict(image, args.unique)
+        except OSError as e:
+            status = type(e).__name__
+        local.append((kind, status, time.perf_counter() - started))
+        i += 1
+    with lock:
+        results.extend(local)
+
+
+def wait_ready(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url.rstrip("/") + "/readyz", timeout=5) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(1)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=["chat", "predict", "mixed"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--image", help="image for predict/mixed")
+    parser.add_argument("--unique", action="store_true", help="make every upload distinct (no cache hits)")
+    parser.add_argument("--user", default="farmer")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    image = None
+    if args.scenario != "chat":
+        if not args.image:
+            parser.error("--image is required for predict/mixed")
+        with open(args.image, "rb") as f:
+            image = f.read()
+        if not wait_ready(args.url, args.timeout):
+            raise SystemExit(f"{args.url} did not become ready within {args.timeout}s")
+
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(args, image, deadline, results, lock))
+               for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.scenario}: {args.concurrency} clients for {elapsed:.1f}s against {args.url}")
+    for kind in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == kind]
+        lat = percentiles_ms([r[2] for r in rows])
+        statuses = Counter(r[1] for r in rows)
+        print(f"  {kind:<8} {len(rows) / elapsed:8.1f} req/s  p50 {lat['p50']} ms  p90 {lat['p90']} ms  "
+              f"p99 {lat['p99']} ms  status {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# benchmarks/mandi_stub.py
+"""
+Local stand-in for the data.gov.in mandi price resource, for benchmarks and offline testing.
+
+    python benchmarks/mandi_stub.py --records 50000 --latency-ms 80 --port 8099
+    MANDI_API_URL=http://127.0.0.1:8099/resource python "mandi api.py"
+
+Answers GET with the same JSON shape as the real API ({"total", "count", "limit", "offset",
+"records"}), honours limit/offset and filters[field]=value, and can add per-request latency,
+cap the page size and fail a fraction of requests with 503 to exercise retries. Pages carry
+an ETag and If-None-Match is answered with 304, for conditional revalidation. Counts
+requests, TCP connections and 304s so keep-alive reuse and revalidation are visible.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from mandi_store import load_mandi_api  # noqa: E402
+
+STATES = {
+    "Gujarat": ["Ahmedabad", "Rajkot", "Surat"], "Punjab": ["Ludhiana", "Amritsar", "Bathinda"],
+    "Maharashtra": ["Pune", "Nashik", "Nagpur"], "Uttar Pradesh": ["Agra", "Lucknow", "Kanpur"],
+    "Karnataka": ["Bangalore", "Mysore", "Hubli"], "Madhya Pradesh": ["Indore", "Bhopal", "Ujjain"],
+}
+COMMODITIES = {
+    "Wheat": 2300, "Rice": 3100, "Cotton": 6800, "Onion": 1600, "Potato": 1200, "Tomato": 1400,
+    "Maize": 2000, "Soyabean": 4500, "Groundnut": 5600, "Mustard": 5200,
+}
+
+
+def load_mandi_module():
+    # The "mandi api.py" module the store and the app use (loaded by path, once per process)
+    return load_mandi_api()
+
+
+def synthetic_records(n, days=7, seed=7, end=None):
+    # n records spread over the `days` days ending at `end`, as strings like the real API returns;
+    # no two share the (date, state, district, market, commodity, variety, grade) key
+    rng = random.Random(seed)
+    end = end or date.today()
+    records = []
+    for i in range(n):
+        state = rng.choice(list(STATES))
+        district = rng.choice(STATES[state])
+        commodity, base = rng.choice(list(COMMODITIES.items()))
+        low = int(base * rng.uniform(0.8, 1.0))
+        high = int(base * rng.uniform(1.0, 1.25))
+        records.append({
+            "state": state,
+            "district": district,
+            "market": f"{district} APMC {i // days + 1}",  # unique per (market, date), like the real feed
+            "commodity": commodity,
+            "variety": rng.choice(["Other", "Local", "Desi", "Hybrid"]),
+            "grade": rng.choice(["FAQ", "Non-FAQ"]),
+            "arrival_date": (end - timedelta(days=i % days)).strftime("%d/%m/%Y"),
+            "min_price": str(low),
+            "max_price": str(high),
+            "modal_price": str(rng.randint(low, high)),
+        })
+    return records
+
+
+class StubMandiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, records, port=0, latency_ms=0.0, fail_rate=0.0, max_limit=0, seed=0, short_pages=None):
+        """
+        Args:
+            records (list): what the resource serves, in offset order
+            port (int): 0 picks a free port (see .url)
+            latency_ms (float): added to every response
+            fail_rate (float): fraction of requests answered with 503 (and Retry-After: 0)
+            max_limit (int): largest page served regardless of limit (0 = no cap)
+            short_pages (dict): offset -> how many times the page at that offset comes back half empty
+        """
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.records = records
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.max_limit = max_limit
+        self.short_pages = dict(short_pages or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.failures = 0
+        self.not_modified = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/resource"
+
+    def select(self, query):
+        filters = {k[8:-1]: v[0] for k, v in query.items() if k.startswith("filters[") and k.endswith("]")}
+        if not filters:
+            return self.records
+        return [r for r in self.records if all(str(r.get(k, "")).lower() == v.lower() for k, v in filters.items())]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, name="mandi-stub", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        with server.lock:
+            server.requests += 1
+            fail = server.rng.random() < server.fail_rate
+            if fail:
+                server.failures += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            return self.reply(503, {"error": "service unavailable"}, {"Retry-After": "0"})
+
+        limit = int(query.get("limit", ["10"])[0])
+        if server.max_limit:
+            limit = min(limit, server.max_limit)
+        offset = int(query.get("offset", ["0"])[0])
+        matched = server.select(query)
+        page = matched[offset:offset + limit]
+        with server.lock:
+            if server.short_pages.get(offset, 0) > 0:
+                server.short_pages[offset] -= 1
+                page = page[:len(page) // 2]
+        body = json.dumps({"total": len(matched), "count": len(page), "limit": str(limit), "offset": str(offset),
+                           "records": page}).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.not_modified += 1
+            return self.reply(304, None, {"ETag": etag})
+        self.reply(200, body, {"ETag": etag})
+
+    def reply(self, status, payload, headers=None):
+        body = b"" if payload is None else payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--max-limit", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = StubMandiServer(synthetic_records(args.records, args.days), args.port, args.latency_ms,
+                             args.fail_rate, args.max_limit)
+    print(f"Serving {args.records} records at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/prefork_memory.py
+"""
+Per-worker memory of the pre-forked server, with and without the model preloaded in the master (Linux).
+
+    python benchmarks/prefork_memory.py --workers 3
+    python benchmarks/prefork_memory.py --workers 3 --modes preload shm   # only some modes
+
+For each mode this starts `gunicorn -c gunicorn.conf.py wsgi:app`, waits until every worker
+reports ready on /readyz, sends a few /predict requests if --image is given, then reads
+/proc/<pid>/smaps_rollup for the master and each worker:
+    RSS  resident pages, shared ones counted in full for every process
+    PSS  shared pages divided between the processes that map them
+    USS  pages only this process maps (Private_Clean + Private_Dirty): what the worker really costs
+Modes: separate (PREFORK_PRELOAD=0), preload (copy-on-write), shm (PREFORK_SHARE_MEMORY=1).
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+MODES = {
+    "separate": {"PREFORK_PRELOAD": "0"},
+    "preload": {"PREFORK_PRELOAD": "1", "PREFORK_SHARE_MEMORY": "0"},
+    "shm": {"PREFORK_PRELOAD": "1", "PREFORK_SHARE_MEMORY": "1"},
+}
+
+
+def process_memory(pid):
+    # {"rss", "pss", "uss", "shared"} in MiB from /proc/<pid>/smaps_rollup
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "uss": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_all_ready(url, workers, timeout):
+    # /readyz answers from whichever worker accepted the connection; keep asking until each has said ready
+    ready = set()
+    deadline = time.time() + timeout
+    while len(ready) < workers and time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/readyz", timeout=5) as resp:
+                ready.add(json.loads(resp.read())["pid"])
+        except (urllib.error.URLError, OSError, ValueError, KeyError):
+            time.sleep(0.2)
+    return len(ready) >= workers
+
+
+def run_mode(mode, args):
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), BIND=f"127.0.0.1:{args.port}", **MODES[mode])
+    url = f"http://127.0.0.1:{args.port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_all_ready(url, args.workers, args.timeout):
+            raise SystemExit(f"{mode}: workers not ready within {args.timeout}s")
+        ready_s = time.perf_counter() - started
+        if args.image:
+            from load_test import main as load_test
+            load_test(["--url", url, "--scenario", "predict", "--image", args.image, "--unique",
+                       "--concurrency", str(args.workers * 2), "--duration", str(args.load_seconds)])
+        time.sleep(1.0)
+        master = process_memory(server.pid)
+        workers = [process_memory(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+    return ready_s, master, workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--image", help="send /predict load before measuring (touches the inference path)")
+    parser.add_argument("--load-seconds", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for mode in args.modes:
+        ready_s, master, workers = run_mode(mode, args)
+        rows.append((mode, ready_s, master, workers))
+
+    print(f"\n{'mode':<9} {'ready s':>7} {'process':<9} {'RSS MiB':>8} {'PSS MiB':>8} {'USS MiB':>8} {'shared MiB':>10}")
+    for mode, ready_s, master, workers in rows:
+        for i, (name, m) in enumerate([("master", master)] + [(f"worker{n}", w) for n, w in enumerate(workers)]):
+            label, ready = (mode, f"{ready_s:.1f}") if i == 0 else ("", "")
+            print(f"{label:<9} {ready:>7} {name:<9} {m['rss']:8.1f} "
+                  f"{m['pss']:8.1f} {m['uss']:8.1f} {m['shared']:10.1f}")
+        total_pss = master["pss"] + sum(w["pss"] for w in workers)
+        mean_uss = sum(w["uss"] for w in workers) / max(1, len(workers))
+        print(f"{'':<9} {'':>7} {'total':<9} {'':>8} {total_pss:8.1f} {mean_uss:8.1f}  (PSS sum, mean worker USS)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 # krishi_sevak_app.py
-from flask import Flask, request, jsonify, Response, redirect, url_for, session
+from flask import Flask, request, jsonify, Response, redirect, url_for, session, stream_with_context
 from functools import wraps
-from transformers import AutoImageProcessor, AutoModelForImageClassification
-from PIL import Image
-import torch
+import numpy as np
 import os
+import json
+import zipfile
+import zlib
 import hashlib
 import time
+from concurrent.futures import Future, as_completed, TimeoutError as FuturesTimeoutError
+from inference_backends import MODEL_ID, BackgroundModelLoader, load_backend, top_k, prediction_result
+from inference_scheduler import InferenceScheduler
+from batching import MicroBatcher, QueueFullError
+from prediction_cache import PredictionCache
+from preprocessing import PreprocessPool, StageTimings
+from conversation_store import open_conversation_store
+from kb_retrieval import answer
+from knowledge_base import KnowledgeBaseStore
 
 # ---------------------------
 # KrishiSevak single-file Flask app
@@ -24,32 +34,155 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super-secret-demo-key")
 DEMO_USER = "farmer"
 DEMO_PASS_HASH = hashlib.sha256("password123".encode()).hexdigest()
 
-# Knowledge base (unchanged)
-knowledge_base = {
-    "corn": {"common rust": "Cause: Fungus (Puccinia sorghi). Symptoms: reddish-brown pustules on leaves. Control: resistant varieties, fungicides.",
-             "gray leaf spot": "Cause: Fungus (Cercospora zeae-maydis). Symptoms: gray rectangular lesions. Control: resistant hybrids, fungicides.",
-             "leaf blight": "Cause: Fungus (Exserohilum turcicum). Symptoms: cigar-shaped lesions. Control: resistant hybrids, fungicides.",
-             "healthy": "Green leaves, no lesions, normal growth."},
-    "potato": {"early blight": "Cause: Fungus (Alternaria solani). Symptoms: concentric dark spots. Control: crop rotation, fungicides.",
-               "late blight": "Cause: Oomycete (Phytophthora infestans). Symptoms: water-soaked lesions, white mold. Control: resistant varieties, fungicides.",
-               "healthy": "Green leaves, no dark spots."},
-    "rice": {"brown spot": "Cause: Fungus (Bipolaris oryzae). Symptoms: brown circular spots with yellow halo. Control: seed treatment, fungicides.",
-             "hispa": "Cause: Insect (Dicladispa armigera). Symptoms: scraping on leaves, small holes. Control: insecticides, resistant varieties.",
-             "leaf blast": "Cause: Fungus (Magnaporthe oryzae). Symptoms: diamond-shaped lesions. Control: resistant varieties, fungicides.",
-             "healthy": "No lesions, normal green leaves."},
-    "wheat": {"brown rust": "Cause: Fungus (Puccinia triticina). Symptoms: orange-brown pustules. Control: resistant varieties, fungicides.",
-              "yellow rust": "Cause: Fungus (Puccinia striiformis). Symptoms: yellow stripes of pustules. Control: resistant varieties, fungicides.",
-              "healthy": "Uniform green leaves, no pustules."}
-}
+# ---------------------------
+# Knowledge base: knowledge_base.json (see knowledge_base.py), indexed at load time and
+# re-read when the file changes, without a restart; each request works on one snapshot.
+#   KNOWLEDGE_BASE_PATH   the JSON file (default knowledge_base.json)
+#   KB_CHECK_SECONDS      how often the file's mtime is checked (default 2)
+# Questions are matched on crop/disease names, synonyms and misspellings (kb_matcher.py); those
+# that name no disease fall back to TF-IDF retrieval over the entries (kb_retrieval.py):
+#   KB_EXTRA_PATH   JSON file of extra entries to index for retrieval (thousands are fine)
+#   KB_MIN_SCORE    lowest cosine similarity a retrieved answer needs (default 0.25)
+# ---------------------------
+kb_store = KnowledgeBaseStore(check_interval=float(os.environ.get("KB_CHECK_SECONDS", "2")),
+                              extra_path=os.environ.get("KB_EXTRA_PATH"))
+KB_MIN_SCORE = float(os.environ.get("KB_MIN_SCORE", "0.25"))
+
+
+def kb_reply_parts(query):
+    # Yields the reply one line at a time: one per crop/disease the query mentions, not just the first
+    kb = kb_store.current()
+    hits = answer(kb.matcher, kb.index, query, min_score=KB_MIN_SCORE)
+    if not hits:
+        yield "Sorry, I couldn't find information. Please ask about corn, potato, rice, or wheat diseases."
+    for h in hits:
+        if h['disease']:
+            yield f"🌱 {h['crop'].capitalize()} - {h['disease'].capitalize()}: {h['info']}"
+        else:
+            yield f"🌱 {h['crop'].capitalize()} Info: {', '.join(kb.diseases[h['crop']].keys())}"
+
+
+def kb_reply(query):
+    return "\n".join(kb_reply_parts(query))
+
+
+APP_STARTED_AT = time.time()
+
+# ---------------------------
+# Decode/preprocess pool for /predict
+# Uploads are decoded (reduced-size JPEG decode) and normalised off the model thread,
+# so the batch worker below only stacks ready tensors. Tune with:
+#   PREPROCESS_WORKERS      pool size (default: cpu count - 1)
+#   PREPROCESS_POOL         "thread" (default) or "process"
+#   PREPROCESS_JPEG_DRAFT   set to 0 to always decode JPEGs at full size
+# ---------------------------
+stage_timings = StageTimings()
+preprocess_pool = None  # built once the model has loaded (needs its processor)
+
+# ---------------------------
+# Micro-batching for /predict
+# Concurrent uploads are grouped into one forward pass. Tune with:
+#   PREDICT_MAX_BATCH_SIZE  largest batch per forward pass (default 8)
+#   PREDICT_MAX_WAIT_MS     how long the first request waits for others (default 10)
+#   PREDICT_MAX_QUEUE       pending requests before /predict answers 503 (default 64)
+#   PREDICT_TIMEOUT_S       how long a request waits for its result (default 30)
+#   PREDICT_TOP_K           labels returned per image unless ?top_k= is given (default 3)
+#   PREDICT_TOP_K_MAX       labels kept per image by the worker and the cache (default 5)
+#   PREDICT_MIN_CONFIDENCE  flag results below this probability as low_confidence (default 0 = off)
+# Live numbers (queue depth, batch sizes, p50/p99 latency, per-stage timings) are at GET /predict/stats
+# ---------------------------
+PREDICT_TIMEOUT_S = float(os.environ.get("PREDICT_TIMEOUT_S", "30"))
+PREDICT_TOP_K = int(os.environ.get("PREDICT_TOP_K", "3"))
+PREDICT_TOP_K_MAX = max(PREDICT_TOP_K, int(os.environ.get("PREDICT_TOP_K_MAX", "5")))
+PREDICT_MIN_CONFIDENCE = float(os.environ.get("PREDICT_MIN_CONFIDENCE", "0"))
+
+# ---------------------------
+# CPU budget for forward passes (see inference_scheduler.py)
+#   INFERENCE_PRESET   "latency" (default): one batch at a time on every core
+#                      "throughput": several batches at once, each on its share of the cores
+#   INFERENCE_INTRA_THREADS / INFERENCE_INTER_THREADS / INFERENCE_MAX_CONCURRENT / INFERENCE_CPU_AFFINITY
+# The batcher runs one worker thread per forward-pass slot.
+# ---------------------------
+inference_scheduler = InferenceScheduler.from_env().apply()
+
+
+def run_predict_batch(pixel_values):
+    # One softmax over the batch logits; each caller gets its own top-k list
+    with inference_scheduler.slot():
+        started = time.perf_counter()
+        logits = backend.logits(np.stack(pixel_values))
+    tops = top_k(logits, backend.id2label, PREDICT_TOP_K_MAX)
+    stage_timings.record('infer', time.perf_counter() - started)
+    return tops
+
+
+def predict_options():
+    # ?top_k=N&min_confidence=P (query string or form fields) override the defaults per request
+    try:
+        k = int(request.values.get('top_k', PREDICT_TOP_K))
+        min_confidence = float(request.values.get('min_confidence', PREDICT_MIN_CONFIDENCE))
+    except ValueError:
+        raise ValueError('top_k must be an integer and min_confidence a number')
+    return max(1, min(k, PREDICT_TOP_K_MAX)), min(max(min_confidence, 0.0), 1.0)
+
+
+predict_batcher = MicroBatcher(
+    run_predict_batch,
+    max_batch_size=int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "8")),
+    max_wait_ms=float(os.environ.get("PREDICT_MAX_WAIT_MS", "10")),
+    max_queue=int(os.environ.get("PREDICT_MAX_QUEUE", "64")),
+    name="predict-batcher",
+    workers=inference_scheduler.max_concurrent,
+)
+
+# ---------------------------
+# Prediction cache for re-uploaded images (retries, forwarded photos)
+# Hits skip decoding, preprocessing and the model. Tune with:
+#   PREDICT_CACHE_ENTRIES    in-memory entries, 0 disables the cache (default 1024)
+#   PREDICT_CACHE_MAX_BYTES  in-memory size cap (default 8 MiB)
+#   PREDICT_CACHE_TTL_S      entry lifetime in seconds, 0 = forever (default 86400)
+#   PREDICT_CACHE_PATH       optional SQLite file so the cache survives restarts
+#   PREDICT_CACHE_DISK_ENTRIES  row cap for that file, 0 = none (default 100000)
+# ---------------------------
+prediction_cache = PredictionCache(
+    MODEL_ID,  # replaced by the loaded backend's revision before /predict serves anything
+    max_entries=int(os.environ.get("PREDICT_CACHE_ENTRIES", "1024")),
+    max_bytes=int(os.environ.get("PREDICT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get("PREDICT_CACHE_TTL_S", "86400")),
+    disk_path=os.environ.get("PREDICT_CACHE_PATH") or None,
+    max_disk_entries=int(os.environ.get("PREDICT_CACHE_DISK_ENTRIES", "100000")),
+)
+
+# ---------------------------
+# Model loading (off the import path, so login/chat routes serve immediately)
+# Same checkpoint as before. If it cannot be loaded, /predict errors gracefully.
+#   INFERENCE_BACKEND  torch (fp32, default), int8 (dynamic quantization) or onnx (ONNX Runtime)
+#   MODEL_DIR          explicit local checkpoint; otherwise the active model_registry.py snapshot,
+#                      and only if neither exists the Hugging Face hub
+#   MODEL_LOAD         "background" (default): load + warm up in a thread at startup
+#                      "lazy": load on the first /predict request
+# Load state and durations: GET /readyz (200 once ready, 503 before); liveness: GET /healthz
+# ---------------------------
+backend = None
+
+
+def on_model_ready(loaded):
+    global backend, preprocess_pool
+    preprocess_pool = PreprocessPool(
+        loaded.processor,
+        workers=int(os.environ.get("PREPROCESS_WORKERS", "0")) or None,
+        kind=os.environ.get("PREPROCESS_POOL", "thread"),
+        use_draft=os.environ.get("PREPROCESS_JPEG_DRAFT", "1") != "0",
+        timings=stage_timings,
+    )
+    prediction_cache.revision = f"{loaded.revision}+top{PREDICT_TOP_K_MAX}"
+    backend = loaded
 
-# Load model (same checkpoint). If unavailable the predict endpoint will error gracefully.
-try:
-    processor = AutoImageProcessor.from_pretrained("wambugu71/crop_leaf_diseases_vit")
-    model = AutoModelForImageClassification.from_pretrained("wambugu71/crop_leaf_diseases_vit")
-except Exception as e:
-    print("Warning: failed to load model (predict disabled):", e)
-    processor = None
-    model = None
+
+model_loader = BackgroundModelLoader(load=lambda: load_backend(**inference_scheduler.backend_kwargs()),
+                                     on_ready=on_model_ready)
+if os.environ.get("MODEL_LOAD", "background") != "lazy":
+    model_loader.start()
 
 # Helpers
 def login_required(f):
@@ -61,20 +194,23 @@ def login_required(f):
     return decorated
 
 # ---------------------------
-# In-memory per-user conversations storage (demo)
-# Structure:
-# user_conversations = {
-#   "username": {
-#       "next_id": 1,
-#       "conversations": [
-#           { "id": 1, "title": "New Chat", "created_at": 1234567890.0, "messages":[{"role":"user","message":"..."}, {"role":"bot","message":"..."}] },
-#           ...
-#       ]
-#   },
-#   ...
-# }
+# Per-user conversations storage (see conversation_store.py)
+# Indexed by conversation id: lookup/append/delete are O(1) however long the history,
+# and listing titles/previews are computed when messages are written, not on every GET.
+#   CONVERSATION_BACKEND  "memory" (default, lost on restart) or "sqlite" (durable, shared by workers)
+#   CONVERSATION_DB       SQLite file (default conversations.db)
+#   CONVERSATION_COMMIT_MS  how long SQLite writes wait to share one commit (default 5)
+# Retention keeps memory flat in long-running deployments (0 disables each limit):
+#   CONVERSATION_MAX_MESSAGES       newest messages kept per conversation (default 500, sqlite: 0)
+#   CONVERSATION_MAX_CONVERSATIONS  newest conversations kept per user (default 0, no limit)
+#   CONVERSATION_IDLE_SECONDS       memory backend: idle users are spilled to disk after this (default 0, off)
+#   CONVERSATION_SPILL_DIR          where spilled users go, gzip'd JSON (default conversation_spill/ next to
+#                                   conversation_store.py, created on the first spill)
+# Usage totals are at GET /conversations/stats; the per-user breakdown only for ADMIN_USERS
+#   ADMIN_USERS                     comma-separated usernames allowed to see other users' usage
 # ---------------------------
-user_conversations = {}
+conversation_store = open_conversation_store()
+ADMIN_USERS = {u.strip() for u in os.environ.get("ADMIN_USERS", "").split(",") if u.strip()}
 
 # ---------------------------
 # HTML templates (LOGIN + DASHBOARD)
@@ -179,7 +315,7 @@ h1{text-align:center;font-size:2.2rem;background:linear-gradient(90deg,#22c55e,#
 /* chat */
 .card{margin-top:2rem;padding:1.5rem;border-radius:20px;background:rgba(255,255,255,0.05);border:1px solid rgba(255,255,255,0.2);position:relative;}
 .chat-box{max-height:300px;overflow-y:auto;margin-top:1rem;padding:0.5rem;display:flex;flex-direction:column;gap:8px;}
-.chat-msg{padding:10px 16px;margin:10px 0;border-radius:16px;max-width:80%;font-size:0.95rem;animation:fadeIn 0.5s ease;position:relative;}
+.chat-msg{padding:10px 16px;margin:10px 0;border-radius:16px;max-width:80%;font-size:0.95rem;animation:fadeIn 0.5s ease;position:relative;white-space:pre-line;}
 .chat-user{background:linear-gradient(135deg,#22c55e,#16a34a);color:white;margin-left:auto;text-align:right;box-shadow:0 0 12px rgba(34,197,94,0.5);}
 .chat-bot{background:rgba(255,255,255,0.15);color:#f9fafb;margin-right:auto;}
 @keyframes fadeIn{from{opacity:0;transform:translateY(10px);}to{opacity:1;transform:translateY(0);}}
@@ -238,7 +374,7 @@ body.dark {
       <div class="upload-section">
         <label for="file-upload" class="upload-box">
           🌿 Drop your crop leaf image here or click to upload
-          <input id="file-upload" type="file" accept="image/*">
+          <input id="file-upload" type="file" accept="image/*,.zip" multiple>
         </label>
         <div id="preview"></div>
         <div id="result" class="prediction" style="display:none;"></div>
@@ -308,6 +444,9 @@ body.dark {
   const previewDiv = document.getElementById("preview");
   const resultDiv = document.getElementById("result");
   fileInput && fileInput.addEventListener("change", async () => {
+    if (fileInput.files.length > 1 || (fileInput.files[0] && fileInput.files[0].name.toLowerCase().endsWith('.zip'))) {
+      return predictMany([...fileInput.files]);
+    }
     const file = fileInput.files[0];
     if (!file) return;
     const reader = new FileReader();
@@ -321,11 +460,54 @@ body.dark {
     const response = await fetch("/predict", { method: "POST", body: formData });
     if (response.status === 401 || response.status === 403) { resultDiv.innerHTML = '<p>Please login to use prediction.</p>'; return; }
     const data = await response.json();
-    resultDiv.innerHTML = data.error ? `<p>Error: ${data.error}</p>` : `<h3>🩺 Prediction: ${data.prediction}</h3>`;
+    if (data.error) { resultDiv.innerHTML = `<p>Error: ${data.error}</p>`; return; }
+    const pct = (p) => (p * 100).toFixed(1) + '%';
+    const others = (data.top_k || []).slice(1).map(t => `${t.label} (${pct(t.score)})`).join(', ');
+    resultDiv.innerHTML = `<h3>🩺 Prediction: ${data.prediction} (${pct(data.confidence)})</h3>`
+      + (data.low_confidence ? '<p>⚠️ Low confidence — please verify with an expert or upload a clearer photo.</p>' : '')
+      + (others ? `<p style="opacity:0.8">Other possibilities: ${others}</p>` : '');
   });
 
+  // Several leaves (or a zip) in one request; results arrive as NDJSON lines as each image finishes
+  async function predictMany(files) {
+    previewDiv.innerHTML = '';
+    resultDiv.style.display = "block";
+    resultDiv.innerHTML = `<div class="loading"><span>🍃</span><span>🍃</span><span>🍃</span></div>`
+      + `<p>Analyzing ${files.length} upload(s)...</p><ul id="batch-results" style="text-align:left"></ul>`;
+    const formData = new FormData();
+    files.forEach(f => formData.append("files", f));
+    const response = await fetch("/predict/batch", { method: "POST", body: formData });
+    if (response.status === 401 || response.status === 403) {
+      resultDiv.innerHTML = '<p>Please login to use prediction.</p>'; return;
+    }
+    if (!response.ok) { const err = await response.json(); resultDiv.innerHTML = `<p>Error: ${err.error}</p>`; return; }
+    const list = document.getElementById('batch-results');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let nl;
+      while ((nl = buffer.indexOf('\\n')) >= 0) {
+        const line = buffer.slice(0, nl); buffer = buffer.slice(nl + 1);
+        if (!line.trim()) continue;
+        const item = JSON.parse(line);
+        if (item.done) { resultDiv.querySelector('.loading') && resultDiv.querySelector('.loading').remove(); continue; }
+        const li = document.createElement('li');
+        li.textContent = item.error ? `${item.filename}: error — ${item.error}`
+          : `${item.filename}: ${item.prediction} (${(item.confidence * 100).toFixed(1)}%)${item.low_confidence ? ' ⚠️' : ''}`;
+        list.appendChild(li);
+      }
+    }
+  }
+
   // ---------------- Conversation & Sidebar logic ----------------
   let currentConversationId = null;
+  // Messages already fetched per conversation; reopening only asks for what came after the last id
+  const conversationCache = {};
+  const PAGE_SIZE = 50;
 
   // Helper: create a new conversation (server-side)
   async function createConversation() {
@@ -339,7 +521,7 @@ body.dark {
 
   // Refresh sidebar list
   async function refreshSidebar() {
-    const res = await fetch('/conversations');
+    const res = await fetch('/conversations', { cache: 'no-cache' });  // revalidated via ETag
     if (res.status === 401) return;
     const data = await res.json(); // list of conv meta
     const list = document.getElementById('history-list');
@@ -368,6 +550,7 @@ body.dark {
         ev.stopPropagation();
         if (!confirm('Delete this conversation? This cannot be undone.')) return;
         await fetch('/conversations/' + conv.id, { method: 'DELETE' });
+        delete conversationCache[conv.id];
         if (currentConversationId === conv.id) {
           currentConversationId = null;
           document.getElementById('chat-box').innerHTML = '';
@@ -381,26 +564,63 @@ body.dark {
     });
   }
 
-  // Open a conversation (load messages)
+  function messageDiv(m) {
+    const div = document.createElement('div');
+    div.className = 'chat-msg ' + (m.role === 'user' ? 'chat-user' : 'chat-bot');
+    div.textContent = m.message;
+    return div;
+  }
+
+  function renderConversation(cached) {
+    document.getElementById('chat-title').textContent = '🍃 ' + (cached.title || 'Conversation ' + cached.id);
+    const chatBox = document.getElementById('chat-box');
+    chatBox.innerHTML = '';
+    if (cached.hasOlder) {
+      const older = document.createElement('button');
+      older.className = 'primary-btn';
+      older.textContent = 'Load older messages';
+      older.addEventListener('click', () => loadOlder(cached));
+      chatBox.appendChild(older);
+    }
+    for (const m of cached.messages) chatBox.appendChild(messageDiv(m));
+  }
+
+  // Open a conversation: latest page on first open, then only messages after the newest one we have
   async function openConversation(id) {
     currentConversationId = id;
-    const res = await fetch('/conversations/' + id);
-    if (res.status === 404) { alert('Conversation not found'); return; }
+    const cached = conversationCache[id];
+    const lastId = cached && cached.messages.length ? cached.messages[cached.messages.length - 1].id : null;
+    const url = cached ? (lastId !== null ? `/conversations/${id}?after=${lastId}` : `/conversations/${id}`)
+                       : `/conversations/${id}?limit=${PAGE_SIZE}`;
+    const res = await fetch(url);
+    if (res.status === 404) { delete conversationCache[id]; alert('Conversation not found'); return; }
     const data = await res.json();
-    // set chat title preview
-    document.getElementById('chat-title').textContent = '🍃 ' + (data.title || 'Conversation ' + data.id);
-    // render messages
-    const chatBox = document.getElementById('chat-box');
-    chatBox.innerHTML = '';
-    for (const m of data.messages) {
-      const div = document.createElement('div');
-      div.className = 'chat-msg ' + (m.role === 'user' ? 'chat-user' : 'chat-bot');
-      div.textContent = m.message;
-      chatBox.appendChild(div);
+    if (currentConversationId !== id) return;
+    if (cached) {
+      cached.title = data.title;
+      cached.messages.push(...data.messages);
+    } else {
+      conversationCache[id] = { id: data.id, title: data.title, messages: data.messages, hasOlder: data.has_more };
     }
+    renderConversation(conversationCache[id]);
+    const chatBox = document.getElementById('chat-box');
     chatBox.scrollTop = chatBox.scrollHeight;
   }
 
+  async function loadOlder(cached) {
+    const firstId = cached.messages.length ? cached.messages[0].id : null;
+    const res = await fetch(`/conversations/${cached.id}?limit=${PAGE_SIZE}` + (firstId !== null ? `&before=${firstId}` : ''));
+    if (!res.ok) return;
+    const data = await res.json();
+    cached.messages.unshift(...data.messages);
+    cached.hasOlder = data.has_more;
+    if (currentConversationId !== cached.id) return;
+    const chatBox = document.getElementById('chat-box');
+    const fromBottom = chatBox.scrollHeight - chatBox.scrollTop;
+    renderConversation(cached);
+    chatBox.scrollTop = chatBox.scrollHeight - fromBottom;  // keep the current view in place
+  }
+
   // Send message to current conversation
   async function sendMessage() {
     if (!currentConversationId) {
@@ -416,30 +636,45 @@ body.dark {
     chatBox.scrollTop = chatBox.scrollHeight;
     inputEl.value = '';
 
-    // post to server to store user msg and get bot reply
-    const res = await fetch(`/conversations/${currentConversationId}/message`, {
+    // post to server to store user msg; the bot reply streams back as Server-Sent Events
+    const res = await fetch(`/conversations/${currentConversationId}/message/stream`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ query })
     });
     if (res.status === 401) { alert('Please login'); return; }
-    const data = await res.json();
-    // show typing animation and bot reply
+    if (!res.ok) { alert('Could not send message'); return; }
     const botDiv = document.createElement('div');
     botDiv.className = 'chat-msg chat-bot';
+    botDiv.textContent = '…';
     chatBox.appendChild(botDiv);
-    let i = 0;
-    const text = data.response;
-    const typing = setInterval(() => {
-      botDiv.textContent = text.slice(0, i++);
-      if (i > text.length) {
-        clearInterval(typing);
-        const randomLeaf = leafEmojis[Math.floor(Math.random() * leafEmojis.length)];
-        botDiv.textContent += ' ' + randomLeaf;
-        createLeaf();
+    let text = '';
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let sep;
+      while ((sep = buffer.indexOf('\\n\\n')) >= 0) {
+        const block = buffer.slice(0, sep); buffer = buffer.slice(sep + 2);
+        let event = 'message', data = '';
+        for (const line of block.split('\\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        if (event === 'chunk') {
+          text += JSON.parse(data).text;
+          botDiv.textContent = text;
+        } else if (event === 'done') {
+          const randomLeaf = leafEmojis[Math.floor(Math.random() * leafEmojis.length)];
+          botDiv.textContent = JSON.parse(data).response + ' ' + randomLeaf;
+          createLeaf();
+        }
+        chatBox.scrollTop = chatBox.scrollHeight;
       }
-      chatBox.scrollTop = chatBox.scrollHeight;
-    }, 18);
+    }
 
     // refresh sidebar
     await refreshSidebar();
@@ -478,94 +713,136 @@ body.dark {
 
 # ---------------------------
 # Server routes for conversations
+# - GET /conversations/<cid> and /history take ?limit=&before=&after=&since= (see conversation_store.py);
+#   without them the whole conversation is returned as before
+# - GET responses carry an ETag; a matching If-None-Match gets 304 with no body
 # ---------------------------
+CONVERSATION_PAGE_MAX = int(os.environ.get("CONVERSATION_PAGE_MAX", "500"))
+
+
+def paging_args():
+    # Raises ValueError on malformed parameters
+    args = request.args
+    paging = {}
+    if args.get('limit'):
+        paging['limit'] = max(1, min(int(args['limit']), CONVERSATION_PAGE_MAX))
+    for name in ('before', 'after'):
+        if args.get(name):
+            paging[name] = int(args[name])
+    if args.get('since'):
+        paging['since'] = float(args['since'])
+    return paging
+
+
+def conditional_json(payload, headers=None):
+    resp = jsonify(payload)
+    if headers:
+        resp.headers.update(headers)
+    resp.add_etag()
+    resp.headers['Cache-Control'] = 'private, no-cache'  # browsers revalidate with If-None-Match
+    return resp.make_conditional(request)
 
-def ensure_user_store(username):
-    # Create user store if missing
-    if username not in user_conversations:
-        user_conversations[username] = {"next_id": 1, "conversations": []}
 
 @app.route('/conversations', methods=['GET', 'POST'])
 @login_required
 def conversations():
     user = session.get('user')
-    ensure_user_store(user)
-    store = user_conversations[user]
     if request.method == 'GET':
         # return list of conversations with preview metadata
-        out = []
-        for conv in store['conversations']:
-            preview = ''
-            # pick first user message as preview if available, else first bot
-            for m in conv['messages']:
-                preview = m['message']
-                break
-            out.append({
-                "id": conv['id'],
-                "title": conv.get('title') or (preview[:60] if preview else f"Chat {conv['id']}"),
-                "preview": preview[:120] if preview else ""
-            })
-        return jsonify(out)
+        return conditional_json(conversation_store.list_conversations(user))
     else:
         # create new conversation
-        cid = store['next_id']
-        store['next_id'] += 1
-        conv = {"id": cid, "title": "New Chat", "created_at": time.time(), "messages": []}
-        store['conversations'].append(conv)
-        return jsonify({"id": cid, "title": conv['title']}), 201
+        return jsonify(conversation_store.create_conversation(user)), 201
+
+
+@app.route('/conversations/stats', methods=['GET'])
+@login_required
+def conversation_stats():
+    if session.get('user') in ADMIN_USERS:
+        return jsonify(conversation_store.memory_report(top=request.args.get('top', 20, type=int)))
+    report = conversation_store.memory_report(top=0)
+    report.pop('users', None)
+    return jsonify(report)
 
 @app.route('/conversations/<int:cid>', methods=['GET', 'DELETE'])
 @login_required
 def conversation_get_delete(cid):
     user = session.get('user')
-    ensure_user_store(user)
-    store = user_conversations[user]
-    conv = next((c for c in store['conversations'] if c['id'] == cid), None)
-    if conv is None:
-        return jsonify({"error": "not found"}), 404
     if request.method == 'GET':
-        return jsonify({"id": conv['id'], "title": conv.get('title'), "messages": conv['messages']})
+        try:
+            paging = paging_args()
+        except ValueError:
+            return jsonify({"error": "limit/before/after must be integers, since a timestamp"}), 400
+        conv = conversation_store.get_conversation(user, cid, **paging)
+        if conv is None:
+            return jsonify({"error": "not found"}), 404
+        return conditional_json(conv)
     else:
         # delete conversation
-        store['conversations'] = [c for c in store['conversations'] if c['id'] != cid]
+        if not conversation_store.delete_conversation(user, cid):
+            return jsonify({"error": "not found"}), 404
         return jsonify({'status': 'deleted'})
 
 @app.route('/conversations/<int:cid>/message', methods=['POST'])
 @login_required
 def conversation_message(cid):
     user = session.get('user')
-    ensure_user_store(user)
-    store = user_conversations[user]
-    conv = next((c for c in store['conversations'] if c['id'] == cid), None)
-    if conv is None:
-        return jsonify({"error": "conversation not found"}), 404
     data = request.get_json() or {}
     query = (data.get('query') or '').strip()
     if not query:
         return jsonify({"error": "no query provided"}), 400
 
-    # Append user message
-    conv['messages'].append({"role": "user", "message": query, "ts": time.time()})
-    # Optionally update title to first user message
-    if conv.get('title') == "New Chat":
-        conv['title'] = query if len(query) <= 60 else query[:57] + "..."
-
-    # Generate response using knowledge base (same logic as before)
-    q_lower = query.lower()
-    response = "Sorry, I couldn't find information. Please ask about corn, potato, rice, or wheat diseases."
-    for crop, diseases in knowledge_base.items():
-        if crop in q_lower:
-            for disease, info in diseases.items():
-                if disease in q_lower:
-                    response = f"🌱 {crop.capitalize()} - {disease.capitalize()}: {info}"
-                    break
-            else:
-                response = f"🌱 {crop.capitalize()} Info: {', '.join(diseases.keys())}"
-            break
+    # Append user message (the store also turns the first one into the title)
+    if conversation_store.append_message(user, cid, "user", query) is None:
+        return jsonify({"error": "conversation not found"}), 404
+
+    # Generate response using knowledge base
+    response = kb_reply(query)
 
     # Append bot response
-    conv['messages'].append({"role": "bot", "message": response, "ts": time.time()})
-    return jsonify({"response": response})
+    bot = conversation_store.append_message(user, cid, "bot", response)
+    return jsonify({"response": response, "id": bot["id"] if bot else None})
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/conversations/<int:cid>/message/stream', methods=['POST'])
+@login_required
+def conversation_message_stream(cid):
+    # Same as /message, as Server-Sent Events: "start" right away, a "chunk" per reply part as it is
+    # produced, then "done" once the full reply has been saved. The reply is saved even if the
+    # client disconnects halfway, so the conversation never ends on an unanswered question.
+    user = session.get('user')
+    data = request.get_json() or {}
+    query = (data.get('query') or '').strip()
+    if not query:
+        return jsonify({"error": "no query provided"}), 400
+    user_msg = conversation_store.append_message(user, cid, "user", query)
+    if user_msg is None:
+        return jsonify({"error": "conversation not found"}), 404
+
+    def generate():
+        parts = []
+        source = kb_reply_parts(query)
+        saved = False
+        try:
+            yield sse("start", {"conversation_id": cid, "user_message_id": user_msg["id"]})
+            for part in source:
+                parts.append(part)
+                yield sse("chunk", {"text": part if len(parts) == 1 else "\n" + part})
+            response = "\n".join(parts)
+            bot = conversation_store.append_message(user, cid, "bot", response)
+            saved = True
+            yield sse("done", {"id": bot["id"] if bot else None, "response": response})
+        finally:
+            if not saved:
+                parts.extend(source)
+                conversation_store.append_message(user, cid, "bot", "\n".join(parts))
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # no proxy buffering
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
 
 # ---------------------------
 # Legacy endpoints kept for compatibility (optional)
@@ -573,14 +850,15 @@ def conversation_message(cid):
 @app.route('/history', methods=['GET'])
 @login_required
 def history_all():
-    # return full flattened messages of the last conversation for compatibility
-    user = session.get('user')
-    ensure_user_store(user)
-    store = user_conversations[user]
-    if not store['conversations']:
-        return jsonify([])
-    # return messages of last conv
-    return jsonify(store['conversations'][-1]['messages'])
+    # return flattened messages of the last conversation for compatibility (still a bare list;
+    # whether a page was cut short is reported in the X-Has-More header)
+    try:
+        paging = paging_args()
+    except ValueError:
+        return jsonify({"error": "limit/before/after must be integers, since a timestamp"}), 400
+    conv = conversation_store.last_conversation(session.get('user'), **paging)
+    has_more = bool(conv and conv['has_more'])
+    return conditional_json(conv['messages'] if conv else [], {'X-Has-More': 'true' if has_more else 'false'})
 
 # ---------------------------
 # Other original routes: index, login, logout, predict
@@ -600,18 +878,9 @@ def login():
         password = request.form.get('password','')
         if username == DEMO_USER and hashlib.sha256(password.encode()).hexdigest() == DEMO_PASS_HASH:
             session['user'] = username
-            # ensure user conversations
-            ensure_user_store(username)
             # if user has no conversations, auto-create one
-            if not user_conversations[username]['conversations']:
-                # create initial conversation
-                user_conversations[username]['conversations'].append({
-                    "id": user_conversations[username]['next_id'],
-                    "title": "New Chat",
-                    "created_at": time.time(),
-                    "messages": []
-                })
-                user_conversations[username]['next_id'] += 1
+            if not conversation_store.has_conversations(username):
+                conversation_store.create_conversation(username)
             return redirect(url_for('index'))
         return Response(LOGIN_HTML + '<script>alert("Invalid credentials")</script>', mimetype='text/html')
     return Response(LOGIN_HTML, mimetype='text/html')
@@ -624,26 +893,257 @@ def logout():
 @app.route('/predict', methods=['POST'])
 @login_required
 def predict():
-    if model is None or processor is None:
-        return jsonify({'error':'model not loaded'}), 500
+    if model_loader.wait(timeout=PREDICT_TIMEOUT_S) is None:
+        if model_loader.state == 'failed':
+            return jsonify({'error': f'model not loaded: {model_loader.error}'}), 500
+        return jsonify({'error': 'model is still loading, retry shortly'}), 503, {'Retry-After': '5'}
     file = request.files.get('file')
     if not file:
         return jsonify({'error':'no file'}), 400
     try:
-        image = Image.open(file.stream).convert('RGB')
-        inputs = processor(images=image, return_tensors='pt')
-        with torch.no_grad():
-            outputs = model(**inputs)
-        logits = outputs.logits
-        predicted_class_id = logits.argmax(-1).item()
-        label = model.config.id2label[predicted_class_id].lower()
-        return jsonify({'prediction': label})
+        k, min_confidence = predict_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        started = time.perf_counter()
+        top = predict_future(file.read()).result(timeout=PREDICT_TIMEOUT_S)
+        stage_timings.record('request', time.perf_counter() - started)
+        return jsonify(prediction_result(top, k, min_confidence))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except FuturesTimeoutError:
+        return jsonify({'error': 'prediction timed out'}), 504
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+# ---------------------------
+# Multi-image diagnosis: POST /predict/batch
+# Accepts many multipart files (any field name) and/or .zip archives of images.
+# Cache hits are answered first, the rest are decoded concurrently and then enqueued
+# as one group on the micro-batcher, so they run as full batched forward passes
+# (PREDICT_MAX_BATCH_SIZE images per pass). Results stream back as NDJSON, one line
+# per image in completion order, then a summary line.
+#   PREDICT_BATCH_MAX_FILES  images per request (default 64, at most PREDICT_MAX_QUEUE)
+# When /predict traffic already fills part of the queue, the batch is admitted in chunks as
+# space frees up, waiting until the request deadline before failing the images left over.
+#   PREDICT_BATCH_MAX_BYTES  total image bytes per request, after unzipping (default 64 MiB)
+# ---------------------------
+PREDICT_BATCH_MAX_FILES = int(os.environ.get("PREDICT_BATCH_MAX_FILES", "64"))
+if PREDICT_BATCH_MAX_FILES > predict_batcher.max_queue:
+    raise RuntimeError(f"PREDICT_BATCH_MAX_FILES ({PREDICT_BATCH_MAX_FILES}) must not exceed "
+                       f"PREDICT_MAX_QUEUE ({predict_batcher.max_queue})")
+PREDICT_BATCH_MAX_BYTES = int(os.environ.get("PREDICT_BATCH_MAX_BYTES", str(64 * 1024 * 1024)))
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+
+class BatchLimitError(ValueError):
+    pass
+
+
+class BatchUploads:
+    # [(filename, bytes)] gathered from the request, enforcing file-count and byte limits before reading more
+    def __init__(self):
+        self.items = []
+        self.total = 0
+
+    def add(self, name, size, read):
+        if len(self.items) >= PREDICT_BATCH_MAX_FILES:
+            raise BatchLimitError(f'too many images (max {PREDICT_BATCH_MAX_FILES})')
+        if self.total + size > PREDICT_BATCH_MAX_BYTES:
+            raise BatchLimitError(f'upload too large (max {PREDICT_BATCH_MAX_BYTES} bytes of images)')
+        data = read()
+        if len(data) > size:
+            raise BatchLimitError(f'{name}: larger than its declared {size} bytes')
+        if self.total + len(data) > PREDICT_BATCH_MAX_BYTES:
+            raise BatchLimitError(f'upload too large (max {PREDICT_BATCH_MAX_BYTES} bytes of images)')
+        self.total += len(data)
+        self.items.append((name, data))
+
+    def add_zip(self, name, stream):
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            raise BatchLimitError(f'{name}: not a valid zip archive')
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(IMAGE_SUFFIXES):
+                    continue
+                # info.file_size is checked before inflating; one byte past it is enough to catch a lie
+                try:
+                    self.add(f'{name}/{info.filename}', info.file_size,
+                             lambda info=info: archive.open(info).read(info.file_size + 1))
+                except (zipfile.BadZipFile, zlib.error) as e:
+                    raise BatchLimitError(f'{name}/{info.filename}: {e}')
+
+    def add_upload(self, upload):
+        name = upload.filename or 'upload'
+        head = upload.stream.read(4)
+        upload.stream.seek(0)
+        if name.lower().endswith('.zip') or head == b'PK\x03\x04':
+            return self.add_zip(name, upload.stream)
+        upload.stream.seek(0, os.SEEK_END)
+        size = upload.stream.tell()
+        upload.stream.seek(0)
+        self.add(name, size, upload.read)
+
+
+def collect_batch_uploads():
+    uploads = BatchUploads()
+    for storage in request.files.listvalues():
+        for upload in storage:
+            uploads.add_upload(upload)
+    return uploads.items
+
+
+def predict_future(data):
+    # cache -> preprocess pool -> micro-batcher, chained without blocking the request thread
+    out = Future()
+    cache_key = prediction_cache.key_for(data)
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        out.set_result(cached)
+        return out
+
+    def on_batched(fut):
+        try:
+            top = fut.result()
+            prediction_cache.put(cache_key, top)
+            out.set_result(top)
+        except Exception as e:
+            out.set_exception(e)
+
+    def on_preprocessed(fut):
+        try:
+            pixel_values, _ = fut.result()
+            predict_batcher.submit_async(pixel_values).add_done_callback(on_batched)
+        except Exception as e:
+            out.set_exception(e)
+
+    preprocess_pool.submit(data).add_done_callback(on_preprocessed)
+    return out
+
+
+def finish_by(futures, deadline, describe):
+    # Yield (entry, result, error) as futures complete; stragglers past the deadline time out
+    pending = set(futures)
+    try:
+        for fut in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+            pending.discard(fut)
+            try:
+                yield futures[fut], fut.result(), None
+            except Exception as e:
+                yield futures[fut], None, e
+    except FuturesTimeoutError:
+        for fut in sorted(pending, key=lambda f: futures[f][0]):
+            yield futures[fut], None, TimeoutError(f'{describe} timed out')
+
+
+class BatchDiagnosis:
+    # One /predict/batch request: cache hits first, then decoding, then batched inference, as NDJSON lines
+    def __init__(self, items, k, min_confidence):
+        self.items = items
+        self.k = k
+        self.min_confidence = min_confidence
+        self.started = time.perf_counter()
+        self.deadline = time.monotonic() + PREDICT_TIMEOUT_S
+        self.errors = 0
+        self.cached, self.preprocessing = [], {}
+        for index, (name, data) in enumerate(items):
+            cache_key = prediction_cache.key_for(data)
+            top = prediction_cache.get(cache_key)
+            if top is not None:
+                self.cached.append((index, name, top))
+            else:
+                self.preprocessing[preprocess_pool.submit(data)] = (index, name, cache_key)
+
+    def line(self, index, name, top=None, error=None):
+        line = {'index': index, 'filename': name}
+        if error is not None:
+            self.errors += 1
+            line['error'] = str(error) or type(error).__name__
+        else:
+            line.update(prediction_result(top, self.k, self.min_confidence))
+        return json.dumps(line) + '\n'
+
+    def generate(self):
+        for index, name, top in self.cached:
+            yield self.line(index, name, top)
+
+        decoded = []
+        for (index, name, cache_key), result, error in finish_by(self.preprocessing, self.deadline, 'decoding'):
+            if error is not None:
+                yield self.line(index, name, error=error)
+            else:
+                decoded.append((index, name, cache_key, result[0]))
+        if decoded:
+            yield from self.predict(decoded)
+
+        stage_timings.record('batch_request', time.perf_counter() - self.started)
+        yield json.dumps({'done': True, 'count': len(self.items), 'errors': self.errors,
+                          'elapsed_ms': round((time.perf_counter() - self.started) * 1000.0, 3)}) + '\n'
+
+    def predict(self, decoded):
+        batch_futures = predict_batcher.submit_many((entry[3] for entry in decoded),
+                                                    timeout=max(0.0, self.deadline - time.monotonic()))
+        by_future = {fut: entry[:3] for fut, entry in zip(batch_futures, decoded)}
+        for (index, name, cache_key), top, error in finish_by(by_future, self.deadline, 'prediction'):
+            if error is None:
+                prediction_cache.put(cache_key, top)
+            yield self.line(index, name, top, error)
+
+
+@app.route('/predict/batch', methods=['POST'])
+@login_required
+def predict_batch():
+    if request.content_length and request.content_length > PREDICT_BATCH_MAX_BYTES + 1024 * 1024:
+        return jsonify({'error': f'upload too large (max {PREDICT_BATCH_MAX_BYTES} bytes of images)'}), 413
+    try:
+        k, min_confidence = predict_options()
+        items = collect_batch_uploads()
+    except BatchLimitError as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not items:
+        return jsonify({'error': 'no image files'}), 400
+    if model_loader.wait(timeout=PREDICT_TIMEOUT_S) is None:
+        if model_loader.state == 'failed':
+            return jsonify({'error': f'model not loaded: {model_loader.error}'}), 500
+        return jsonify({'error': 'model is still loading, retry shortly'}), 503, {'Retry-After': '5'}
+    return Response(stream_with_context(BatchDiagnosis(items, k, min_confidence).generate()),
+                    mimetype='application/x-ndjson')
+
+
+@app.route('/predict/stats', methods=['GET'])
+@login_required
+def predict_stats():
+    return jsonify({"batcher": predict_batcher.stats(), "cache": prediction_cache.stats(),
+                    "stages": stage_timings.stats(), "scheduler": inference_scheduler.stats()})
+
+
+# ---------------------------
+# Health / readiness probes (no login, for load balancers and orchestrators)
+# ---------------------------
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok", "uptime_seconds": round(time.time() - APP_STARTED_AT, 3)})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    status = model_loader.status()
+    status["uptime_seconds"] = round(time.time() - APP_STARTED_AT, 3)
+    status["pid"] = os.getpid()  # which worker answered, when pre-forked (gunicorn.conf.py)
+    status["knowledge_base"] = kb_store.status()
+    return jsonify(status), (200 if model_loader.ready else 503)
+
 # ---------------------------
 # Run
+# Development server only; for real traffic serve wsgi:app (waitress/gunicorn) or asgi:app
+# (uvicorn), see wsgi.py. FLASK_DEBUG=1 turns on the debugger and reloader here.
 # ---------------------------
 if __name__ == '__main__':
-    print("Starting KrishiSevak app on http://127.0.0.1:5000")
-    app.run(debug=True)
+    debug = os.environ.get("FLASK_DEBUG", "0") == "1"
+    print("Starting KrishiSevak app on http://127.0.0.1:5000" + (" (debug)" if debug else ""))
+    app.run(debug=debug, threaded=True)
@@ -1,51 +1,50 @@
+import os
+
 import streamlit as st
-from transformers import AutoImageProcessor, AutoModelForImageClassification
 from PIL import Image
-import torch
+
+from inference_backends import load_backend, warm_up
+from inference_scheduler import InferenceScheduler
+from kb_retrieval import answer
+from knowledge_base import KnowledgeBaseStore
+
 
 # ---------------------------
-# Knowledge Base
+# Knowledge Base (knowledge_base.json, see knowledge_base.py)
+# The store lives for the whole server process, not one Streamlit rerun; every rerun takes
+# its current snapshot, which picks up edits to the file without a restart.
+# KB_EXTRA_PATH adds entries (JSON) to the retrieval index used for questions that name no disease.
 # ---------------------------
-knowledge_base = {
-    "corn": {
-        "common rust": "Cause: Fungus (Puccinia sorghi). Symptoms: reddish-brown pustules on leaves. Control: resistant varieties, fungicides.",
-        "gray leaf spot": "Cause: Fungus (Cercospora zeae-maydis). Symptoms: gray rectangular lesions. Control: resistant hybrids, fungicides.",
-        "leaf blight": "Cause: Fungus (Exserohilum turcicum). Symptoms: cigar-shaped lesions. Control: resistant hybrids, fungicides.",
-        "healthy": "Green leaves, no lesions, normal growth."
-    },
-    "potato": {
-        "early blight": "Cause: Fungus (Alternaria solani). Symptoms: concentric dark spots. Control: crop rotation, fungicides.",
-        "late blight": "Cause: Oomycete (Phytophthora infestans). Symptoms: water-soaked lesions, white mold. Control: resistant varieties, fungicides.",
-        "healthy": "Green leaves, no dark spots."
-    },
-    "rice": {
-        "brown spot": "Cause: Fungus (Bipolaris oryzae). Symptoms: brown circular spots with yellow halo. Control: seed treatment, fungicides.",
-        "hispa": "Cause: Insect (Dicladispa armigera). Symptoms: scraping on leaves, small holes. Control: insecticides, resistant varieties.",
-        "leaf blast": "Cause: Fungus (Magnaporthe oryzae). Symptoms: diamond-shaped lesions. Control: resistant varieties, fungicides.",
-        "healthy": "No lesions, normal green leaves."
-    },
-    "wheat": {
-        "brown rust": "Cause: Fungus (Puccinia triticina). Symptoms: orange-brown pustules. Control: resistant varieties, fungicides.",
-        "yellow rust": "Cause: Fungus (Puccinia striiformis). Symptoms: yellow stripes of pustules. Control: resistant varieties, fungicides.",
-        "healthy": "Uniform green leaves, no pustules."
-    }
-}
+@st.cache_resource
+def load_kb_store():
+    return KnowledgeBaseStore(extra_path=os.environ.get("KB_EXTRA_PATH"))
+
+
+kb = load_kb_store().current()
+KB_MIN_SCORE = float(os.environ.get("KB_MIN_SCORE", "0.25"))
+
 
 # ---------------------------
 # Load Model with Caching and Spinner
 # ---------------------------
+# INFERENCE_BACKEND picks torch (fp32, default), int8 (dynamic quantization) or onnx (ONNX Runtime)
+# Every browser session runs its own script thread; the scheduler (INFERENCE_PRESET etc., see
+# inference_scheduler.py) caps how many of them run a forward pass at once and on how many threads.
+@st.cache_resource
+def load_scheduler():
+    return InferenceScheduler.from_env().apply()
+
+
 @st.cache_resource
 def load_model():
-    processor = AutoImageProcessor.from_pretrained(
-        "wambugu71/crop_leaf_diseases_vit", use_fast=True
-    )
-    model = AutoModelForImageClassification.from_pretrained(
-        "wambugu71/crop_leaf_diseases_vit"
-    )
-    return processor, model
+    backend = load_backend(**scheduler.backend_kwargs())
+    warm_up(backend)
+    return backend
+
 
+scheduler = load_scheduler()
 with st.spinner("Loading model... this may take 10-20 seconds"):
-    processor, model = load_model()
+    backend = load_model()
 
 # ---------------------------
 # Streamlit UI
@@ -63,36 +62,31 @@ if uploaded_file is not None:
 
     with st.spinner("Predicting disease..."):
         # Prediction
-        inputs = processor(images=image, return_tensors="pt")
-        with torch.no_grad():
-            outputs = model(**inputs)
+        inputs = backend.processor(images=image.convert("RGB"), return_tensors="np")
+        with scheduler.slot():
+            logits = backend.logits(inputs["pixel_values"])
 
-        logits = outputs.logits
-        predicted_class_id = logits.argmax(-1).item()
-        detected_label = model.config.id2label[predicted_class_id].lower()
+        predicted_class_id = int(logits.argmax(-1)[0])
+        detected_label = backend.id2label[predicted_class_id].lower()
 
     st.success(f"✅ Detected class: {detected_label.capitalize()}")
 
-    # Give quick info if available
-    for crop, diseases in knowledge_base.items():
-        if detected_label in diseases:
-            st.info(f"ℹ️ {crop.capitalize()} - {detected_label.capitalize()}: {diseases[detected_label]}")
-            break
+    # Give quick info if available (class id -> entry map is built once per model and KB version)
+    entry = kb.class_entries(backend.id2label).get(predicted_class_id)
+    if entry is not None:
+        st.info(f"ℹ️ {entry['crop'].capitalize()} - {entry['disease'].capitalize()}: {entry['info']}")
 
 # --- Chatbot ---
 st.subheader("💬 Chat with Crop Bot")
 user_input = st.text_input("Ask about a crop or disease:")
 
 if user_input:
-    query = user_input.lower()
     response = "❌ Sorry, I don’t have info on that. Try asking about Corn, Potato, Rice, or Wheat."
-    for crop, diseases in knowledge_base.items():
-        if crop in query:
-            for disease, info in diseases.items():
-                if disease in query:
-                    response = f"🌱 {crop.capitalize()} - {disease.capitalize()}:\n{info}"
-                    break
-            else:
-                response = f"I know about these {crop} diseases: {', '.join(diseases.keys())}"
-            break
+    hits = answer(kb.matcher, kb.index, user_input, min_score=KB_MIN_SCORE)
+    if hits:
+        response = "\n\n".join(
+            f"🌱 {h['crop'].capitalize()} - {h['disease'].capitalize()}:\n{h['info']}" if h["disease"]
+            else f"I know about these {h['crop']} diseases: {', '.join(kb.diseases[h['crop']].keys())}"
+            for h in hits
+        )
     st.text_area("Bot:", value=response, height=150)
@@ -0,0 +1,92 @@
+# check_backend_parity.py
+"""
+Compare inference backends against the fp32 PyTorch model on a local image folder.
+
+Usage:
+    python check_backend_parity.py leaves/ --backends int8 onnx
+    python check_backend_parity.py leaves/ --backends int8 --limit 500 --min-agreement 0.99
+
+For each backend this reports top-1 agreement with fp32, mean/max absolute
+probability difference and images/sec. Exits non-zero if any backend falls
+below --min-agreement, so it can gate a switch of INFERENCE_BACKEND.
+Every backend gets the same thread budget (INFERENCE_* env vars, see inference_scheduler.py),
+so the images/sec columns compare like with like.
+"""
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from image_detection_model import iter_inputs
+from inference_backends import MODEL_ID, BACKENDS, load_backend, softmax
+from inference_scheduler import InferenceScheduler
+from preprocessing import PreprocessPool
+
+
+def load_pixels(processor, inputs, limit, batch_size):
+    # Preprocess once and reuse the same tensors for every backend
+    paths = itertools.islice(iter_inputs(inputs), limit) if limit else iter_inputs(inputs)
+    batches, batch, names = [], [], []
+    with PreprocessPool(processor) as pool:
+        for path, pixel_values, _, error in pool.map_ordered(paths):
+            if error is not None:
+                print(f"skipping {path}: {error}", file=sys.stderr)
+                continue
+            names.append(path)
+            batch.append(pixel_values)
+            if len(batch) == batch_size:
+                batches.append(np.stack(batch))
+                batch = []
+    if batch:
+        batches.append(np.stack(batch))
+    return names, batches
+
+
+def run_backend(backend, batches):
+    started = time.perf_counter()
+    probs = np.concatenate([softmax(backend.logits(b)) for b in batches])
+    return probs, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Top-1 parity check of inference backends against fp32 PyTorch.")
+    parser.add_argument("inputs", nargs="+", help="image files, directories, glob patterns or manifest files")
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"], choices=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--model", default=MODEL_ID, help="model id or local directory")
+    parser.add_argument("--limit", type=int, default=0, help="max images to compare (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="fail below this top-1 agreement")
+    args = parser.parse_args(argv)
+
+    scheduler = InferenceScheduler.from_env().apply()
+    reference = load_backend("torch", args.model)
+    names, batches = load_pixels(reference.processor, args.inputs, args.limit, args.batch_size)
+    if not names:
+        print("No images found", file=sys.stderr)
+        return 2
+    ref_probs, ref_seconds = run_backend(reference, batches)
+    ref_top1 = ref_probs.argmax(-1)
+    print(f"{len(names)} images, reference torch fp32: {len(names) / ref_seconds:.1f} images/sec "
+          f"(load {reference.load_seconds:.1f}s)")
+
+    failed = False
+    for name in args.backends:
+        backend = load_backend(name, args.model, **scheduler.backend_kwargs())
+        probs, seconds = run_backend(backend, batches)
+        top1 = probs.argmax(-1)
+        agreement = float((top1 == ref_top1).mean())
+        diff = np.abs(probs - ref_probs)
+        print(f"{name:>5}: top-1 agreement {agreement:.4f} ({int((top1 != ref_top1).sum())} differ), "
+              f"prob diff mean {diff.mean():.5f} max {diff.max():.5f}, "
+              f"{len(names) / seconds:.1f} images/sec ({ref_seconds / seconds:.2f}x), load {backend.load_seconds:.1f}s")
+        for idx in np.nonzero(top1 != ref_top1)[0][:10]:
+            print(f"       {names[idx]}: fp32 {reference.id2label[int(ref_top1[idx])]} -> "
+                  f"{name} {backend.id2label[int(top1[idx])]}")
+        failed = failed or agreement < args.min_agreement
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,634 @@
+# conversation_store.py
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+# ---------------------------
+# Per-user conversation storage
+# Every backend implements the same methods, so the Flask routes never touch
+# the underlying structure:
+#   list_conversations(user)             -> [{"id", "title", "preview"}] oldest first
+#   create_conversation(user, title)     -> {"id", "title"}
+#   get_conversation(user, cid, ...)     -> {"id", "title", "messages": [...], "has_more"} or None
+#   delete_conversation(user, cid)       -> True if it existed
+#   append_message(user, cid, role, msg) -> message dict, or None if the conversation is missing
+#   last_conversation(user, ...)         -> same as get_conversation for the newest one, or None
+#   has_conversations(user)              -> bool
+#   memory_report(top=20)                -> {"users": [...largest first], ...}
+#
+# Messages carry an "id" that only grows within a conversation, which is what the
+# paging arguments of get_conversation/last_conversation work with:
+#   limit   at most this many messages (None = all)
+#   before  only messages with id < before; with limit, the newest such messages
+#   after   only messages with id > after; with limit, the oldest such messages
+#   since   only messages with ts > since (incremental "what's new" fetch)
+# has_more says whether more messages exist beyond the returned page in the paging direction.
+# ---------------------------
+
+DEFAULT_TITLE = "New Chat"
+DEFAULT_SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversation_spill")
+
+
+def title_from_query(query):
+    return query if len(query) <= 60 else query[:57] + "..."
+
+
+def list_entry(cid, title, preview):
+    # Listing metadata exactly as GET /conversations has always shown it
+    return {
+        "id": cid,
+        "title": title or (preview[:60] if preview else f"Chat {cid}"),
+        "preview": preview[:120] if preview else "",
+    }
+
+
+def forward_paging(after, since):
+    return after is not None or since is not None
+
+
+# ---------------------------
+# Retention: keeps a long-running process from growing without bound
+# - max_messages: oldest messages of a conversation are dropped past this many
+# - max_conversations: oldest conversations of a user are dropped past this many
+# - idle_seconds: users untouched this long are spilled to gzip'd JSON in spill_dir
+#   and dropped from RAM; the next request for them reloads the file (memory backend only)
+# 0 disables a limit. from_env only caps messages per conversation by default, and only for the
+# memory backend; dropping whole conversations or spilling to disk is always opt-in.
+# After a message trim the preview moves to the oldest kept message; the title is kept.
+# ---------------------------
+class RetentionPolicy:
+    __slots__ = ("max_messages", "max_conversations", "idle_seconds", "spill_dir")
+
+    def __init__(self, max_messages=0, max_conversations=0, idle_seconds=0, spill_dir=DEFAULT_SPILL_DIR):
+        self.max_messages = max_messages
+        self.max_conversations = max_conversations
+        self.idle_seconds = idle_seconds
+        self.spill_dir = spill_dir
+
+    @classmethod
+    def from_env(cls, backend="memory"):
+        in_memory = backend == "memory"
+        return cls(
+            max_messages=int(os.environ.get("CONVERSATION_MAX_MESSAGES", "500" if in_memory else "0")),
+            max_conversations=int(os.environ.get("CONVERSATION_MAX_CONVERSATIONS", "0")),
+            idle_seconds=float(os.environ.get("CONVERSATION_IDLE_SECONDS", "0")),
+            spill_dir=os.environ.get("CONVERSATION_SPILL_DIR") or DEFAULT_SPILL_DIR,
+        )
+
+
+NO_RETENTION = RetentionPolicy()
+
+
+class Message:
+    __slots__ = ("id", "role", "message", "ts")
+
+    def __init__(self, mid, role, message, ts):
+        self.id = mid
+        self.role = role
+        self.message = message
+        self.ts = ts
+
+    def to_dict(self):
+        return {"id": self.id, "role": self.role, "message": self.message, "ts": self.ts}
+
+
+class Conversation:
+    __slots__ = ("id", "title", "created_at", "messages", "preview", "next_message_id")
+
+    def __init__(self, cid, title, created_at):
+        self.id = cid
+        self.title = title
+        self.created_at = created_at
+        self.messages = []  # ordered by Message.id
+        self.preview = ""  # first message, set once on write instead of rescanned on every listing
+        self.next_message_id = 1
+
+    def page(self, limit=None, before=None, after=None, since=None):
+        # Binary search on id/ts instead of scanning, then slice
+        msgs = self.messages
+        lo, hi = 0, len(msgs)
+        if after is not None:
+            lo = bisect.bisect_right(msgs, after, key=lambda m: m.id)
+        if since is not None:
+            lo = max(lo, bisect.bisect_right(msgs, since, key=lambda m: m.ts))
+        if before is not None:
+            hi = bisect.bisect_left(msgs, before, lo=lo, key=lambda m: m.id)
+        hi = max(lo, hi)
+        has_more = False
+        if limit is not None and hi - lo > limit:
+            has_more = True
+            if forward_paging(after, since):
+                hi = lo + limit
+            else:
+                lo = hi - limit
+        return [m.to_dict() for m in msgs[lo:hi]], has_more
+
+    def to_dict(self, **paging):
+        messages, has_more = self.page(**paging)
+        return {"id": self.id, "title": self.title, "messages": messages, "has_more": has_more}
+
+
+class UserConversations:
+    __slots__ = ("next_id", "conversations", "last_access")
+
+    def __init__(self):
+        self.next_id = 1
+        self.conversations = {}  # id -> Conversation; dicts keep insertion order, so oldest first
+        self.last_access = time.monotonic()
+
+    def to_json(self):
+        return {
+            "next_id": self.next_id,
+            "conversations": [
+                {"id": c.id, "title": c.title, "created_at": c.created_at, "preview": c.preview,
+                 "next_message_id": c.next_message_id,
+                 "messages": [[m.id, m.role, m.message, m.ts] for m in c.messages]}
+                for c in self.conversations.values()
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        store = cls()
+        store.next_id = data["next_id"]
+        for c in data["conversations"]:
+            conv = Conversation(c["id"], c["title"], c["created_at"])
+            conv.preview = c["preview"]
+            conv.next_message_id = c["next_message_id"]
+            conv.messages = [Message(*m) for m in c["messages"]]
+            store.conversations[conv.id] = conv
+        return store
+
+    def approx_bytes(self):
+        # Rough deep size: containers, records and strings (shared/interned objects counted each time)
+        size = sys.getsizeof(self) + sys.getsizeof(self.conversations)
+        for conv in self.conversations.values():
+            size += (sys.getsizeof(conv) + sys.getsizeof(conv.messages)
+                     + sys.getsizeof(conv.title or "") + sys.getsizeof(conv.preview))
+            for m in conv.messages:
+                size += sys.getsizeof(m) + sys.getsizeof(m.message) + sys.getsizeof(m.ts)
+        return size
+
+
+class InMemoryConversationStore:
+    # O(1) lookup/append/delete by conversation id; process-local, lost on restart unless spilled
+    def __init__(self, retention=NO_RETENTION):
+        self.retention = retention
+        self._users = {}
+        self._lock = threading.RLock()
+        self._spilling = {}  # user -> snapshot still being written; served from here meanwhile
+        self.evictions = 0
+        self.reloads = 0
+        if retention.idle_seconds:
+            interval = min(60.0, max(1.0, retention.idle_seconds / 4))
+            threading.Thread(target=self._evict_loop, args=(interval,), name="conversation-evictor",
+                             daemon=True).start()
+
+    def _user(self, user):
+        store = self._users.get(user)
+        if store is None:
+            if user in self._spilling:
+                store = UserConversations.from_json(self._spilling[user])
+            else:
+                # Spill files also survive a restart, so a user from a previous run reloads too
+                store = self._load_spilled(user) or UserConversations()
+            self._users[user] = store
+        store.last_access = time.monotonic()
+        return store
+
+    # ---------------------------
+    # Idle-user eviction
+    # ---------------------------
+    def _spill_path(self, user):
+        name = hashlib.sha256(user.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.retention.spill_dir, name + ".json.gz")
+
+    def _load_spilled(self, user):
+        if not self.retention.idle_seconds:
+            return None
+        path = self._spill_path(user)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data["user"] != user:
+            return None  # hash prefix collision: not this user's file
+        os.remove(path)
+        self.reloads += 1
+        return UserConversations.from_json(data["data"])
+
+    def _spilled_count(self):
+        if not self.retention.idle_seconds:
+            return 0
+        try:
+            names = os.listdir(self.retention.spill_dir)
+        except FileNotFoundError:
+            return 0  # nothing spilled yet
+        return sum(1 for name in names if name.endswith(".json.gz"))
+
+    def evict_idle(self, now=None):
+        """
+        Spill users idle for longer than retention.idle_seconds and drop them from RAM.
+
+        Returns the number of users evicted.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [u for u, store in self._users.items() if now - store.last_access >= self.retention.idle_seconds]
+            snapshots = {}
+            for user in idle:
+                store = self._users.pop(user)
+                if store.conversations:
+                    snapshots[user] = self._spilling[user] = store.to_json()
+            self.evictions += len(idle)
+        # Compress and write outside the lock; _user() serves these users from _spilling meanwhile
+        if snapshots:
+            os.makedirs(self.retention.spill_dir, exist_ok=True)
+        for user, data in snapshots.items():
+            path = self._spill_path(user)
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump({"user": user, "data": data}, f, separators=(",", ":"))
+            with self._lock:
+                if self._spilling.pop(user, None) is not None and user not in self._users:
+                    os.replace(tmp, path)
+                else:
+                    os.remove(tmp)  # user came back while writing; the in-memory copy is current
+        return len(idle)
+
+    def _evict_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print("Warning: conversation eviction failed:", e)
+
+    def _trim_conversations(self, store):
+        limit = self.retention.max_conversations
+        while limit and len(store.conversations) > limit:
+            del store.conversations[next(iter(store.conversations))]
+
+    def _trim_messages(self, conv):
+        excess = len(conv.messages) - self.retention.max_messages
+        if self.retention.max_messages and excess > 0:
+            del conv.messages[:excess]
+            conv.preview = conv.messages[0].message
+
+    def memory_report(self, top=20):
+        with self._lock:
+            users = [
+                {"user": user, "conversations": len(store.conversations),
+                 "messages": sum(len(c.messages) for c in store.conversations.values()),
+                 "approx_bytes": store.approx_bytes(),
+                 "idle_seconds": round(time.monotonic() - store.last_access, 1)}
+                for user, store in self._users.items()
+            ]
+        spilled = self._spilled_count()
+        users.sort(key=lambda u: u["approx_bytes"], reverse=True)
+        return {
+            "backend": "memory",
+            "users_in_memory": len(users),
+            "users_spilled": spilled,
+            "approx_bytes": sum(u["approx_bytes"] for u in users),
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            "users": users[:top],
+        }
+
+    def list_conversations(self, user):
+        with self._lock:
+            return [list_entry(c.id, c.title, c.preview) for c in self._user(user).conversations.values()]
+
+    def create_conversation(self, user, title=DEFAULT_TITLE):
+        with self._lock:
+            store = self._user(user)
+            conv = Conversation(store.next_id, title, time.time())
+            store.next_id += 1
+            store.conversations[conv.id] = conv
+            self._trim_conversations(store)
+            return {"id": conv.id, "title": conv.title}
+
+    def get_conversation(self, user, cid, **paging):
+        with self._lock:
+            conv = self._user(user).conversations.get(cid)
+            return conv.to_dict(**paging) if conv is not None else None
+
+    def delete_conversation(self, user, cid):
+        with self._lock:
+            return self._user(user).conversations.pop(cid, None) is not None
+
+    def append_message(self, user, cid, role, message, ts=None):
+        with self._lock:
+            conv = self._user(user).conversations.get(cid)
+            if conv is None:
+                return None
+            msg = Message(conv.next_message_id, role, message, ts if ts is not None else time.time())
+            conv.next_message_id += 1
+            conv.messages.append(msg)
+            self._trim_messages(conv)
+            if not conv.preview:
+                conv.preview = message
+            # first user message becomes the title
+            if role == "user" and conv.title == DEFAULT_TITLE:
+                conv.title = title_from_query(message)
+            return msg.to_dict()
+
+    def last_conversation(self, user, **paging):
+        with self._lock:
+            conversations = self._user(user).conversations
+            if not conversations:
+                return None
+            return next(reversed(conversations.values())).to_dict(**paging)
+
+    def has_conversations(self, user):
+        with self._lock:
+            return bool(self._user(user).conversations)
+
+
+# ---------------------------
+# SQLite backend: durable, shareable between worker processes
+# - WAL journal so readers never block the writer (and vice versa)
+# - All writes go through one writer thread per process that group-commits:
+#   every write waiting within commit_interval_ms shares a single transaction/fsync,
+#   each in its own SAVEPOINT so one failing write does not sink the rest
+# - Reads use a connection per thread; SQL strings are module constants so the
+#   per-connection statement cache keeps them prepared
+# ---------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_seq (
+    user TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    user TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    created_at REAL NOT NULL,
+    preview TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (user, id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    conversation_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT NOT NULL,
+    ts REAL NOT NULL,
+    FOREIGN KEY (user, conversation_id) REFERENCES conversations (user, id) ON DELETE CASCADE
+);
+-- Pages walk seq (the message id); databases from before this index still carry the old ts one
+DROP INDEX IF EXISTS messages_by_conversation;
+CREATE INDEX IF NOT EXISTS messages_by_conversation_seq ON messages (user, conversation_id, seq);
+"""
+
+SQL_LIST = "SELECT id, title, preview FROM conversations WHERE user = ? ORDER BY id"
+SQL_GET_CONV = "SELECT id, title FROM conversations WHERE user = ? AND id = ?"
+# Paging: unset bounds are passed as open sentinels so only two statements are ever prepared
+SQL_MESSAGES_FORWARD = ("SELECT seq, role, message, ts FROM messages WHERE user = ? AND conversation_id = ? "
+                        "AND seq > ? AND seq < ? AND ts > ? ORDER BY seq LIMIT ?")
+SQL_MESSAGES_BACKWARD = ("SELECT seq, role, message, ts FROM messages WHERE user = ? AND conversation_id = ? "
+                         "AND seq > ? AND seq < ? AND ts > ? ORDER BY seq DESC LIMIT ?")
+SQL_LAST_CONV = "SELECT id, title FROM conversations WHERE user = ? ORDER BY id DESC LIMIT 1"
+SQL_HAS_CONV = "SELECT 1 FROM conversations WHERE user = ? LIMIT 1"
+SQL_NEXT_ID = "SELECT next_id FROM user_seq WHERE user = ?"
+SQL_INIT_SEQ = "INSERT INTO user_seq (user, next_id) VALUES (?, 2)"
+SQL_BUMP_SEQ = "UPDATE user_seq SET next_id = next_id + 1 WHERE user = ?"
+SQL_INSERT_CONV = "INSERT INTO conversations (user, id, title, created_at) VALUES (?, ?, ?, ?)"
+SQL_DELETE_CONV = "DELETE FROM conversations WHERE user = ? AND id = ?"
+SQL_INSERT_MESSAGE = "INSERT INTO messages (user, conversation_id, role, message, ts) VALUES (?, ?, ?, ?, ?)"
+SQL_SET_PREVIEW = "UPDATE conversations SET preview = ? WHERE user = ? AND id = ? AND preview = ''"
+SQL_SET_TITLE = "UPDATE conversations SET title = ? WHERE user = ? AND id = ? AND title = ?"
+# Retention: keep the newest N messages / conversations (OFFSET N finds the newest one to drop)
+SQL_TRIM_MESSAGES = ("DELETE FROM messages WHERE user = ? AND conversation_id = ? AND seq <= "
+                     "(SELECT seq FROM messages WHERE user = ? AND conversation_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)")
+SQL_TRIM_CONVS = ("DELETE FROM conversations WHERE user = ? AND id <= "
+                  "(SELECT id FROM conversations WHERE user = ? ORDER BY id DESC LIMIT 1 OFFSET ?)")
+SQL_RESET_PREVIEW = ("UPDATE conversations SET preview = COALESCE((SELECT message FROM messages WHERE user = ? "
+                     "AND conversation_id = ? ORDER BY seq LIMIT 1), '') WHERE user = ? AND id = ?")
+SQL_USAGE = ("SELECT user, COUNT(DISTINCT conversation_id), COUNT(*), SUM(LENGTH(CAST(message AS BLOB))) "
+             "FROM messages GROUP BY user ORDER BY 4 DESC LIMIT ?")
+SQL_USER_COUNT = "SELECT COUNT(*) FROM user_seq"
+
+
+class SQLiteConversationStore:
+    def __init__(self, path, commit_interval_ms=5, max_batch=256, busy_timeout_ms=5000, retention=NO_RETENTION):
+        """
+        Args:
+            path (str): database file (created if missing)
+            commit_interval_ms (float): how long the writer waits to gather more writes into one commit
+            max_batch (int): most writes per transaction
+            busy_timeout_ms (int): how long to wait on another process holding the write lock
+            retention (RetentionPolicy): message/conversation limits (idle eviction does not apply here)
+        """
+        self.path = path
+        self.retention = retention
+        self.commit_interval = commit_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._writes = queue.Queue()
+        self.commits = 0
+        self.writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._writer = threading.Thread(target=self._write_loop, name="conversation-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0,
+                               isolation_level=None, cached_statements=256)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---------------------------
+    # Group-committing writer
+    # ---------------------------
+    def _write(self, op, timeout=30.0):
+        # op(conn) runs inside the writer's transaction; returns its result once committed
+        fut = Future()
+        self._writes.put((op, fut))
+        return fut.result(timeout=timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = self._gather()
+            for fut, value, error in self._commit(conn, batch):
+                if error is None:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(error)
+
+    def _gather(self):
+        # Block for one write, then take whatever else arrives within commit_interval
+        batch = [self._writes.get()]
+        deadline = time.perf_counter() + self.commit_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._writes.get(timeout=remaining) if remaining > 0 else self._writes.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, conn, batch):
+        # One transaction for the batch, a savepoint per op so a failing op does not sink the others.
+        # Returns (future, result, error) per op.
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, fut in batch:
+                results.append((fut,) + self._apply(conn, op))
+            conn.execute("COMMIT")
+            self.commits += 1
+            self.writes += len(batch)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(fut, None, e) for _, fut in batch]
+        return results
+
+    @staticmethod
+    def _apply(conn, op):
+        conn.execute("SAVEPOINT w")
+        try:
+            value = op(conn)
+        except Exception as e:
+            conn.execute("ROLLBACK TO w")
+            conn.execute("RELEASE w")
+            return None, e
+        conn.execute("RELEASE w")
+        return value, None
+
+    # ---------------------------
+    # Store interface
+    # ---------------------------
+    def list_conversations(self, user):
+        rows = self._reader().execute(SQL_LIST, (user,)).fetchall()
+        return [list_entry(cid, title, preview) for cid, title, preview in rows]
+
+    def create_conversation(self, user, title=DEFAULT_TITLE):
+        def op(conn):
+            row = conn.execute(SQL_NEXT_ID, (user,)).fetchone()
+            if row is None:
+                cid = 1
+                conn.execute(SQL_INIT_SEQ, (user,))
+            else:
+                cid = row[0]
+                conn.execute(SQL_BUMP_SEQ, (user,))
+            conn.execute(SQL_INSERT_CONV, (user, cid, title, time.time()))
+            if self.retention.max_conversations:
+                conn.execute(SQL_TRIM_CONVS, (user, user, self.retention.max_conversations))
+            return {"id": cid, "title": title}
+        return self._write(op)
+
+    def _page(self, conn, user, cid, limit=None, before=None, after=None, since=None):
+        # Message ids are the global message seq: increasing within a conversation, as the interface requires
+        params = (user, cid, -1 if after is None else after, (1 << 62) if before is None else before,
+                  float("-inf") if since is None else since, -1 if limit is None else limit + 1)
+        forward = forward_paging(after, since)
+        rows = conn.execute(SQL_MESSAGES_FORWARD if forward else SQL_MESSAGES_BACKWARD, params).fetchall()
+        has_more = limit is not None and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        return [{"id": seq, "role": r, "message": m, "ts": ts} for seq, r, m, ts in rows], has_more
+
+    def _conversation(self, conn, row, user, paging):
+        messages, has_more = self._page(conn, user, row[0], **paging)
+        return {"id": row[0], "title": row[1], "messages": messages, "has_more": has_more}
+
+    def get_conversation(self, user, cid, **paging):
+        conn = self._reader()
+        row = conn.execute(SQL_GET_CONV, (user, cid)).fetchone()
+        return self._conversation(conn, row, user, paging) if row is not None else None
+
+    def delete_conversation(self, user, cid):
+        return self._write(lambda conn: conn.execute(SQL_DELETE_CONV, (user, cid)).rowcount > 0)
+
+    def append_message(self, user, cid, role, message, ts=None):
+        ts = ts if ts is not None else time.time()
+
+        def op(conn):
+            try:
+                mid = conn.execute(SQL_INSERT_MESSAGE, (user, cid, role, message, ts)).lastrowid
+            except sqlite3.IntegrityError:
+                return None  # conversation does not exist (foreign key)
+            if self.retention.max_messages:
+                trimmed = conn.execute(SQL_TRIM_MESSAGES, (user, cid, user, cid, self.retention.max_messages))
+                if trimmed.rowcount > 0:
+                    conn.execute(SQL_RESET_PREVIEW, (user, cid, user, cid))
+            conn.execute(SQL_SET_PREVIEW, (message, user, cid))
+            if role == "user":
+                conn.execute(SQL_SET_TITLE, (title_from_query(message), user, cid, DEFAULT_TITLE))
+            return {"id": mid, "role": role, "message": message, "ts": ts}
+        return self._write(op)
+
+    def last_conversation(self, user, **paging):
+        conn = self._reader()
+        row = conn.execute(SQL_LAST_CONV, (user,)).fetchone()
+        return self._conversation(conn, row, user, paging) if row is not None else None
+
+    def has_conversations(self, user):
+        return self._reader().execute(SQL_HAS_CONV, (user,)).fetchone() is not None
+
+    def memory_report(self, top=20):
+        # Nothing is held per user in RAM here; report what each user occupies in the database instead
+        conn = self._reader()
+        users = [
+            {"user": user, "conversations": convs, "messages": msgs, "approx_bytes": nbytes or 0}
+            for user, convs, msgs, nbytes in conn.execute(SQL_USAGE, (top,))
+        ]
+        return {
+            "backend": "sqlite",
+            "users_total": conn.execute(SQL_USER_COUNT).fetchone()[0],
+            "db_bytes": sum(os.path.getsize(self.path + ext) for ext in ("", "-wal")
+                            if os.path.exists(self.path + ext)),
+            "users": users,
+        }
+
+
+def open_conversation_store(backend=None, path=None, retention=None):
+    """
+    Build the configured store.
+
+    Args:
+        backend (str): "memory" or "sqlite" (default: CONVERSATION_BACKEND env var, else memory)
+        path (str): SQLite file (default: CONVERSATION_DB env var, else conversations.db)
+        retention (RetentionPolicy): default RetentionPolicy.from_env(backend)
+    """
+    backend = (backend or os.environ.get("CONVERSATION_BACKEND") or "memory").lower()
+    retention = retention or RetentionPolicy.from_env(backend)
+    if backend == "memory":
+        return InMemoryConversationStore(retention)
+    if backend == "sqlite":
+        return SQLiteConversationStore(
+            path or os.environ.get("CONVERSATION_DB") or "conversations.db",
+            commit_interval_ms=float(os.environ.get("CONVERSATION_COMMIT_MS", "5")),
+            retention=retention,
+        )
+    raise ValueError(f"unknown conversation backend {backend!r}, expected memory or sqlite")
@@ -0,0 +1,58 @@
+# gunicorn.conf.py
+"""
+Pre-fork serving: N worker processes sharing one copy of the model weights (Linux).
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py wsgi:app
+    WEB_CONCURRENCY=4 WORKER_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+
+The master loads the inference backend once (inference_backends.preload_backend) and then
+forks the workers. Each worker imports the app as usual (its own batcher, preprocess pool
+and conversation store threads) but load_backend() returns the inherited model, so a worker
+starts without reading the checkpoint and its weight pages stay shared with the master.
+Compare per-worker unique memory with benchmarks/prefork_memory.py.
+
+Tune with:
+  BIND                  listen address (default 0.0.0.0:8000)
+  WEB_CONCURRENCY       worker processes (default 2)
+  WORKER_THREADS        request threads per worker (default 16)
+  PREFORK_PRELOAD       1 (default): load the model in the master; 0: every worker loads its own
+  PREFORK_SHARE_MEMORY  1: move torch weights into /dev/shm before forking (default 0: copy-on-write)
+  INFERENCE_CPUS        CPU budget per worker for inference_scheduler.py (default: cores / workers);
+                        INFERENCE_PRESET and the other INFERENCE_* settings apply inside each worker
+
+Conversations live in each worker's memory unless CONVERSATION_BACKEND=sqlite, so use the
+SQLite store when running more than one worker.
+"""
+import gc
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("WORKER_THREADS", "16"))
+timeout = 120
+preload_app = False  # the app starts threads at import; only the model is loaded before fork
+
+
+def on_starting(server):
+    if os.environ.get("PREFORK_PRELOAD", "1") != "1":
+        return
+    from inference_backends import preload_backend
+    try:
+        backend = preload_backend(share_memory=os.environ.get("PREFORK_SHARE_MEMORY", "0") == "1")
+    except Exception as e:
+        server.log.warning("Model preload failed, workers will load their own: %s: %s", type(e).__name__, e)
+        return
+    if backend is not None:
+        server.log.info("Preloaded %s in %.1fs for %d workers", backend.revision, backend.load_seconds, workers)
+    # Move everything allocated so far out of the collector's reach, so collections in the
+    # workers do not write to (and un-share) the inherited objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split the cores between workers before the worker imports the app, whose
+    # InferenceScheduler sizes its torch thread pools from INFERENCE_CPUS
+    from inference_scheduler import available_cpus
+    os.environ.setdefault("INFERENCE_CPUS", str(max(1, len(available_cpus()) // workers)))
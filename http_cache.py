@@ -0,0 +1,345 @@
+# http_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.client import responses as REASONS
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# ---------------------------
+# Shared GET response cache for the remote APIs (data.gov.in mandi prices, OpenWeather)
+# - Key = normalised URL + sorted query parameters, credentials left out, so the same
+#   question asked with a different API key (or parameter order) is the same entry
+# - TTL per call: each client passes its own endpoint's freshness (mandi hourly, weather minutes)
+# - Expired entries with an ETag / Last-Modified are revalidated with a conditional GET;
+#   a 304 renews them without downloading the body again
+# - Identical requests already in flight are coalesced: one upstream call, every caller gets it
+# - In-memory LRU bounded by entries and bytes, optional SQLite file underneath; every
+#   PURGE_EVERY writes it drops rows expired for longer than disk_grace (kept that long so they
+#   can still be revalidated), then the least fresh rows past max_disk_entries
+# Only 200 responses are stored, and never ones marked Cache-Control: no-store.
+# ---------------------------
+
+SECRET_PARAMS = ("api-key", "api_key", "apikey", "appid", "key", "token")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+PURGE_EVERY = 256
+DROP_HEADERS = ("set-cookie", "content-encoding", "transfer-encoding", "content-length", "connection")
+
+
+def kept_headers(headers):
+    # Response headers worth storing: body framing and cookies do not apply to a replayed body
+    return {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+
+
+def cache_key(url, params=None, ignore=SECRET_PARAMS):
+    # "HTTPS://Host:443/p?b=2" + {"a": 1, "api-key": "..."} -> "https://host/p?a=1&b=2"
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    items = params.items() if isinstance(params, dict) else (params or [])
+    for name, value in items:
+        # Same expansion as requests: None is dropped, lists repeat the parameter
+        for v in value if isinstance(value, (list, tuple)) else [value]:
+            if v is not None:
+                query.append((str(name), str(v)))
+    skip = {name.lower() for name in ignore}
+    query = sorted((k, v) for k, v in query if k.lower() not in skip)
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class CachedEntry:
+    __slots__ = ("key", "status", "headers", "body", "stored_at", "expires_at")
+
+    def __init__(self, key, status, headers, body, stored_at, expires_at):
+        self.key = key
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_response(cls, key, response, ttl, now):
+        return cls(key, response.status_code, kept_headers(response.headers), response.content, now, now + ttl)
+
+    def response(self, from_cache):
+        # A fresh requests.Response per caller, so callers never share one object
+        r = requests.Response()
+        r.status_code = self.status
+        r.reason = REASONS.get(self.status, "")
+        r.headers = CaseInsensitiveDict(self.headers)
+        r._content = self.body
+        r.url = self.key  # credentials are not part of the key, so not echoed back either
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        r.from_cache = from_cache
+        return r
+
+    @property
+    def validators(self):
+        # Conditional request headers this entry can be revalidated with
+        out = {}
+        if self.headers.get("ETag"):
+            out["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            out["If-Modified-Since"] = self.headers["Last-Modified"]
+        return out
+
+
+class HTTPCache:
+    def __init__(self, default_ttl=300, max_entries=512, max_bytes=32 * 1024 * 1024, disk_path=None,
+                 ignore_params=SECRET_PARAMS, session=None, max_disk_entries=10000, disk_grace=24 * 3600):
+        """
+        Args:
+            default_ttl (float): freshness for calls that do not pass ttl (0 = never store)
+            max_entries (int): in-memory entry cap
+            max_bytes (int): in-memory size cap, counted on response bodies
+            disk_path (str): optional SQLite file for a persistent second level
+            ignore_params (tuple): query parameters left out of keys (credentials), matched case-insensitively
+            session (requests.Session): used when get() is not given one
+            max_disk_entries (int): row cap for the SQLite file (0 = no cap)
+            disk_grace (float): seconds an expired row is kept on disk for revalidation
+        """
+        self.default_ttl = max(0.0, float(default_ttl))
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.ignore_params = tuple(ignore_params)
+        self.session = session or requests.Session()
+        self.max_disk_entries = max(0, int(max_disk_entries))
+        self.disk_grace = max(0.0, float(disk_grace))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> CachedEntry, least recently used first
+        self._bytes = 0
+        self._inflight = {}  # key -> Future of the CachedEntry being fetched
+
+        self.lookups = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.revalidated = 0
+        self.upstream = 0
+        self.evictions = 0
+        self.disk_purged = 0
+        self._writes_since_purge = 0
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER, headers TEXT, "
+                "body BLOB, stored_at REAL, expires_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)")
+            self._db.commit()
+            with self._lock:
+                self._purge(time.time())
+
+    @classmethod
+    def from_env(cls):
+        # HTTP_CACHE_PATH (SQLite file, unset = memory only), HTTP_CACHE_ENTRIES, HTTP_CACHE_TTL,
+        # HTTP_CACHE_DISK_ENTRIES
+        return cls(
+            default_ttl=float(os.environ.get("HTTP_CACHE_TTL", "300")),
+            max_entries=int(os.environ.get("HTTP_CACHE_ENTRIES", "512")),
+            disk_path=os.environ.get("HTTP_CACHE_PATH") or None,
+            max_disk_entries=int(os.environ.get("HTTP_CACHE_DISK_ENTRIES", "10000")),
+        )
+
+    def key_for(self, url, params=None):
+        return cache_key(url, params, self.ignore_params)
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def get(self, url, params=None, ttl=None, session=None, headers=None, timeout=30):
+        """
+        GET through the cache; returns a requests.Response with an extra `from_cache` flag
+        (True when no body was downloaded for this call). Errors and non-200 responses are
+        passed through as usual and not stored.
+
+        Args:
+            url (str): endpoint
+            params (dict): query parameters, credentials included (they are sent, just not keyed on)
+            ttl (float): seconds a stored response stays fresh (None = default_ttl)
+            session (requests.Session): session to send with, e.g. one with retries mounted
+            headers (dict): extra request headers
+            timeout (float): per-request timeout
+        """
+        ttl = self.default_ttl if ttl is None else max(0.0, float(ttl))
+        key = self.key_for(url, params)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            entry = self._lookup(key, now)
+            if entry is not None and now < entry.expires_at:
+                return entry.response(from_cache=True)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result().response(from_cache=True)  # re-raises the leader's error
+
+        try:
+            fresh, from_cache = self._fetch(key, url, params, ttl, session, headers, timeout, entry)
+            future.set_result(fresh)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return fresh.response(from_cache=from_cache)
+
+    def _fetch(self, key, url, params, ttl, session, headers, timeout, stale):
+        # Upstream call, conditional when the expired entry has validators; stores what is cacheable
+        send = dict(headers or {})
+        if stale is not None:
+            send.update(stale.validators)
+        response = (session or self.session).get(url, params=params, headers=send, timeout=timeout)
+        now = time.time()
+        with self._lock:
+            self.upstream += 1
+            if response.status_code == 304 and stale is not None:
+                self.revalidated += 1
+                headers = {**stale.headers, **kept_headers(response.headers)}
+                renewed = CachedEntry(key, stale.status, headers, stale.body, now, now + ttl)
+                self._put(renewed)
+                return renewed, True
+        entry = CachedEntry.from_response(key, response, ttl, now)
+        no_store = "no-store" in response.headers.get("Cache-Control", "").lower()
+        if response.status_code == 200 and ttl > 0 and not no_store:
+            with self._lock:
+                self._put(entry)
+        return entry, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    # ---------------------------
+    # Internal (caller holds the lock)
+    # ---------------------------
+    def _lookup(self, key, now):
+        # Memory first, then disk (promoted into memory); fresh or not, the caller decides.
+        # Counts a hit only for fresh entries: expired ones still cost an upstream call.
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if now < entry.expires_at:
+                self.hits += 1
+            return entry
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT status, headers, body, stored_at, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, stored_at, expires_at = row
+        entry = CachedEntry(key, status, json.loads(headers), bytes(body), stored_at, expires_at)
+        self._remember(entry)
+        if now < entry.expires_at:
+            self.disk_hits += 1
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def _remember(self, entry):
+        if entry.key in self._entries:
+            self._drop(entry.key)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[entry.key] = entry
+        self._bytes += len(entry.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _put(self, entry):
+        self._remember(entry)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, status, headers, body, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.status, json.dumps(dict(entry.headers)), entry.body, entry.stored_at,
+                 entry.expires_at),
+            )
+            self._db.commit()
+            self._writes_since_purge += 1
+            if self._writes_since_purge >= PURGE_EVERY:
+                self._purge(entry.stored_at)
+
+    def _purge(self, now):
+        # Long-expired rows first, then the least fresh past the cap; amortised over PURGE_EVERY writes
+        self._writes_since_purge = 0
+        purged = self._db.execute("DELETE FROM responses WHERE expires_at < ?", (now - self.disk_grace,)).rowcount
+        if self.max_disk_entries:
+            extra = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+            if extra > 0:
+                purged += self._db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires_at LIMIT ?)",
+                    (extra,),
+                ).rowcount
+        self._db.commit()
+        self.disk_purged += purged
+
+    # ---------------------------
+    # Reporting
+    # ---------------------------
+    def stats(self):
+        with self._lock:
+            saved = self.hits + self.disk_hits + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "default_ttl": self.default_ttl,
+                "disk": self._db is not None,
+                "max_disk_entries": self.max_disk_entries,
+                "disk_purged": self.disk_purged,
+                "requests": self.lookups,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "revalidated": self.revalidated,
+                "upstream_calls": self.upstream,
+                "saved_upstream_calls": saved,
+                "evictions": self.evictions,
+                "hit_rate": round(saved / self.lookups, 4) if self.lookups else 0.0,
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    # One process-wide cache (configured from HTTP_CACHE_*) for every API client
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPCache.from_env()
+        return _shared
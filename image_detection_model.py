@@ -1,23 +1,287 @@
-from transformers import AutoImageProcessor, AutoModelForImageClassification
-from PIL import Image
-import torch
-
-# Load processor and model
-processor = AutoImageProcessor.from_pretrained("wambugu71/crop_leaf_diseases_vit")
-model = AutoModelForImageClassification.from_pretrained("wambugu71/crop_leaf_diseases_vit")
-
-# Load an image (replace 'test_leaf.jpg' with your image path)
-image = Image.open(r"D:\download\bacterial_wheat_leaf.jpg")
-
-
-# Preprocess image
-inputs = processor(images=image, return_tensors="pt")
-
-# Forward pass
-with torch.no_grad():
-    outputs = model(**inputs)
-
-# Get logits and predicted class
-logits = outputs.logits
-predicted_class_id = logits.argmax(-1).item()
-
+# image_detection_model.py
+"""
+Offline batch classifier for leaf images.
+
+Usage:
+    python image_detection_model.py leaf.jpg
+    python image_detection_model.py D:\\download\\leaves "archive/**/*.jpg" manifest.txt -o results.jsonl
+    python image_detection_model.py leaves/ -o results.csv --format csv --batch-size 32 --top-k 3
+
+Inputs can be image files, directories (scanned recursively), glob patterns or
+manifest files (.txt/.lst, one path per line). Images are decoded and preprocessed
+by a thread (or process) pool that runs ahead of the model by at most --prefetch images,
+then classified in batches. Results are written (and flushed) batch by batch, so
+re-running with the same --output skips images that are already in the file.
+
+Forward passes follow inference_scheduler.py (INFERENCE_* env vars, or --preset/--threads/
+--streams/--cpu-affinity): the throughput preset runs several batches at once, each on its
+share of the cores, and still writes results in input order.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference_backends import MODEL_ID, BACKENDS, load_backend, top_k, prediction_result
+from inference_scheduler import PRESETS, InferenceScheduler
+from preprocessing import PreprocessPool, StageTimings
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+MANIFEST_EXTENSIONS = {".txt", ".lst"}
+CSV_FIELDS = ["path", "prediction", "confidence", "low_confidence", "top_k",
+              "decode_ms", "preprocess_ms", "infer_ms", "error"]
+
+
+# ---------------------------
+# Input discovery (streamed, nothing is listed up front)
+# ---------------------------
+def iter_directory(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(dirpath, name)
+
+
+def iter_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield line if os.path.isabs(line) else os.path.join(base, line)
+
+
+def iter_inputs(specs):
+    seen = set()
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths = iter_directory(spec)
+        elif os.path.isfile(spec) and os.path.splitext(spec)[1].lower() in MANIFEST_EXTENSIONS:
+            paths = iter_manifest(spec)
+        elif os.path.isfile(spec):
+            paths = [spec]
+        else:
+            paths = (p for p in sorted(glob.iglob(spec, recursive=True)) if os.path.isfile(p))
+        for p in paths:
+            p = os.path.normpath(p)
+            if p not in seen:
+                seen.add(p)
+                yield p
+
+
+# ---------------------------
+# Output writers (append + flush per batch, resumable)
+# ---------------------------
+def load_done_jsonl(path):
+    # Returns paths already written; truncates a half-written trailing line left by a crash
+    done = set()
+    good_offset = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            try:
+                row = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b"\n"):
+                break
+            if isinstance(row, dict) and row.get("path"):
+                done.add(row["path"])
+            good_offset += len(raw)
+    if good_offset != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_offset)
+    return done
+
+
+def load_done_csv(path):
+    done = set()
+    good_offset = 0
+    with open(path, "rb") as f:
+        header = f.readline()
+        if next(csv.reader([header.decode("utf-8")]), None) != CSV_FIELDS:
+            raise SystemExit(f"{path} has different CSV columns; use another --output or --no-resume")
+        good_offset = len(header)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            row = next(csv.reader([raw.decode("utf-8")]), None)
+            if not row or len(row) != len(CSV_FIELDS):
+                break
+            done.add(row[0])
+            good_offset += len(raw)
+    if good_offset != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_offset)
+    return done
+
+
+class ResultWriter:
+    def __init__(self, output, fmt, resume=True):
+        self.fmt = fmt
+        self.done = set()
+        if output == "-":
+            self.f = sys.stdout
+            new_file = True
+        else:
+            exists = os.path.exists(output) and os.path.getsize(output) > 0
+            if exists and resume:
+                self.done = load_done_jsonl(output) if fmt == "jsonl" else load_done_csv(output)
+            self.f = open(output, "a" if resume else "w", encoding="utf-8", newline="")
+            new_file = not (exists and resume)
+        if fmt == "csv":
+            self.csv = csv.writer(self.f, lineterminator="\n")
+            if new_file:
+                self.csv.writerow(CSV_FIELDS)
+
+    def write(self, rows):
+        for row in rows:
+            if self.fmt == "jsonl":
+                self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self.csv.writerow([
+                    row["path"], row.get("prediction", ""), row.get("confidence", ""),
+                    row.get("low_confidence", ""), json.dumps(row.get("top_k", [])), row.get("decode_ms", ""),
+                    row.get("preprocess_ms", ""), row.get("infer_ms", ""), row.get("error", ""),
+                ])
+        self.f.flush()
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+# ---------------------------
+# Pipeline: bounded decode/preprocess pool -> batched forward pass
+# ---------------------------
+def classify_batch(backend, decoded, k, min_confidence, timings):
+    # decoded: (path, pixel_values, stage_timings, error) tuples from PreprocessPool.map_ordered
+    # Rows come back in input order, decode errors included
+    ok = [d for d in decoded if d[3] is None]
+    tops = iter(())
+    if ok:
+        started = time.perf_counter()
+        tops = iter(top_k(backend.logits(np.stack([d[1] for d in ok])), backend.id2label, k))
+        elapsed = time.perf_counter() - started
+        timings.record("infer", elapsed)
+        infer_ms = elapsed * 1000.0 / len(ok)
+    rows = []
+    for path, _, stage, error in decoded:
+        if error is not None:
+            rows.append({"path": path, "error": f"{type(error).__name__}: {error}"})
+            continue
+        rows.append({
+            "path": path,
+            **prediction_result(next(tops), min_confidence=min_confidence),
+            "decode_ms": round(stage["decode"] * 1000.0, 3),
+            "preprocess_ms": round(stage["preprocess"] * 1000.0, 3),
+            "infer_ms": round(infer_ms, 3),
+        })
+    return rows
+
+
+def run(args):
+    scheduler = InferenceScheduler.from_env(args.preset, intra_op_threads=args.threads, max_concurrent=args.streams,
+                                            cpu_affinity=args.cpu_affinity).apply()
+    backend = load_backend(args.backend, args.model, **scheduler.backend_kwargs())
+
+    writer = ResultWriter(args.output, args.format, resume=not args.no_resume)
+    if writer.done:
+        print(f"Resuming: {len(writer.done)} images already in {args.output}", file=sys.stderr)
+    paths = (p for p in iter_inputs(args.inputs) if p not in writer.done)
+
+    timings = StageTimings()
+    pool = PreprocessPool(backend.processor, workers=args.workers, kind=args.pool,
+                          use_draft=not args.no_draft, timings=timings)
+    inference = ThreadPoolExecutor(scheduler.max_concurrent, thread_name_prefix="infer")
+    pending = deque()  # batches in flight, oldest first
+
+    def classify(batch):
+        with scheduler.slot():
+            return classify_batch(backend, batch, args.top_k, args.min_confidence, timings)
+
+    def flush(keep):
+        # Write finished batches in input order until at most `keep` are still in flight
+        nonlocal total, errors
+        while len(pending) > keep:
+            rows = pending.popleft().result()
+            writer.write(rows)
+            total += len(rows)
+            errors += sum(1 for r in rows if "error" in r)
+
+    started = time.perf_counter()
+    last_report = started
+    total = errors = 0
+    batch = []
+    try:
+        for item in pool.map_ordered(paths, prefetch=args.prefetch):
+            batch.append(item)
+            if len(batch) < args.batch_size:
+                continue
+            pending.append(inference.submit(classify, batch))
+            batch = []
+            flush(scheduler.max_concurrent - 1)
+            now = time.perf_counter()
+            if now - last_report >= args.report_every:
+                print(f"{total} images, {total / (now - started):.1f} images/sec", file=sys.stderr)
+                last_report = now
+        if batch:
+            pending.append(inference.submit(classify, batch))
+        flush(0)
+    finally:
+        inference.shutdown()
+        pool.shutdown()
+        writer.close()
+
+    report(total, errors, time.perf_counter() - started, timings)
+    return 0
+
+
+def report(total, errors, elapsed, timings):
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Done: {total} images ({errors} errors) in {elapsed:.1f}s, {rate:.1f} images/sec", file=sys.stderr)
+    for stage, st in timings.stats().items():
+        print(f"  {stage:<10} p50 {st['p50']} ms  p99 {st['p99']} ms  (n={st['count']})", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Classify leaf images in bulk with the crop disease ViT.")
+    parser.add_argument("inputs", nargs="+", help="image files, directories, glob patterns or manifest files")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="output format (default: from extension, else jsonl)")
+    parser.add_argument("--model", default=MODEL_ID, help="model id or local directory")
+    parser.add_argument("--backend", choices=BACKENDS, help="inference backend (default: INFERENCE_BACKEND or torch)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--min-confidence", type=float, default=0.0,
+                        help="flag results whose top probability is below this as low_confidence")
+    parser.add_argument("--workers", type=int, default=max(1, min(8, (os.cpu_count() or 2) - 1)),
+                        help="decode/preprocess workers")
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread",
+                        help="run decode/preprocess in threads or processes")
+    parser.add_argument("--no-draft", action="store_true", help="always decode JPEGs at full resolution")
+    parser.add_argument("--prefetch", type=int, default=64, help="max images decoded ahead of the model")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--no-resume", action="store_true", help="overwrite --output instead of appending")
+    parser.add_argument("--preset", choices=PRESETS, help="inference scheduler preset (default: INFERENCE_PRESET or latency)")
+    parser.add_argument("--threads", type=int, default=0, help="threads per forward pass (default: from preset)")
+    parser.add_argument("--streams", type=int, default=0, help="batches run at once (default: from preset)")
+    parser.add_argument("--cpu-affinity", help='pin inference to these cores, e.g. "0-3" or "auto"')
+    args = parser.parse_args(argv)
+    if args.format is None:
+        args.format = "csv" if args.output.lower().endswith(".csv") else "jsonl"
+    args.batch_size = max(1, args.batch_size)
+    args.prefetch = max(args.batch_size, args.prefetch)
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,361 @@
+# inference_backends.py
+"""
+Selectable CPU inference backends for the crop disease ViT.
+
+    torch  stock fp32 PyTorch (reference)
+    int8   PyTorch dynamic INT8 quantization of every nn.Linear (weights int8, activations fp32)
+    onnx   the same model exported to ONNX and run by ONNX Runtime
+
+Every backend exposes the same surface: .processor, .id2label, .revision and
+.logits(pixel_values ndarray [N, 3, H, W]) -> ndarray [N, num_labels].
+Pick one with INFERENCE_BACKEND=torch|int8|onnx (default torch), and check a
+new backend against fp32 with check_backend_parity.py before switching.
+"""
+import inspect
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_registry import MODEL_ID, files_fingerprint, resolve_model_source, read_manifest
+
+BACKENDS = ("torch", "int8", "onnx")
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "onnx")
+
+
+# Local snapshots (model_registry.py / MODEL_DIR) load with local_files_only=True: no hub traffic at all
+def _load_processor(model_id):
+    from transformers import AutoImageProcessor
+    source, local = resolve_model_source(model_id)
+    return AutoImageProcessor.from_pretrained(source, local_files_only=local)
+
+
+def _load_torch_model(model_id):
+    from transformers import AutoModelForImageClassification
+    source, local = resolve_model_source(model_id)
+    model = AutoModelForImageClassification.from_pretrained(source, local_files_only=local)
+    model.eval()
+    return model
+
+
+def _load_config(model_id):
+    from transformers import AutoConfig
+    source, local = resolve_model_source(model_id)
+    return AutoConfig.from_pretrained(source, local_files_only=local)
+
+
+def _model_revision(model_id, config):
+    # Prediction cache keys include this, so it must change whenever the weights do
+    source, local = resolve_model_source(model_id)
+    manifest = read_manifest(source) if local else None
+    if manifest is not None:
+        return f"{manifest['model_id']}@{manifest['commit'] or manifest['version']}"
+    if local:  # MODEL_DIR or a plain directory: no manifest to go by, so fingerprint the files
+        return f"{model_id}@files-{files_fingerprint(source)}"
+    commit = getattr(config, "_commit_hash", None)
+    if commit is None:  # nothing identifies these weights across restarts: never reuse older cache rows
+        commit = f"unpinned-{int(time.time())}"
+    return f"{model_id}@{commit}"
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_id=MODEL_ID):
+        import torch
+        self._torch = torch
+        self.model_id = model_id
+        self.processor = _load_processor(model_id)
+        self.model = self._prepare(_load_torch_model(model_id))
+        self.id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+        self.revision = f"{_model_revision(model_id, self.model.config)}+{self.name}"
+
+    def _prepare(self, model):
+        return model
+
+    def logits(self, pixel_values):
+        with self._torch.inference_mode():
+            out = self.model(pixel_values=self._torch.from_numpy(np.ascontiguousarray(pixel_values)))
+        return out.logits.float().numpy()
+
+
+class Int8Backend(TorchBackend):
+    name = "int8"
+
+    def _prepare(self, model):
+        from torch.ao.quantization import quantize_dynamic
+        return quantize_dynamic(model, {self._torch.nn.Linear}, dtype=self._torch.qint8)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_id=MODEL_ID, onnx_path=None, intra_op_threads=0):
+        """
+        Args:
+            model_id (str): hub id or local directory of the PyTorch checkpoint
+            onnx_path (str): exported model file; exported from model_id on first use if missing
+            intra_op_threads (int): ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        import onnxruntime as ort
+
+        self.model_id = model_id
+        self.processor = _load_processor(model_id)
+        config = _load_config(model_id)
+        self.id2label = {int(k): v for k, v in config.id2label.items()}
+        self.revision = f"{_model_revision(model_id, config)}+{self.name}"
+
+        self.onnx_path = onnx_path or os.environ.get("ONNX_MODEL_PATH") or default_onnx_path(model_id)
+        if not os.path.exists(self.onnx_path):
+            export_onnx(model_id, self.onnx_path, self.processor)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def logits(self, pixel_values):
+        feed = {self._input_name: np.ascontiguousarray(pixel_values, dtype=np.float32)}
+        return self.session.run(None, feed)[0]
+
+
+def default_onnx_path(model_id):
+    # Next to the weights for local snapshots, otherwise under models/onnx
+    source, local = resolve_model_source(model_id)
+    if local:
+        return os.path.join(source, "model.onnx")
+    return os.path.join(DEFAULT_ONNX_DIR, model_id.replace("/", "--").replace("\\", "--").strip("-.") + ".onnx")
+
+
+def export_onnx(model_id, onnx_path, processor=None, opset=17):
+    # Export with a dynamic batch dimension; writes to a temp file first so a crash never leaves a partial model
+    import torch
+
+    model = _load_torch_model(model_id)
+    processor = processor or _load_processor(model_id)
+    height, width = input_size(processor)
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
+    tmp_path = onnx_path + ".tmp"
+    dummy = torch.zeros(1, 3, height, width)
+    extra = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        extra["dynamo"] = False  # the TorchScript exporter handles dynamic_axes without onnxscript
+    torch.onnx.export(
+        LogitsOnly(model).eval(), (dummy,), tmp_path,
+        input_names=["pixel_values"], output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset, **extra,
+    )
+    os.replace(tmp_path, onnx_path)
+    return onnx_path
+
+
+def load_backend(name=None, model_id=MODEL_ID, **kwargs):
+    """
+    Load an inference backend by name (default: INFERENCE_BACKEND env var, else "torch").
+    """
+    name = (name or os.environ.get("INFERENCE_BACKEND") or "torch").lower()
+    backend = _preloaded.get((name, model_id))
+    if backend is not None:
+        return backend  # inherited from a pre-fork master, see preload_backend()
+    started = time.perf_counter()
+    if name == "torch":
+        backend = TorchBackend(model_id)
+    elif name == "int8":
+        backend = Int8Backend(model_id)
+    elif name == "onnx":
+        backend = OnnxBackend(model_id, **kwargs)
+    else:
+        raise ValueError(f"unknown inference backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    backend.load_seconds = time.perf_counter() - started
+    return backend
+
+
+# ---------------------------
+# Pre-fork sharing (gunicorn.conf.py)
+# The master process loads the backend once before forking; workers inherit it and
+# load_backend() hands them that instance instead of reading the checkpoint again.
+# ---------------------------
+_preloaded = {}
+
+
+def preload_backend(name=None, model_id=MODEL_ID, share_memory=False):
+    """
+    Load a backend in a pre-fork master for its worker processes to inherit.
+
+    Inherited weights are copy-on-write: inference only reads them, so N workers keep one
+    physical copy. share_memory=True also moves torch weights into shared memory
+    (Module.share_memory(), backed by /dev/shm), so the pages stay shared even if written.
+    Returns None for onnx: an ONNX Runtime session owns thread pools that do not survive
+    fork(), so each worker loads its own.
+
+    Do not run a forward pass in the master before forking (no warm-up): the intra-op
+    thread pool it starts is not fork-safe.
+    """
+    name = (name or os.environ.get("INFERENCE_BACKEND") or "torch").lower()
+    if name == "onnx":
+        print("ONNX Runtime sessions are not fork-safe; each worker will load its own model")
+        return None
+    backend = load_backend(name, model_id)
+    if share_memory:
+        backend.model.share_memory()
+    backend.preloaded = True
+    _preloaded[(name, model_id)] = backend
+    return backend
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def top_k(logits, id2label, k=3):
+    """
+    Softmax once over a [N, num_labels] logits batch and keep the k best labels per row.
+
+    Returns one list per row of {"label": lowercase label, "score": probability}, best first.
+    """
+    probs = softmax(np.asarray(logits, dtype=np.float32))
+    k = max(1, min(k, probs.shape[-1]))
+    ids = np.argpartition(-probs, k - 1, axis=-1)[:, :k]
+    scores = np.take_along_axis(probs, ids, axis=-1)
+    order = np.argsort(-scores, axis=-1)
+    ids = np.take_along_axis(ids, order, axis=-1)
+    scores = np.take_along_axis(scores, order, axis=-1)
+    return [
+        [{"label": id2label[int(c)].lower(), "score": round(float(p), 6)} for c, p in zip(row_ids, row_scores)]
+        for row_ids, row_scores in zip(ids, scores)
+    ]
+
+
+def prediction_result(top, k=None, min_confidence=0.0):
+    """
+    The response shape shared by /predict, /predict/batch and the batch CLI.
+
+    Args:
+        top (list): one row from top_k()
+        k (int): how many entries of top to return (default: all)
+        min_confidence (float): results below this probability are flagged low_confidence (0 = off)
+    """
+    best = top[0]
+    result = {
+        "prediction": best["label"],
+        "confidence": best["score"],
+        "top_k": top[:k] if k else top,
+    }
+    if min_confidence:
+        result["low_confidence"] = best["score"] < min_confidence
+        result["min_confidence"] = min_confidence
+    return result
+
+
+def input_size(processor):
+    size = getattr(processor, "size", None) or {}
+    height = size.get("height") or size.get("shortest_edge") or 224
+    width = size.get("width") or size.get("shortest_edge") or 224
+    return height, width
+
+
+def warm_up(backend, batch_sizes=(1,)):
+    # One processor call on a dummy image plus a forward pass per batch size, so the first
+    # real request does not pay for lazy kernel selection, allocator growth or graph optimisation
+    from PIL import Image
+
+    height, width = input_size(backend.processor)
+    dummy = Image.new("RGB", (width, height), (34, 139, 34))
+    pixel_values = backend.processor(images=dummy, return_tensors="np")["pixel_values"]
+    for n in batch_sizes:
+        backend.logits(np.repeat(pixel_values, n, axis=0))
+
+
+class BackgroundModelLoader:
+    """
+    Loads a backend off the request path and reports its state.
+
+    States: idle -> loading -> warming -> ready, or failed (error kept in .error).
+    """
+
+    def __init__(self, load=None, warmup_batch_sizes=(1,), on_ready=None):
+        """
+        Args:
+            load (callable): returns a loaded backend (default: load_backend())
+            warmup_batch_sizes (tuple): batch sizes for the warm-up forward passes (empty = skip)
+            on_ready (callable): called with the backend before the loader reports ready
+        """
+        self._load = load or load_backend
+        self.warmup_batch_sizes = tuple(warmup_batch_sizes)
+        self.on_ready = on_ready
+        self.backend = None
+        self.state = "idle"
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        # Idempotent: only the first call spawns the loader thread
+        with self._lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+            self.started_at = time.time()
+        threading.Thread(target=self._run, name="model-loader", daemon=True).start()
+
+    def _run(self):
+        try:
+            started = time.perf_counter()
+            backend = self._load()
+            self.load_seconds = time.perf_counter() - started
+            self.state = "warming"
+            started = time.perf_counter()
+            if self.warmup_batch_sizes:
+                warm_up(backend, self.warmup_batch_sizes)
+            self.warmup_seconds = time.perf_counter() - started
+            if self.on_ready is not None:
+                self.on_ready(backend)
+            self.backend = backend
+            self.state = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            print("Warning: failed to load model (predict disabled):", self.error)
+        finally:
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait(self, timeout=None):
+        # Starts loading if nobody has yet; returns the backend or None if not ready in time / failed
+        self.start()
+        self._done.wait(timeout)
+        return self.backend
+
+    def status(self):
+        backend = self.backend
+        return {
+            "state": self.state,
+            "backend": getattr(backend, "name", None),
+            "revision": getattr(backend, "revision", None),
+            "preloaded": getattr(backend, "preloaded", False),
+            "started_at": self.started_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+        }
@@ -0,0 +1,195 @@
+# inference_scheduler.py
+"""
+CPU thread budget for model forward passes, shared by the Flask app, chatbot.py and the batch scripts.
+
+Left alone, torch gives every forward pass all cores, so two passes running at once (two
+Streamlit sessions, two batcher threads) fight over the same cores and both slow down.
+An InferenceScheduler fixes the budget up front:
+
+    intra_op_threads   threads one forward pass may use (torch.set_num_threads / ORT intra-op)
+    inter_op_threads   torch inter-op pool size
+    max_concurrent     forward passes allowed at once; callers beyond that wait in slot()
+    cpu_affinity       optional cores to pin inference threads to; with max_concurrent > 1
+                       each inference thread gets its own disjoint group of those cores
+
+Presets (CPU count = cores this process may run on):
+    latency     one pass at a time on every core: lowest time per request (default)
+    throughput  min(4, cpus // 2) passes at once, cpus / passes threads each: more images/sec
+                under sustained load, higher time per request
+
+Configure with INFERENCE_PRESET, INFERENCE_INTRA_THREADS, INFERENCE_INTER_THREADS,
+INFERENCE_MAX_CONCURRENT, INFERENCE_CPU_AFFINITY ("auto" = all allowed cores, or a list like
+"0-3,8"), and INFERENCE_CPUS (pretend this many cores are available; gunicorn.conf.py sets it
+to each worker's share). Explicit values override the preset.
+
+    with scheduler.slot():
+        logits = backend.logits(pixel_values)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PRESETS = ("latency", "throughput")
+
+
+def available_cpus():
+    # Cores this process may run on (respects taskset/cgroup cpusets), not the machine total
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(spec):
+    # "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    cpus = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+class InferenceScheduler:
+    def __init__(self, preset="latency", intra_op_threads=0, inter_op_threads=0, max_concurrent=0,
+                 cpu_affinity=None, cpus=0):
+        """
+        Args:
+            preset (str): "latency" or "throughput", fills in every value left at 0
+            intra_op_threads (int): threads per forward pass (0 = from preset)
+            inter_op_threads (int): torch inter-op threads (0 = from preset)
+            max_concurrent (int): forward passes at once (0 = from preset)
+            cpu_affinity (list or str): cores to pin inference threads to, "auto" for every allowed core,
+                None to leave scheduling to the OS (pinning is Linux only)
+            cpus (int): CPU budget for the presets (0 = cores this process may run on)
+        """
+        if preset not in PRESETS:
+            raise ValueError(f"unknown inference preset {preset!r}, expected one of {', '.join(PRESETS)}")
+        if cpu_affinity == "auto":
+            cpu_affinity = available_cpus()
+        elif isinstance(cpu_affinity, str):
+            cpu_affinity = parse_cpu_list(cpu_affinity)
+        self.cpu_affinity = list(cpu_affinity) if cpu_affinity else None
+        cpus = cpus or len(self.cpu_affinity or available_cpus())
+
+        streams = 1 if preset == "latency" else max(1, min(4, cpus // 2))
+        self.preset = preset
+        self.max_concurrent = max(1, int(max_concurrent or streams))
+        self.intra_op_threads = max(1, int(intra_op_threads or cpus // self.max_concurrent))
+        self.inter_op_threads = max(1, int(inter_op_threads or 1))
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pinned_threads = 0
+        self._applied = False
+        self._in_flight = 0
+        self._passes = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, preset=None, **overrides):
+        """
+        Scheduler from the INFERENCE_* environment variables; non-empty keyword arguments
+        (e.g. from command line flags) take precedence.
+        """
+        env = os.environ.get
+        config = {
+            "preset": preset or env("INFERENCE_PRESET") or "latency",
+            "intra_op_threads": int(env("INFERENCE_INTRA_THREADS", "0")),
+            "inter_op_threads": int(env("INFERENCE_INTER_THREADS", "0")),
+            "max_concurrent": int(env("INFERENCE_MAX_CONCURRENT", "0")),
+            "cpu_affinity": env("INFERENCE_CPU_AFFINITY") or None,
+            "cpus": int(env("INFERENCE_CPUS", "0")),
+        }
+        config.update({k: v for k, v in overrides.items() if v})
+        return cls(**config)
+
+    def apply(self):
+        """
+        Set the torch thread pools. Call once, before the first forward pass; later calls are no-ops.
+        """
+        with self._lock:
+            if self._applied:
+                return self
+            self._applied = True
+        try:
+            import torch
+        except ImportError:
+            return self  # onnx-only install: backend_kwargs() carries the thread count
+        torch.set_num_threads(self.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError:
+            pass  # already fixed by earlier inter-op work in this process; only settable once
+        return self
+
+    def backend_kwargs(self):
+        # Extra load_backend() arguments; only the onnx backend takes any
+        return {"intra_op_threads": self.intra_op_threads}
+
+    def _core_group(self, n):
+        # n-th of max_concurrent disjoint slices of cpu_affinity
+        cores = self.cpu_affinity
+        size = max(1, len(cores) // self.max_concurrent)
+        start = (n % self.max_concurrent) * size
+        return cores[start:start + size] or cores
+
+    def _pin_current_thread(self):
+        if self.cpu_affinity is None or getattr(self._local, "pinned", False):
+            return
+        self._local.pinned = True
+        if not hasattr(os, "sched_setaffinity"):
+            return
+        with self._lock:
+            n = self._pinned_threads
+            self._pinned_threads += 1
+        # On Linux pid 0 means the calling thread; the intra-op threads it starts inherit the mask
+        try:
+            os.sched_setaffinity(0, self._core_group(n))
+        except OSError as e:
+            print("Warning: could not pin inference thread:", e)
+
+    @contextmanager
+    def slot(self):
+        # Hold one of max_concurrent forward-pass slots (and pin this thread on first use)
+        self._pin_current_thread()
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self._waited += 1
+                self._wait_seconds += time.perf_counter() - started
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._passes += 1
+            self._slots.release()
+
+    def run(self, fn, *args, **kwargs):
+        with self.slot():
+            return fn(*args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "preset": self.preset,
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "max_concurrent": self.max_concurrent,
+                "cpu_affinity": self.cpu_affinity,
+                "in_flight": self._in_flight,
+                "passes": self._passes,
+                "waited": self._waited,
+                "wait_ms_total": round(self._wait_seconds * 1000.0, 3),
+            }
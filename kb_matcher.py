@@ -0,0 +1,159 @@
+# kb_matcher.py
+import re
+
+# ---------------------------
+# Knowledge-base query matcher
+# - Every crop/disease name, synonym and common misspelling is compiled once into
+#   a single trie-shaped regex with word boundaries, so one finditer() pass over
+#   the query finds every mention (cost grows with the query, not with the KB)
+# - Shared prefixes are factored out ("leaf blight"/"leaf blast" -> leaf (?:blight|blast)),
+#   and the longest alternative wins ("northern leaf blight" over "leaf blight")
+# - Synonyms and known misspellings come from the "aliases" in knowledge_base.json;
+#   on top of those, single-edit misspellings of names with 6+ letters are generated
+#   (first and last letter of every word kept, so no real word or prefix comes out)
+# ---------------------------
+
+
+def typo_variants(term, min_length=6):
+    """
+    Common single-edit misspellings of term.
+
+    Every word keeps its first and last letter, so an edit never yields a prefix of the word
+    ("healthy" -> "health") or a different word glued to the rest ("blight" -> "light").
+    Deletions and adjacent transpositions only touch words of 5+ letters, where they rarely
+    spell another real word; a doubled letter ("rust" -> "russt") is allowed in any word.
+    """
+    if len(term.replace(" ", "")) < min_length:
+        return set()
+    words = term.split(" ")
+    out = set()
+    for n, word in enumerate(words):
+        edits = {word[:i] + word[i] + word[i:] for i in range(1, len(word) - 1)}
+        if len(word) >= 5:
+            for i in range(1, len(word) - 1):
+                edits.add(word[:i] + word[i + 1:])
+                if i + 2 < len(word):
+                    edits.add(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+        for edit in edits:
+            out.add(" ".join(words[:n] + [edit] + words[n + 1:]))
+    out.discard(term)
+    return out
+
+
+def trie_regex(phrases):
+    """
+    Build a regex source matching any of phrases, factored as a character trie.
+
+    Alternation at each node is longest-first, so the regex prefers the longest phrase
+    that matches at a position, and matching cost does not grow with the phrase count.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        ends = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            # Optional group is greedy, so the longer continuation is tried first
+            return body + "?" if len(branches) == 1 and len(body) == 1 else "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class Mention:
+    __slots__ = ("kind", "name", "text", "start", "end")
+
+    def __init__(self, kind, name, text, start, end):
+        self.kind = kind  # "crop" or "disease"
+        self.name = name  # canonical knowledge_base key
+        self.text = text  # what the query actually said
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Mention({self.kind!r}, {self.name!r}, {self.text!r}, {self.start}, {self.end})"
+
+
+class KnowledgeMatcher:
+    def __init__(self, knowledge_base, crop_synonyms=None, disease_synonyms=None, generate_typos=True):
+        """
+        Args:
+            knowledge_base (dict): {crop: {disease: info}}
+            crop_synonyms (dict): {crop: [alias, ...]}
+            disease_synonyms (dict): {disease: [alias, ...]}
+            generate_typos (bool): also match generated single-edit misspellings
+        """
+        self.knowledge_base = knowledge_base
+        crop_synonyms = crop_synonyms or {}
+        disease_synonyms = disease_synonyms or {}
+
+        # disease -> crops that have it, in knowledge_base order
+        self.disease_crops = {}
+        for crop, diseases in knowledge_base.items():
+            for disease in diseases:
+                self.disease_crops.setdefault(disease, []).append(crop)
+
+        # Exact names and synonyms first, so a generated typo never shadows a real term
+        self.terms = {}
+        for kind, names, synonyms in (("crop", knowledge_base, crop_synonyms),
+                                      ("disease", self.disease_crops, disease_synonyms)):
+            for name in names:
+                for term in [name] + list(synonyms.get(name, [])):
+                    self.terms.setdefault(term.lower(), (kind, name))
+        if generate_typos:
+            for term, target in list(self.terms.items()):
+                if term == target[1]:
+                    for variant in typo_variants(term):
+                        self.terms.setdefault(variant, target)
+
+        self.pattern = re.compile(r"\b(?:" + trie_regex(self.terms) + r")\b")
+
+    def find(self, query):
+        # Every crop/disease mention in query, in order of appearance
+        return [
+            Mention(*self.terms[m.group(0)], m.group(0), m.start(), m.end())
+            for m in self.pattern.finditer(query.lower())
+        ]
+
+    def lookup(self, query):
+        """
+        Resolve a query to knowledge-base entries.
+
+        Returns a list of {"crop", "disease" (None for a crop-only mention), "info"} in order of
+        first mention. A disease pairs with the mentioned crops that have it; with no crop in the
+        query it pairs with every crop that has it. A crop with no paired disease comes back on its own.
+        """
+        # Straight off finditer (no Mention objects): this runs once per chat message
+        crops = []
+        diseases = []
+        order = {}
+        for m in self.pattern.finditer(query.lower()):
+            kind, name = self.terms[m.group(0)]
+            if name not in order:
+                order[name] = m.start()
+                (crops if kind == "crop" else diseases).append(name)
+
+        hits = []
+        seen = set()
+        paired_crops = set()
+        for disease in diseases:
+            owners = self.disease_crops[disease]
+            for crop in ([c for c in crops if c in owners] if crops else owners):
+                if (crop, disease) not in seen:
+                    seen.add((crop, disease))
+                    paired_crops.add(crop)
+                    hits.append({"crop": crop, "disease": disease, "info": self.knowledge_base[crop][disease]})
+        for crop in crops:
+            if crop not in paired_crops:
+                hits.append({"crop": crop, "disease": None, "info": None})
+        if len(hits) > 1:
+            hits.sort(key=lambda h: min(order.get(h["crop"], 1 << 30), order.get(h["disease"], 1 << 30)))
+        return hits
@@ -0,0 +1,230 @@
+# kb_retrieval.py
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------
+# TF-IDF retrieval over knowledge-base entries (CPU only, no model download)
+# - Features: words (light plural stemming, stop words dropped) plus character
+#   3/4-grams of each word, so "blite" or "pustule" still land near the right entry
+# - Entries are vectorised once into an L2-normalised sparse matrix kept as numpy
+#   arrays in column (term-major) order; a query's cosine similarity against every
+#   entry is one sparse matrix-vector product (np.bincount over the query terms' postings)
+#   followed by an argpartition top-k; only the postings of the query's terms are touched
+# - Repeated queries hit an LRU cache
+# ---------------------------
+
+WORD = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its my of on or our "
+    "should the their there these this to was what when where which why will with you your".split()
+)
+
+
+def words(text):
+    out = []
+    for w in WORD.findall(text.lower()):
+        if w in STOP_WORDS:
+            continue
+        if len(w) > 4 and w.endswith("es") and not w.endswith("ses"):
+            w = w[:-2]
+        elif len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        out.append(w)
+    return out
+
+
+def features(text):
+    feats = []
+    for w in words(text):
+        feats.append(w)
+        padded = f" {w} "
+        for n in (3, 4):
+            feats.extend("#" + padded[i:i + n] for i in range(len(padded) - n + 1))
+    return feats
+
+
+def entries_from_knowledge_base(knowledge_base, crop_synonyms=None, disease_synonyms=None):
+    # {crop: {disease: info}} -> retrieval entries, with the matcher's synonyms folded into the text
+    crop_synonyms = crop_synonyms or {}
+    disease_synonyms = disease_synonyms or {}
+    entries = []
+    for crop, diseases in knowledge_base.items():
+        for disease, info in diseases.items():
+            aliases = list(crop_synonyms.get(crop, [])) + list(disease_synonyms.get(disease, []))
+            entries.append({"crop": crop, "disease": disease, "info": info, "aliases": aliases})
+    return entries
+
+
+def load_entries(path):
+    """
+    Read retrieval entries from a JSON file.
+
+    Accepts a knowledge_base.json style file ({"crops": {...}}), the plain knowledge_base
+    shape ({crop: {disease: info}}) or a list of {"crop", "disease", "info", "aliases" (optional)} objects.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("crops"), dict):
+        return [
+            {"crop": crop.lower(), "disease": disease.lower(), "info": d["info"],
+             "aliases": list(c.get("aliases", [])) + list(d.get("aliases", []))}
+            for crop, c in data["crops"].items() for disease, d in c["diseases"].items()
+        ]
+    if isinstance(data, dict):
+        return entries_from_knowledge_base(data)
+    return [{"crop": e["crop"].lower(), "disease": e["disease"].lower(), "info": e["info"],
+             "aliases": list(e.get("aliases", []))} for e in data]
+
+
+class RetrievalIndex:
+    def __init__(self, entries, cache_size=1024):
+        """
+        Args:
+            entries (list): {"crop", "disease", "info", "aliases"} dicts
+            cache_size (int): query results kept in the LRU (0 disables it)
+        """
+        self.entries = list(entries)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        vocab = {}
+        doc_ids = []
+        term_ids = []
+        counts = []
+        for doc, entry in enumerate(self.entries):
+            # Crop and disease names count twice: they are what questions are about
+            text = " ".join([entry["crop"], entry["disease"]] * 2 + list(entry.get("aliases", [])) + [entry["info"]])
+            tf = {}
+            for feat in features(text):
+                tid = vocab.setdefault(feat, len(vocab))
+                tf[tid] = tf.get(tid, 0) + 1
+            doc_ids.extend([doc] * len(tf))
+            term_ids.extend(tf.keys())
+            counts.extend(tf.values())
+        self.vocab = vocab
+        self.crop_ids = {}
+        self.entry_crops = np.asarray([self.crop_ids.setdefault(e["crop"], len(self.crop_ids)) for e in self.entries],
+                                      dtype=np.int32)
+        n_docs = max(1, len(self.entries))
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+        weights = (1.0 + np.log(np.asarray(counts, dtype=np.float32))) * self.idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights * weights, minlength=n_docs)).astype(np.float32)
+        weights /= np.maximum(norms[doc_ids], 1e-12)
+
+        # Term-major (CSC) layout: postings of term t are [term_ptr[t], term_ptr[t + 1])
+        order = np.argsort(term_ids, kind="stable")
+        self.post_docs = doc_ids[order]
+        self.post_weights = weights[order].astype(np.float32)
+        self.term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=self.term_ptr[1:])
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base, crop_synonyms=None, disease_synonyms=None, extra_path=None,
+                            **kwargs):
+        entries = entries_from_knowledge_base(knowledge_base, crop_synonyms, disease_synonyms)
+        if extra_path:
+            entries.extend(load_entries(extra_path))
+        return cls(entries, **kwargs)
+
+    def _query_vector(self, query):
+        tf = {}
+        for feat in features(query):
+            tid = self.vocab.get(feat)
+            if tid is not None:
+                tf[tid] = tf.get(tid, 0) + 1
+        if not tf:
+            return None, None
+        tids = np.fromiter(tf.keys(), dtype=np.int64, count=len(tf))
+        q = (1.0 + np.log(np.fromiter(tf.values(), dtype=np.float32, count=len(tf)))) * self.idf[tids]
+        return tids, q / np.linalg.norm(q)
+
+    def scores(self, query):
+        # Cosine similarity of query against every entry, as a float32 array [n_entries]
+        tids, q = self._query_vector(query)
+        if tids is None:
+            return np.zeros(len(self.entries), dtype=np.float32)
+        starts, ends = self.term_ptr[tids], self.term_ptr[tids + 1]
+        lengths = ends - starts
+        # Flat index of every posting of every query term, without a Python loop per posting
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.post_docs[idx], weights=self.post_weights[idx] * np.repeat(q, lengths),
+                           minlength=len(self.entries)).astype(np.float32)
+
+    def search(self, query, k=3, min_score=0.0, crops=None):
+        """
+        Best-matching entries for query.
+
+        Args:
+            crops (iterable): only rank entries of these crops (default: all)
+
+        Returns up to k {"crop", "disease", "info", "score"} dicts, best first, with score >= min_score.
+        """
+        crops = tuple(sorted(crops)) if crops else None
+        key = (" ".join(query.lower().split()), k, min_score, crops)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+
+        scores = self.scores(query)
+        if crops is not None:
+            wanted = [self.crop_ids[c] for c in crops if c in self.crop_ids]
+            scores[~np.isin(self.entry_crops, wanted)] = 0.0
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = [
+            {"crop": self.entries[i]["crop"], "disease": self.entries[i]["disease"],
+             "info": self.entries[i]["info"], "score": round(float(scores[i]), 4)}
+            for i in top if scores[i] > 0 and scores[i] >= min_score
+        ]
+
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = results
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return list(results)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "features": len(self.vocab),
+                    "cached_queries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def answer(matcher, index, query, min_score=0.25):
+    """
+    Knowledge-base hits for a chat query: exact/synonym mentions first, retrieval as fallback.
+
+    When the query names no disease, whatever it says besides the crop names ("orange powder
+    on the leaves") is ranked by the retrieval index, restricted to the crops it named.
+    Returns matcher.lookup()-shaped hits; retrieved ones also carry "score".
+    """
+    mentions = matcher.find(query)
+    if any(m.kind == "disease" for m in mentions):
+        return matcher.lookup(query)
+    crops = {m.name for m in mentions}
+    lowered = query.lower()
+    rest, pos = [], 0
+    for m in mentions:
+        rest.append(lowered[pos:m.start])
+        pos = m.end
+    rest.append(lowered[pos:])
+    found = index.search(" ".join(rest), k=1, min_score=min_score, crops=crops)
+    return found if found else matcher.lookup(query)
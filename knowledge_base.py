@@ -0,0 +1,226 @@
+# knowledge_base.py
+"""
+Crop disease knowledge base, loaded from a versioned JSON file.
+
+    python knowledge_base.py                      # validate knowledge_base.json and print a summary
+    python knowledge_base.py --labels labels.txt  # also report model labels with no entry
+
+Every run also checks the file against dataset_model_trained, the plain-text list of the
+classes the model was trained on ("Crop: Disease, Disease, ..."). That list stays a separate,
+human-readable file describing the training data; this check keeps the two from drifting.
+
+File layout (KNOWLEDGE_BASE_PATH, default ./knowledge_base.json):
+
+    {"schema": 1, "version": "...",
+     "crops": {"<crop>": {"aliases": [...],
+                          "diseases": {"<disease>": {"info": "...", "aliases": [...]}}}}}
+
+Everything a request needs is indexed once per load (crop -> diseases, label -> entry,
+model class id -> entry, the query matcher and the retrieval index). KnowledgeBaseStore
+re-reads the file when it changes: the new version is built off to the side and swapped
+in with one assignment, so requests already holding the old snapshot finish with it.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from kb_matcher import KnowledgeMatcher
+from kb_retrieval import RetrievalIndex
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json")
+DATASET_CLASSES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset_model_trained")
+SCHEMA = 1
+LABEL_SEPARATORS = re.compile(r"[\s_\-]+")
+
+
+def normalize_label(label):
+    # "Corn___Common_Rust", "corn common rust" and "Corn - Common rust" all become "corn common rust"
+    return LABEL_SEPARATORS.sub(" ", str(label).lower()).strip()
+
+
+def dataset_labels(path=DATASET_CLASSES_PATH):
+    # "Corn: Common Rust, Healthy" lines -> ["Corn Common Rust", "Corn Healthy"]
+    labels = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            crop, _, diseases = line.partition(":")
+            labels.extend(f"{crop.strip()} {d.strip()}" for d in diseases.split(",") if d.strip())
+    return labels
+
+
+class KnowledgeBase:
+    # One immutable, fully indexed version of the file
+    def __init__(self, data, path=None, mtime=None, extra_path=None):
+        if data.get("schema") != SCHEMA:
+            raise ValueError(f"unsupported knowledge base schema {data.get('schema')!r}, expected {SCHEMA}")
+        self.path = path
+        self.mtime = mtime
+        self.version = str(data.get("version", "unversioned"))
+        self.loaded_at = time.time()
+
+        self.diseases = {}  # crop -> {disease: info}, the shape the chat code has always used
+        self.crop_aliases = {}
+        self.disease_aliases = disease_aliases = {}
+        for crop, c in data["crops"].items():
+            crop = crop.lower()
+            self.crop_aliases[crop] = list(c.get("aliases", []))
+            self.diseases[crop] = {}
+            for disease, d in c["diseases"].items():
+                disease = disease.lower()
+                self.diseases[crop][disease] = d["info"]
+                aliases = disease_aliases.setdefault(disease, [])
+                aliases.extend(a for a in d.get("aliases", []) if a not in aliases)
+
+        # label -> entry: "crop disease" for every crop/disease name and alias pair, plus the bare
+        # disease name (first crop wins, as the old per-crop loop did)
+        self.labels = {}
+        for crop, diseases in self.diseases.items():
+            for disease, info in diseases.items():
+                entry = {"crop": crop, "disease": disease, "info": info}
+                for c in [crop] + self.crop_aliases[crop]:
+                    for d in [disease] + disease_aliases.get(disease, []):
+                        self.labels.setdefault(normalize_label(f"{c} {d}"), entry)
+                self.labels.setdefault(normalize_label(disease), entry)
+
+        self.matcher = KnowledgeMatcher(self.diseases, self.crop_aliases, disease_aliases)
+        self.index = RetrievalIndex.from_knowledge_base(self.diseases, self.crop_aliases, disease_aliases,
+                                                        extra_path=extra_path)
+        self._bound = {}
+        self._bind_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None, extra_path=None):
+        path = path or os.environ.get("KNOWLEDGE_BASE_PATH") or DEFAULT_PATH
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data, path=path, mtime=mtime, extra_path=extra_path)
+
+    def crops(self):
+        return list(self.diseases)
+
+    def label_entry(self, label):
+        # {"crop", "disease", "info"} for a model label or free-form "crop disease" text, else None
+        return self.labels.get(normalize_label(label))
+
+    def class_entries(self, id2label):
+        """
+        Reverse map for a model: {class id: entry or None}, built once per id2label and KB version.
+        """
+        key = id(id2label)
+        bound = self._bound.get(key)
+        if bound is None or bound[0] is not id2label:
+            with self._bind_lock:
+                bound = (id2label, {int(i): self.label_entry(label) for i, label in id2label.items()})
+                self._bound[key] = bound
+        return bound[1]
+
+    def summary(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "crops": len(self.diseases),
+            "entries": sum(len(d) for d in self.diseases.values()),
+            "labels": len(self.labels),
+            "patterns": len(self.matcher.terms),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class KnowledgeBaseStore:
+    def __init__(self, path=None, check_interval=2.0, extra_path=None):
+        """
+        Args:
+            path (str): JSON file (default: KNOWLEDGE_BASE_PATH env var, else knowledge_base.json)
+            check_interval (float): seconds between file modification checks (0 = every access)
+            extra_path (str): extra retrieval-only entries (see kb_retrieval.load_entries)
+        """
+        self.path = path or os.environ.get("KNOWLEDGE_BASE_PATH") or DEFAULT_PATH
+        self.check_interval = check_interval
+        self.extra_path = extra_path
+        self.reloads = 0
+        self.reload_error = None
+        self._failed_mtime = None
+        self._reload_lock = threading.Lock()
+        self._next_check = time.monotonic() + check_interval
+        self._kb = KnowledgeBase.load(self.path, extra_path)
+
+    def current(self):
+        """
+        The latest successfully loaded KnowledgeBase.
+
+        At most once per check_interval this stats the file; if it changed, a background thread
+        rebuilds the indexes while every request keeps using the previous snapshot. A file that
+        fails to parse or validate is reported in reload_error and the previous version stays live.
+        """
+        now = time.monotonic()
+        if now >= self._next_check and self._reload_lock.acquire(blocking=False):
+            self._next_check = now + self.check_interval
+            mtime = self._changed_mtime()
+            if mtime is None:
+                self._reload_lock.release()
+            else:
+                threading.Thread(target=self._reload_locked, args=(mtime,), name="kb-reload", daemon=True).start()
+        return self._kb
+
+    def _changed_mtime(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self.reload_error = f"{type(e).__name__}: {e}"
+            return None
+        return None if mtime in (self._kb.mtime, self._failed_mtime) else mtime
+
+    def _reload_locked(self, mtime):
+        try:
+            self._kb = KnowledgeBase.load(self.path, self.extra_path)
+            self.reloads += 1
+            self.reload_error = None
+        except Exception as e:
+            self._failed_mtime = mtime  # do not re-parse the same broken file every interval
+            self.reload_error = f"{type(e).__name__}: {e}"
+            print(f"Warning: keeping knowledge base {self._kb.version}, reload failed:", self.reload_error)
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        # Synchronous reload if the file changed; returns the current snapshot
+        with self._reload_lock:
+            mtime = self._changed_mtime()
+        if mtime is not None:
+            self._reload_lock.acquire()
+            self._reload_locked(mtime)
+        return self._kb
+
+    def status(self):
+        return dict(self._kb.summary(), reloads=self.reloads, reload_error=self.reload_error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the crop disease knowledge base file.")
+    parser.add_argument("path", nargs="?", help="default: KNOWLEDGE_BASE_PATH or knowledge_base.json")
+    parser.add_argument("--labels", help="file with one model label per line; reports labels with no entry")
+    parser.add_argument("--dataset", default=DATASET_CLASSES_PATH,
+                        help="trained class list to check against (default: dataset_model_trained)")
+    args = parser.parse_args(argv)
+
+    kb = KnowledgeBase.load(args.path)
+    s = kb.summary()
+    print(f"{s['path']}: version {s['version']}, {s['crops']} crops, {s['entries']} entries, "
+          f"{s['labels']} label keys, {s['patterns']} query patterns")
+    labels = dataset_labels(args.dataset) if os.path.exists(args.dataset) else []
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels += [line.strip() for line in f if line.strip()]
+    missing = [label for label in labels if kb.label_entry(label) is None]
+    for label in missing:
+        print(f"no entry for label {label!r}", file=sys.stderr)
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,264 +1,556 @@
-import requests
-import json
-import pandas as pd
-from datetime import datetime
-import time
-
-class MandiPriceAPI:
-    def __init__(self, api_key):
-        """
-        Initialize the Mandi Price API client
-        
-        Args:
-            api_key (str): Your API key from data.gov.in
-        """
-        self.api_key = "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b"
-        self.api_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-    
-    def fetch_commodity_prices(self, limit=100, offset=0, filters=None):
-        """
-        Fetch commodity prices from Indian mandi markets
-        
-        Args:
-            limit (int): Number of records to fetch (default: 100)
-            offset (int): Starting point for pagination (default: 0)
-            filters (dict): Optional filters for state, district, market, commodity, etc.
-        
-        Returns:
-            list: List of commodity price records
-        """
-        params = {
-            'api-key': self.api_key,
-            'format': 'json',
-            'limit': limit,
-            'offset': offset
-        }
-        
-        # Add filters if provided
-        if filters:
-            for key, value in filters.items():
-                params[f'filters[{key}]'] = value
-        
-        try:
-            response = requests.get(self.api_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'records' in data:
-                return data['records']
-            else:
-                print("No records found in response")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data: {e}")
-            return None
-    
-    def get_filtered_prices(self, **kwargs):
-        """
-        Get filtered commodity prices
-        
-        Available filters:
-        - state: State name (e.g., "Gujarat", "Punjab")
-        - district: District name
-        - market: Market name
-        - commodity: Commodity name (e.g., "Cotton", "Wheat", "Rice")
-        - variety: Variety of commodity
-        - grade: Grade of commodity
-        """
-        return self.fetch_commodity_prices(filters=kwargs)
-    
-    def get_commodity_by_name(self, commodity_name, limit=50):
-        """
-        Get prices for a specific commodity
-        
-        Args:
-            commodity_name (str): Name of the commodity
-            limit (int): Number of records to fetch
-        """
-        return self.fetch_commodity_prices(
-            limit=limit, 
-            filters={'commodity': commodity_name}
-        )
-    
-    def get_state_prices(self, state_name, limit=50):
-        """
-        Get prices for a specific state
-        
-        Args:
-            state_name (str): Name of the state
-            limit (int): Number of records to fetch
-        """
-        return self.fetch_commodity_prices(
-            limit=limit,
-            filters={'state': state_name}
-        )
-    
-    def display_prices(self, records, show_count=10):
-        """
-        Display commodity prices in a formatted way
-        """
-        if not records:
-            print("No data to display")
-            return
-        
-        print(f"\n{'='*80}")
-        print(f"MANDI COMMODITY PRICES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*80}")
-        
-        for i, record in enumerate(records[:show_count]):
-            print(f"\n{i+1}. {record['commodity']} - {record['variety']}")
-            print(f"   Location: {record['market']}, {record['district']}, {record['state']}")
-            print(f"   Date: {record['arrival_date']}")
-            print(f"   Price Range: ₹{record['min_price']} - ₹{record['max_price']}")
-            print(f"   Modal Price: ₹{record['modal_price']} ({record['grade']})")
-        
-        if len(records) > show_count:
-            print(f"\n... and {len(records) - show_count} more records")
-    
-    def save_to_csv(self, records, filename=None):
-        """
-        Save commodity data to CSV file
-        """
-        if not records:
-            print("No data to save")
-            return None
-        
-        if not filename:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"mandi_prices_{timestamp}.csv"
-        
-        df = pd.DataFrame(records)
-        df.to_csv(filename, index=False)
-        print(f"Data saved to {filename}")
-        return filename
-    
-    def get_price_summary(self, records):
-        """
-        Get summary statistics for the fetched prices
-        """
-        if not records:
-            return None
-        
-        df = pd.DataFrame(records)
-        
-        # Convert price columns to numeric
-        price_cols = ['min_price', 'max_price', 'modal_price']
-        for col in price_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        summary = {
-            'total_records': len(records),
-            'unique_commodities': df['commodity'].nunique(),
-            'unique_states': df['state'].nunique(),
-            'unique_markets': df['market'].nunique(),
-            'latest_date': df['arrival_date'].max(),
-            'price_range': {
-                'min_modal_price': df['modal_price'].min(),
-                'max_modal_price': df['modal_price'].max(),
-                'avg_modal_price': df['modal_price'].mean()
-            }
-        }
-        
-        return summary
-
-# =============================================================================
-# MAIN USAGE SCRIPT - JUST PASTE YOUR API KEY BELOW
-# =============================================================================
-
-def main():
-    # 🔑 PASTE YOUR API KEY HERE
-    API_KEY = "YOUR_API_KEY_HERE"
-    
-    # Initialize the API client
-    mandi_api = MandiPriceAPI(API_KEY)
-    
-    print("🌾 MANDI COMMODITY PRICE FETCHER 🌾")
-    print("=" * 50)
-    
-    # Example 1: Get latest 20 commodity prices
-    print("\n1. Latest 20 Commodity Prices:")
-    latest_prices = mandi_api.fetch_commodity_prices(limit=20)
-    if latest_prices:
-        mandi_api.display_prices(latest_prices, show_count=5)
-    
-    # Example 2: Get cotton prices
-    print("\n2. Cotton Prices:")
-    cotton_prices = mandi_api.get_commodity_by_name("Cotton", limit=10)
-    if cotton_prices:
-        mandi_api.display_prices(cotton_prices, show_count=3)
-    
-    # Example 3: Get prices for a specific state (Gujarat)
-    print("\n3. Gujarat State Prices:")
-    gujarat_prices = mandi_api.get_state_prices("Gujarat", limit=10)
-    if gujarat_prices:
-        mandi_api.display_prices(gujarat_prices, show_count=3)
-    
-    # Example 4: Get filtered prices
-    print("\n4. Wheat prices in Punjab:")
-    wheat_punjab = mandi_api.get_filtered_prices(
-        commodity="Wheat",
-        state="Punjab"
-    )
-    if wheat_punjab:
-        mandi_api.display_prices(wheat_punjab, show_count=3)
-    
-    # Example 5: Save data to CSV
-    print("\n5. Saving data to CSV:")
-    if latest_prices:
-        csv_file = mandi_api.save_to_csv(latest_prices)
-        
-        # Show summary
-        summary = mandi_api.get_price_summary(latest_prices)
-        if summary:
-            print(f"\nData Summary:")
-            print(f"- Total Records: {summary['total_records']}")
-            print(f"- Unique Commodities: {summary['unique_commodities']}")
-            print(f"- Unique States: {summary['unique_states']}")
-            print(f"- Latest Date: {summary['latest_date']}")
-            print(f"- Price Range: ₹{summary['price_range']['min_modal_price']:.0f} - ₹{summary['price_range']['max_modal_price']:.0f}")
-
-# =============================================================================
-# SIMPLE FUNCTIONS FOR QUICK USE
-# =============================================================================
-
-def quick_fetch(api_key, commodity=None, state=None, limit=20):
-    """
-    Quick function to fetch prices with minimal setup
-    
-    Usage:
-        data = quick_fetch("your_api_key", commodity="Rice", limit=10)
-    """
-    api = MandiPriceAPI(api_key)
-    
-    filters = {}
-    if commodity:
-        filters['commodity'] = commodity
-    if state:
-        filters['state'] = state
-    
-    if filters:
-        return api.fetch_commodity_prices(limit=limit, filters=filters)
-    else:
-        return api.fetch_commodity_prices(limit=limit)
-
-def show_commodities(api_key, limit=50):
-    """
-    Show available commodities in the system
-    """
-    api = MandiPriceAPI(api_key)
-    records = api.fetch_commodity_prices(limit=limit)
-    
-    if records:
-        commodities = set(record['commodity'] for record in records)
-        print("Available Commodities:")
-        for i, commodity in enumerate(sorted(commodities), 1):
-            print(f"{i}. {commodity}")
-        return list(commodities)
-    
-    return []
-
-# Run the main function
-if __name__ == "__main__":
-    main()
+import requests
+import json
+import os
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http_cache import shared_cache
+from pandas.api.types import union_categoricals
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+
+# Responses worth retrying: rate limiting and the gateway errors data.gov.in returns under load
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Typed frame layout: few distinct values -> category, prices -> float32, dates -> datetime64
+CATEGORY_COLUMNS = ['state', 'district', 'market', 'commodity', 'variety', 'grade']
+PRICE_COLUMNS = ['min_price', 'max_price', 'modal_price']
+FRAME_COLUMNS = CATEGORY_COLUMNS + ['arrival_date'] + PRICE_COLUMNS
+API_DATE_FORMAT = '%d/%m/%Y'
+
+
+def _parse_repeated(values, parse, missing):
+    # Parse each distinct string once and broadcast the results: a million records share a
+    # few thousand price strings and a handful of dates. Code -1 (None) picks `missing`.
+    codes, uniques = pd.factorize(values)
+    return np.append(np.asarray(parse(uniques)), missing)[codes]
+
+
+def records_to_frame(records):
+    """
+    Parse API records (dicts with string prices and dd/mm/yyyy dates) once into a typed DataFrame
+    
+    Location and commodity columns become categoricals, prices float32 (NaN where blank or
+    unparseable) and arrival_date datetime64, so summaries run on arrays instead of strings.
+    A DataFrame passed in is returned unchanged.
+    """
+    if isinstance(records, pd.DataFrame):
+        return records
+    df = pd.DataFrame.from_records(records, columns=FRAME_COLUMNS)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    df['arrival_date'] = _parse_repeated(
+        df['arrival_date'], lambda u: pd.to_datetime(u, format=API_DATE_FORMAT, errors='coerce'), np.datetime64('NaT'))
+    for col in PRICE_COLUMNS:
+        df[col] = _parse_repeated(
+            df[col], lambda u: pd.to_numeric(u, errors='coerce').astype('float32'), np.float32('nan'))
+    return df
+
+
+def frame_from_records(records, chunk_size=100000):
+    """
+    Typed DataFrame from any iterable of records (e.g. iter_all_records), parsed chunk by chunk
+    so at most chunk_size record dicts are alive at once
+    """
+    chunks, batch = [], []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            chunks.append(records_to_frame(batch))
+            batch = []
+    if batch or not chunks:
+        chunks.append(records_to_frame(batch))
+    if len(chunks) == 1:
+        return chunks[0]
+    # Plain concat would turn categoricals with different categories back into object columns
+    columns = {}
+    for col in FRAME_COLUMNS:
+        if col in CATEGORY_COLUMNS:
+            columns[col] = union_categoricals([chunk[col] for chunk in chunks])
+        else:
+            columns[col] = pd.concat([chunk[col] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def frame_to_records(df):
+    # Typed frame -> API-shaped dicts (dd/mm/yyyy dates, prices as strings without a trailing .0)
+    out = df.astype({col: str for col in CATEGORY_COLUMNS})
+    out['arrival_date'] = df['arrival_date'].dt.strftime(API_DATE_FORMAT)
+    for col in PRICE_COLUMNS:
+        out[col] = df[col].map(lambda v: '' if pd.isna(v) else f"{v:.7g}")
+    return out.to_dict('records')
+
+
+def price_stats(records, by=('commodity',)):
+    """
+    Grouped modal price statistics, computed column-wise on the typed frame
+    
+    Args:
+        records (list or DataFrame): API records or a frame from records_to_frame
+        by (str or list): Grouping columns, e.g. 'commodity' or ['state', 'market']
+    
+    Returns:
+        DataFrame indexed by `by` with records, min_price, max_price, mean/median modal price,
+        latest_date, and modal_change / modal_change_pct: the change in the mean modal price
+        between the group's latest arrival date and the one before it (NaN with a single date)
+    """
+    df = records_to_frame(records)
+    by = [by] if isinstance(by, str) else list(by)
+    stats = df.groupby(by, observed=True).agg(
+        records=('modal_price', 'size'),
+        min_price=('min_price', 'min'),
+        max_price=('max_price', 'max'),
+        mean_modal_price=('modal_price', 'mean'),
+        median_modal_price=('modal_price', 'median'),
+        latest_date=('arrival_date', 'max'),
+    )
+    # Mean modal price per group and day (sorted by date within each group), then the
+    # last day's difference to the previous one
+    daily = df['modal_price'].astype('float64').groupby([df[col] for col in by + ['arrival_date']],
+                                                        observed=True).mean()
+    per_group = daily.groupby(level=by, observed=True)
+    latest = per_group.tail(1).droplevel('arrival_date')
+    change = per_group.diff().groupby(level=by, observed=True).tail(1).droplevel('arrival_date')
+    stats['modal_change'] = change
+    stats['modal_change_pct'] = change / (latest - change) * 100
+    prices = ['min_price', 'max_price', 'mean_modal_price', 'median_modal_price', 'modal_change', 'modal_change_pct']
+    stats[prices] = stats[prices].astype('float64').round(2)
+    return stats
+
+
+class IncompletePageError(requests.exceptions.RequestException):
+    """A page came back shorter than the reported total requires, even after refetching it."""
+
+
+class MandiPriceAPI:
+    def __init__(self, api_key, api_url=None, timeout=30, max_retries=4, backoff=0.5, pool_size=16, local_db=None,
+                 cache=None, cache_ttl=None):
+        """
+        Initialize the Mandi Price API client
+        
+        Args:
+            api_key (str): Your API key from data.gov.in
+            api_url (str): Resource URL (default: MANDI_API_URL env var, else data.gov.in); point it at a
+                local stub server for testing
+            timeout (float): Seconds to wait for each response
+            max_retries (int): Retries per request on connection errors and 429/5xx responses
+            backoff (float): Base delay for exponential backoff between retries (0.5 -> 0.5s, 1s, 2s, ...)
+            pool_size (int): Keep-alive connections kept open to the API host
+            local_db (str): SQLite store (mandi_store.py); when set, the get_* helpers answer from it
+                and only call the API for data it has not synced yet (see mandi_query.py)
+            cache (HTTPCache): response cache for fetch_commodity_prices (default: the process-wide
+                http_cache.shared_cache(), shared with the weather client)
+            cache_ttl (float): Seconds a cached page stays fresh (default: MANDI_CACHE_TTL env var, else
+                3600 - prices are published daily); 0 disables storing, identical calls are still coalesced
+        """
+        self.api_key = "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b"
+        self.api_url = api_url or os.environ.get(
+            "MANDI_API_URL", "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070")
+        self.timeout = timeout
+        self.cache = cache or shared_cache()
+        self.cache_ttl = float(os.environ.get("MANDI_CACHE_TTL", "3600")) if cache_ttl is None else cache_ttl
+        
+        # One pooled session for every call: TCP/TLS handshakes are paid once per connection,
+        # not once per page. Retries (with Retry-After support) happen inside the adapter.
+        retry = Retry(
+            total=max_retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]), respect_retry_after_header=True, raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+        
+        self.local = None
+        if local_db:
+            from mandi_query import MandiQuery
+            from mandi_store import MandiStore
+            self.local = MandiQuery(MandiStore(local_db), api=self, background_sync=True)
+    
+    def _local_records(self, limit, filters):
+        # Until the first sync of these filters has finished, answer from the API as without local_db
+        from mandi_query import to_api_record
+        records = self.local.records(limit=limit, **filters)
+        if self.local.last_plan["pending"]:
+            return self.fetch_commodity_prices(limit=limit, filters=filters)
+        return [to_api_record(r) for r in records]
+    
+    def _get_page(self, limit, offset, filters=None, cached=False):
+        # One raw API response (dict with 'total', 'count', 'records', ...); raises on failure.
+        # Bulk paging and sync probes stay uncached: they must see the source as it is now.
+        params = {
+            'api-key': self.api_key,
+            'format': 'json',
+            'limit': limit,
+            'offset': offset
+        }
+        if filters:
+            for key, value in filters.items():
+                params[f'filters[{key}]'] = value
+        
+        if cached:
+            response = self.cache.get(self.api_url, params=params, ttl=self.cache_ttl, session=self.session,
+                                      timeout=self.timeout)
+        else:
+            response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def fetch_commodity_prices(self, limit=100, offset=0, filters=None):
+        """
+        Fetch commodity prices from Indian mandi markets
+        
+        Args:
+            limit (int): Number of records to fetch (default: 100)
+            offset (int): Starting point for pagination (default: 0)
+            filters (dict): Optional filters for state, district, market, commodity, etc.
+        
+        Returns:
+            list: List of commodity price records
+        
+        Repeated calls are answered from the response cache for cache_ttl seconds.
+        """
+        try:
+            data = self._get_page(limit, offset, filters, cached=True)
+            
+            if 'records' in data:
+                return data['records']
+            else:
+                print("No records found in response")
+                return None
+                
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching data: {e}")
+            return None
+    
+    def count_records(self, filters=None):
+        """
+        Total number of records matching the filters (one single-record request)
+        """
+        return int(self._get_page(1, 0, filters).get('total', 0))
+    
+    def probe(self, offset, filters=None):
+        """
+        Total record count and the single record at `offset` (None past the end), in one request
+        """
+        data = self._get_page(1, offset, filters)
+        records = data.get('records') or []
+        return int(data.get('total', 0)), (records[0] if records else None)
+    
+    def iter_all_records(self, filters=None, page_size=1000, concurrency=8, max_records=None, offset=0):
+        """
+        Fetch every matching record, several pages at a time, yielding records in offset order
+        
+        The first page also reports the total record count; the remaining pages are fetched by
+        a pool of `concurrency` threads sharing the session, at most 2 * concurrency pages ahead
+        of the consumer. A page that still fails after the retries raises, and so does one that
+        stays shorter than the total requires after being refetched (IncompletePageError): the
+        result is either complete or an error, never silently missing rows.
+        
+        Args:
+            filters (dict): Same filters as fetch_commodity_prices
+            page_size (int): Records per request
+            concurrency (int): Pages in flight at once
+            max_records (int): Stop after this many records (default: all)
+            offset (int): Skip the first `offset` records (resume an earlier pull)
+        
+        Yields:
+            dict: One commodity price record at a time
+        """
+        first = self._get_page(page_size, offset, filters)
+        total = int(first.get('total', 0))
+        if max_records is not None:
+            total = min(total, offset + max_records)
+        records = first.get('records') or []
+        if total > offset:
+            # An empty first page says nothing about the server's page cap: refetch it first
+            records = self._complete_page(records, 1, page_size, offset, filters)
+        yield from records[:max(0, total - offset)]
+        if len(records) < min(page_size, total - offset):
+            page_size = len(records)  # the server caps the page size below what we asked for
+        
+        offsets = range(offset + len(records), total, page_size)
+        pool = ThreadPoolExecutor(max(1, concurrency), thread_name_prefix="mandi-fetch")
+        pending = deque()
+        try:
+            for offset in offsets:
+                pending.append((offset, pool.submit(self._get_page, page_size, offset, filters)))
+                if len(pending) < 2 * concurrency:
+                    continue
+                yield from self._page_records(*pending.popleft(), total, page_size, filters)
+            while pending:
+                yield from self._page_records(*pending.popleft(), total, page_size, filters)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _page_records(self, offset, future, total, page_size, filters):
+        # Every page but the last must be full; anything shorter would leave a silent gap
+        expected = min(page_size, total - offset)
+        records = self._complete_page(future.result().get('records') or [], expected, page_size, offset, filters)
+        return records[:expected]
+    
+    def _complete_page(self, records, expected, page_size, offset, filters, attempts=2):
+        # Refetch a page that came back with fewer than `expected` records; raise if it stays short
+        for _ in range(attempts):
+            if len(records) >= expected:
+                break
+            records = self._get_page(page_size, offset, filters).get('records') or []
+        if len(records) < expected:
+            raise IncompletePageError(f"page at offset {offset} returned {len(records)} records, "
+                                      f"expected {expected}")
+        return records
+    
+    def fetch_all_records(self, filters=None, page_size=1000, concurrency=8, max_records=None, offset=0):
+        """
+        List of every matching record (see iter_all_records)
+        """
+        return list(self.iter_all_records(filters, page_size, concurrency, max_records, offset))
+    
+    def fetch_frame(self, filters=None, page_size=1000, concurrency=8, max_records=None):
+        """
+        Every matching record as a typed DataFrame (see records_to_frame), parsed while the
+        pages arrive; from the local store when local_db is set and these filters have been synced
+        """
+        records = None
+        if self.local is not None:
+            from mandi_query import to_api_record
+            rows = self.local.records(limit=max_records, **(filters or {}))
+            if not self.local.last_plan["pending"]:
+                records = map(to_api_record, rows)
+        if records is None:
+            records = self.iter_all_records(filters, page_size, concurrency, max_records)
+        return frame_from_records(records)
+    
+    def get_filtered_prices(self, **kwargs):
+        """
+        Get filtered commodity prices
+        
+        Available filters:
+        - state: State name (e.g., "Gujarat", "Punjab")
+        - district: District name
+        - market: Market name
+        - commodity: Commodity name (e.g., "Cotton", "Wheat", "Rice")
+        - variety: Variety of commodity
+        - grade: Grade of commodity
+        """
+        if self.local is not None:
+            return self._local_records(100, kwargs)
+        return self.fetch_commodity_prices(filters=kwargs)
+    
+    def get_commodity_by_name(self, commodity_name, limit=50):
+        """
+        Get prices for a specific commodity
+        
+        Args:
+            commodity_name (str): Name of the commodity
+            limit (int): Number of records to fetch
+        """
+        if self.local is not None:
+            return self._local_records(limit, {'commodity': commodity_name})
+        return self.fetch_commodity_prices(
+            limit=limit, 
+            filters={'commodity': commodity_name}
+        )
+    
+    def get_state_prices(self, state_name, limit=50):
+        """
+        Get prices for a specific state
+        
+        Args:
+            state_name (str): Name of the state
+            limit (int): Number of records to fetch
+        """
+        if self.local is not None:
+            return self._local_records(limit, {'state': state_name})
+        return self.fetch_commodity_prices(
+            limit=limit,
+            filters={'state': state_name}
+        )
+    
+    def display_prices(self, records, show_count=10):
+        """
+        Display commodity prices in a formatted way (records or a typed DataFrame)
+        """
+        if records is None or len(records) == 0:
+            print("No data to display")
+            return
+        total = len(records)
+        if isinstance(records, pd.DataFrame):
+            records = frame_to_records(records.head(show_count))
+        
+        print(f"\n{'='*80}")
+        print(f"MANDI COMMODITY PRICES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"{'='*80}")
+        
+        for i, record in enumerate(records[:show_count]):
+            print(f"\n{i+1}. {record['commodity']} - {record['variety']}")
+            print(f"   Location: {record['market']}, {record['district']}, {record['state']}")
+            print(f"   Date: {record['arrival_date']}")
+            print(f"   Price Range: ₹{record['min_price']} - ₹{record['max_price']}")
+            print(f"   Modal Price: ₹{record['modal_price']} ({record['grade']})")
+        
+        if total > show_count:
+            print(f"\n... and {total - show_count} more records")
+    
+    def save_to_csv(self, records, filename=None):
+        """
+        Save commodity data (records or a typed DataFrame) to CSV file
+        """
+        if records is None or len(records) == 0:
+            print("No data to save")
+            return None
+        
+        if not filename:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"mandi_prices_{timestamp}.csv"
+        
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        df.to_csv(filename, index=False, date_format=API_DATE_FORMAT, float_format='%.7g')
+        print(f"Data saved to {filename}")
+        return filename
+    
+    def get_price_summary(self, records, by=None):
+        """
+        Get summary statistics for the fetched prices
+        
+        Args:
+            records (list or DataFrame): API records, or a typed frame from fetch_frame/records_to_frame
+                (parse once with records_to_frame when summarising the same records repeatedly)
+            by (str or list): Group by these columns instead (e.g. 'commodity', ['state', 'market']);
+                returns price_stats() for them
+        """
+        if records is None or len(records) == 0:
+            return None
+        
+        df = records_to_frame(records)
+        if by is not None:
+            return price_stats(df, by)
+        
+        latest = df['arrival_date'].max()
+        summary = {
+            'total_records': len(df),
+            'unique_commodities': df['commodity'].nunique(),
+            'unique_states': df['state'].nunique(),
+            'unique_markets': df['market'].nunique(),
+            'latest_date': latest.strftime(API_DATE_FORMAT) if pd.notna(latest) else None,
+            'price_range': {
+                'min_modal_price': float(df['modal_price'].min()),
+                'max_modal_price': float(df['modal_price'].max()),
+                'avg_modal_price': float(df['modal_price'].astype('float64').mean())
+            }
+        }
+        
+        return summary
+
+# =============================================================================
+# MAIN USAGE SCRIPT - JUST PASTE YOUR API KEY BELOW
+# =============================================================================
+
+
+def main():
+    # 🔑 PASTE YOUR API KEY HERE
+    API_KEY = "YOUR_API_KEY_HERE"
+    
+    # Initialize the API client
+    mandi_api = MandiPriceAPI(API_KEY)
+    
+    print("🌾 MANDI COMMODITY PRICE FETCHER 🌾")
+    print("=" * 50)
+    
+    # Example 1: Get latest 20 commodity prices
+    print("\n1. Latest 20 Commodity Prices:")
+    latest_prices = mandi_api.fetch_commodity_prices(limit=20)
+    if latest_prices:
+        mandi_api.display_prices(latest_prices, show_count=5)
+    
+    # Example 2: Get cotton prices
+    print("\n2. Cotton Prices:")
+    cotton_prices = mandi_api.get_commodity_by_name("Cotton", limit=10)
+    if cotton_prices:
+        mandi_api.display_prices(cotton_prices, show_count=3)
+    
+    # Example 3: Get prices for a specific state (Gujarat)
+    print("\n3. Gujarat State Prices:")
+    gujarat_prices = mandi_api.get_state_prices("Gujarat", limit=10)
+    if gujarat_prices:
+        mandi_api.display_prices(gujarat_prices, show_count=3)
+    
+    # Example 4: Get filtered prices
+    print("\n4. Wheat prices in Punjab:")
+    wheat_punjab = mandi_api.get_filtered_prices(
+        commodity="Wheat",
+        state="Punjab"
+    )
+    if wheat_punjab:
+        mandi_api.display_prices(wheat_punjab, show_count=3)
+    
+    # Example 5: Save data to CSV
+    print("\n5. Saving data to CSV:")
+    if latest_prices:
+        csv_file = mandi_api.save_to_csv(latest_prices)
+        
+        # Show summary
+        summary = mandi_api.get_price_summary(latest_prices)
+        if summary:
+            print(f"\nData Summary:")
+            print(f"- Total Records: {summary['total_records']}")
+            print(f"- Unique Commodities: {summary['unique_commodities']}")
+            print(f"- Unique States: {summary['unique_states']}")
+            print(f"- Latest Date: {summary['latest_date']}")
+            print(f"- Price Range: ₹{summary['price_range']['min_modal_price']:.0f} - ₹{summary['price_range']['max_modal_price']:.0f}")
+        
+        # Per-commodity statistics, including the day-over-day change in modal price
+        print("\nBy Commodity:")
+        print(mandi_api.get_price_summary(latest_prices, by='commodity').to_string())
+
+# =============================================================================
+# SIMPLE FUNCTIONS FOR QUICK USE
+# =============================================================================
+
+def quick_fetch(api_key, commodity=None, state=None, limit=20):
+    """
+    Quick function to fetch prices with minimal setup
+    
+    Usage:
+        data = quick_fetch("your_api_key", commodity="Rice", limit=10)
+    """
+    api = MandiPriceAPI(api_key)
+    
+    filters = {}
+    if commodity:
+        filters['commodity'] = commodity
+    if state:
+        filters['state'] = state
+    
+    if filters:
+        return api.fetch_commodity_prices(limit=limit, filters=filters)
+    else:
+        return api.fetch_commodity_prices(limit=limit)
+
+def show_commodities(api_key, limit=50, local_db=None):
+    """
+    Show available commodities in the system
+    
+    With local_db (see mandi_store.py) every synced commodity is listed from the local
+    store; otherwise only those in the first `limit` downloaded records.
+    """
+    api = MandiPriceAPI(api_key, local_db=local_db)
+    if api.local is not None:
+        records = [{'commodity': value} for value, _ in api.local.distinct('commodity')]
+    else:
+        records = api.fetch_commodity_prices(limit=limit)
+    
+    if records:
+        commodities = set(record['commodity'] for record in records)
+        print("Available Commodities:")
+        for i, commodity in enumerate(sorted(commodities), 1):
+            print(f"{i}. {commodity}")
+        return list(commodities)
+    
+    return []
+
+# Run the main function
+if __name__ == "__main__":
+    main()
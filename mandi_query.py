@@ -0,0 +1,299 @@
+# mandi_query.py
+"""
+Mandi price queries answered from the local store (mandi_store.py); the API is only asked for what it lacks.
+
+    python mandi_query.py records --commodity Wheat --state Punjab --from 2026-10-10
+    python mandi_query.py distinct commodity
+    python mandi_query.py summary --group-by state commodity --from 2026-10-01
+    python mandi_query.py records --commodity Onion --explain    # show what would be fetched, fetch nothing
+
+Filters (state, district, market, commodity, variety, grade) match case-insensitively and use
+the store's indexes; date ranges on their own use the table's date-first key. distinct() and
+summary() over arrival_date, state and commodity only read the daily_summary rollup.
+Before a query runs, its filters and dates are checked against what has been synced:
+
+  - no synced filter set covers the filters (a covering set has the same or fewer filters):
+    with a date range, fetch just those days (at most max_remote_days, as below); without one,
+    sync these filters once, then answer locally from then on. With background_sync that first
+    sync runs in a thread and the plan is marked "pending", so a caller serving a request can
+    answer from the API meanwhile instead of waiting for the whole pull
+  - the covering set is older than max_age and the range reaches its newest date: incremental
+    sync of that set (usually one request when nothing is new)
+  - the range starts before the covered dates: fetch the missing days with the API's
+    arrival_date filter, at most max_remote_days, each remembered so it is fetched only once
+  - otherwise nothing leaves the machine
+Without an API client every query is local only.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from mandi_store import KEY_FIELDS, PRICE_FIELDS, MandiStore, filter_key, load_mandi_api
+
+FILTER_FIELDS = ("state", "district", "market", "commodity", "variety", "grade")
+RECORD_FIELDS = KEY_FIELDS + PRICE_FIELDS
+NOCASE_INDEXED = ("state", "commodity", "market")  # grouping in the index's collation avoids a sort
+# Questions only about these fields are answered from the store's daily_summary rollup
+SUMMARY_FIELDS = ("arrival_date", "state", "commodity")
+
+
+def to_date(value):
+    # None, a date, "2026-10-17" or "17/10/2026" -> date or None
+    if value is None or isinstance(value, date):
+        return value
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(str(value), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {value!r}, expected yyyy-mm-dd or dd/mm/yyyy")
+
+
+def to_api_record(record):
+    # Local row -> the string-valued shape the API returns (dd/mm/yyyy dates)
+    out = {f: record[f] for f in KEY_FIELDS}
+    out["arrival_date"] = to_date(record["arrival_date"]).strftime("%d/%m/%Y")
+    for f in PRICE_FIELDS:
+        value = record[f]
+        out[f] = "" if value is None else str(int(value)) if float(value).is_integer() else str(value)
+    return out
+
+
+def covers(synced, filters):
+    # A filter set covers a query when each of its filters is also in the query
+    wanted = {k: str(v).lower() for k, v in filters.items()}
+    return all(wanted.get(k) == str(v).lower() for k, v in synced.items())
+
+
+class MandiQuery:
+    def __init__(self, store, api=None, max_age_seconds=6 * 3600, max_remote_days=31, page_size=1000, concurrency=8,
+                 background_sync=False):
+        """
+        Args:
+            store (MandiStore): local price store
+            api (MandiPriceAPI): client for missing data (None = local only)
+            max_age_seconds (float): how old a sync may be before a query reaching its newest date re-syncs
+            max_remote_days (int): most single days fetched for one query
+            page_size (int): records per API request
+            concurrency (int): API requests in flight
+            background_sync (bool): run a first sync for uncovered filters in a thread instead of in the query
+        """
+        self.store = store
+        self.api = api
+        self.max_age = max_age_seconds
+        self.max_remote_days = max_remote_days
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.background_sync = background_sync
+        self.last_plan = None
+        self.sync_error = None  # last exception of a background sync
+        self._lock = threading.Lock()
+        self._syncing = set()  # filter keys with a background sync running
+
+    # ---------------------------
+    # Coverage and remote fallback
+    # ---------------------------
+    def plan(self, filters=None, date_from=None, date_to=None):
+        """
+        What the API would be asked before answering: {"sync": filters or None, "days": [ISO dates],
+        "covered_by": the synced filter set used, or None}.
+        """
+        filters = filters or {}
+        today = date.today()
+        lo = to_date(date_from)
+        hi = min(to_date(date_to) or today, today)
+        synced = [s for s in self.store.sync_states() if s["last_arrival_date"] and covers(s["filters"], filters)]
+        if not synced:
+            # Only the asked window when there is one, rather than every record for these filters
+            plan = {"sync": filters if lo is None else None, "days": [], "covered_by": None}
+            if lo is not None:
+                plan["days"] = self._missing_days(filters, lo, hi)
+            return plan
+
+        best = max(synced, key=lambda s: (s["last_arrival_date"], s["synced_at"]))
+        first = date.fromisoformat(best["first_arrival_date"] or best["last_arrival_date"])
+        last = date.fromisoformat(best["last_arrival_date"])
+        stale = time.time() - best["synced_at"] > self.max_age
+        plan = {"sync": best["filters"] if stale and hi >= last else None, "days": [],
+                "covered_by": best["filters"]}
+        if lo is not None and lo < first:
+            plan["days"] = self._missing_days(filters, lo, min(hi, first - timedelta(days=1)))
+        return plan
+
+    def _missing_days(self, filters, lo, hi):
+        # Days from hi back to lo not fetched yet for these filters, newest first, at most max_remote_days
+        fetched = self.store.fetched_days(filters)
+        days, day = [], hi
+        while day >= lo and len(days) < self.max_remote_days:
+            if day.isoformat() not in fetched:
+                days.append(day.isoformat())
+            day -= timedelta(days=1)
+        return days
+
+    def refresh(self, filters=None, date_from=None, date_to=None):
+        # Carry out plan() (no-op without an API client); the outcome is kept in last_plan
+        started = time.perf_counter()
+        plan = self.plan(filters, date_from, date_to) if self.api is not None else {"sync": None, "days": []}
+        plan["remote_records"] = 0
+        plan["pending"] = False
+        if plan["sync"] is not None and self.background_sync and plan["covered_by"] is None:
+            self._sync_in_background(plan["sync"])
+            plan["pending"] = True
+        elif plan["sync"] is not None:
+            result = self.store.sync(self.api, plan["sync"], self.page_size, self.concurrency)
+            plan["remote_records"] += result["fetched"]
+        for day in plan["days"]:
+            plan["remote_records"] += self.store.fetch_day(self.api, filters, day, self.page_size, self.concurrency)
+        plan["remote_seconds"] = round(time.perf_counter() - started, 3)
+        self.last_plan = plan
+        return plan
+
+    def _sync_in_background(self, filters):
+        # One sync per filter set at a time, on its own connection (sqlite3 connections stay in their thread)
+        key = filter_key(filters)
+        with self._lock:
+            if key in self._syncing:
+                return
+            self._syncing.add(key)
+
+        def run():
+            try:
+                with MandiStore(self.store.path) as store:
+                    store.sync(self.api, filters, self.page_size, self.concurrency)
+            except Exception as e:
+                self.sync_error = e
+            finally:
+                with self._lock:
+                    self._syncing.discard(key)
+
+        threading.Thread(target=run, name="mandi-sync", daemon=True).start()
+
+    def syncing(self):
+        with self._lock:
+            return bool(self._syncing)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def _where(self, filters, date_from, date_to):
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"unknown filter {field!r}, expected one of {', '.join(FILTER_FIELDS)}")
+            clauses.append(f"{field} = ? COLLATE NOCASE")
+            params.append(str(value))
+        if date_from is not None:
+            clauses.append("arrival_date >= ?")
+            params.append(to_date(date_from).isoformat())
+        if date_to is not None:
+            clauses.append("arrival_date <= ?")
+            params.append(to_date(date_to).isoformat())
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, select, filters, date_from, date_to, tail="", extra=(), table="prices"):
+        self.refresh(filters, date_from, date_to)
+        if table == "daily_summary":
+            self.store.refresh_summary()
+        where, params = self._where(filters, date_from, date_to)
+        return self.store.conn.execute(f"SELECT {select} FROM {table}{where}{tail}", params + list(extra)).fetchall()
+
+    @staticmethod
+    def _summarisable(fields, filters):
+        return all(f in SUMMARY_FIELDS for f in fields) and all(f in SUMMARY_FIELDS for f in filters)
+
+    def records(self, date_from=None, date_to=None, limit=None, **filters):
+        """
+        Matching price records, newest arrival date first.
+
+        Returns:
+            list: dicts with ISO arrival_date and float prices (to_api_record() gives the API's shape)
+        """
+        tail = " ORDER BY arrival_date DESC, " + ", ".join(KEY_FIELDS[1:])
+        extra = ()
+        if limit is not None:
+            tail += " LIMIT ?"
+            extra = (int(limit),)
+        rows = self._query(", ".join(RECORD_FIELDS), filters, date_from, date_to, tail, extra)
+        return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
+    def distinct(self, field, date_from=None, date_to=None, **filters):
+        """
+        [(value, records)] for one field (e.g. every commodity traded in a state), sorted by value.
+        """
+        if field not in KEY_FIELDS:
+            raise ValueError(f"unknown field {field!r}, expected one of {', '.join(KEY_FIELDS)}")
+        if self._summarisable([field], filters):
+            return [tuple(row) for row in self._query(f"{field}, SUM(records)", filters, date_from, date_to,
+                                                      f" GROUP BY {field} ORDER BY {field}", table="daily_summary")]
+        group = f"{field} COLLATE NOCASE" if field in NOCASE_INDEXED else field
+        return [tuple(row) for row in self._query(f"{field}, COUNT(*)", filters, date_from, date_to,
+                                                  f" GROUP BY {group} ORDER BY {group}")]
+
+    def summary(self, group_by=("commodity",), date_from=None, date_to=None, **filters):
+        """
+        Per-group record count, price range, mean modal price and date span.
+        """
+        group_by = list(group_by)
+        unknown = [g for g in group_by if g not in KEY_FIELDS]
+        if not group_by or unknown:
+            raise ValueError(f"group_by must name fields from {', '.join(KEY_FIELDS)}")
+        groups = ", ".join(group_by)
+        if self._summarisable(group_by, filters):
+            rows = self._query(f"{groups}, SUM(records), MIN(min_price), MAX(max_price), SUM(modal_sum) / "
+                               "SUM(modal_count), MIN(arrival_date), MAX(arrival_date)", filters, date_from, date_to,
+                               f" GROUP BY {groups} ORDER BY {groups}", table="daily_summary")
+        else:
+            rows = self._query(f"{groups}, COUNT(*), MIN(min_price), MAX(max_price), AVG(modal_price), "
+                               "MIN(arrival_date), MAX(arrival_date)", filters, date_from, date_to,
+                               f" GROUP BY {groups} ORDER BY {groups}")
+        n = len(group_by)
+        return [dict(zip(group_by, row[:n]), records=row[n], min_price=row[n + 1], max_price=row[n + 2],
+                     avg_modal_price=round(row[n + 3], 2) if row[n + 3] is not None else None,
+                     first_date=row[n + 4], last_date=row[n + 5])
+                for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query locally stored mandi prices.")
+    parser.add_argument("command", choices=["records", "distinct", "summary"])
+    parser.add_argument("field", nargs="?", help="field for distinct")
+    parser.add_argument("--db", help="database file (default: MANDI_DB_PATH or ./mandi_prices.db)")
+    for field in FILTER_FIELDS:
+        parser.add_argument(f"--{field}")
+    parser.add_argument("--from", dest="date_from", help="first arrival date (yyyy-mm-dd)")
+    parser.add_argument("--to", dest="date_to", help="last arrival date (yyyy-mm-dd)")
+    parser.add_argument("--group-by", nargs="+", default=["commodity"])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--offline", action="store_true", help="never call the API")
+    parser.add_argument("--explain", action="store_true", help="print what would be fetched and stop")
+    args = parser.parse_args(argv)
+
+    filters = {f: getattr(args, f) for f in FILTER_FIELDS if getattr(args, f)}
+    with MandiStore(args.db) as store:
+        api = None if args.offline else load_mandi_api().MandiPriceAPI(None)
+        query = MandiQuery(store, api)
+        if args.explain:
+            print(json.dumps(query.plan(filters, args.date_from, args.date_to), indent=2))
+            return 0
+        started = time.perf_counter()
+        if args.command == "records":
+            result = query.records(args.date_from, args.date_to, limit=args.limit, **filters)
+        elif args.command == "distinct":
+            if not args.field:
+                parser.error("distinct needs a field, e.g. commodity")
+            result = query.distinct(args.field, args.date_from, args.date_to, **filters)
+        else:
+            result = query.summary(args.group_by, args.date_from, args.date_to, **filters)
+        elapsed = (time.perf_counter() - started - query.last_plan["remote_seconds"]) * 1000.0
+        for row in result:
+            print(json.dumps(row, ensure_ascii=False))
+        print(f"{len(result)} rows, local {elapsed:.1f} ms, remote {query.last_plan['remote_records']} records "
+              f"in {query.last_plan['remote_seconds']}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+# mandi_store.py
+"""
+Local SQLite copy of the data.gov.in mandi price resource, kept current by incremental syncs.
+
+    python mandi_store.py sync                                       # every record
+    python mandi_store.py sync --filter state=Gujarat --filter commodity=Wheat
+    python mandi_store.py status
+
+Rows are keyed, and deduplicated, on (arrival_date, state, district, market, commodity,
+variety, grade). The table is WITHOUT ROWID with that key first, so rows are stored
+clustered by date and then state: one date, or one date and state, is a single contiguous
+range of pages, the way a date/state partitioned dataset would be laid out. Syncing a
+record again updates its prices in place instead of adding a copy, and records that later
+drop out of the API's rolling window stay in the store.
+
+Each filter set remembers how far it got: next offset, total, the key of the last record
+and the span of arrival dates it covers (mandi_query.py uses that span). The next sync first
+fetches the record just before that offset. If it is the same record, the source has only
+grown and only [offset, total) is fetched, so a repeat sync costs one request plus the new
+pages. If it differs (the source
+was rotated or reordered), that filter set is pulled again in full and the key absorbs
+the duplicates. Progress is saved after every committed batch, so an interrupted sync
+resumes where it stopped. Records whose arrival_date is neither dd/mm/yyyy nor yyyy-mm-dd
+are skipped (and counted in the sync result): every stored date is ISO, so queries can rely on it.
+
+daily_summary holds per (arrival_date, state, commodity) counts, price range and modal sums.
+write() marks the date/state partitions it touched and refresh_summary() rebuilds only
+those, so summaries over dates, states and commodities never scan the prices table.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from script_loader import load_script
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mandi_prices.db")
+KEY_FIELDS = ("arrival_date", "state", "district", "market", "commodity", "variety", "grade")
+PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+COLUMNS = KEY_FIELDS + PRICE_FIELDS + ("synced_at",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    arrival_date TEXT NOT NULL,     -- ISO yyyy-mm-dd (the API sends dd/mm/yyyy)
+    state TEXT NOT NULL,
+    district TEXT NOT NULL,
+    market TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    variety TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    modal_price REAL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (arrival_date, state, district, market, commodity, variety, grade)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_commodity ON prices (commodity COLLATE NOCASE, arrival_date);
+CREATE INDEX IF NOT EXISTS prices_state_commodity
+    ON prices (state COLLATE NOCASE, commodity COLLATE NOCASE, arrival_date);
+CREATE INDEX IF NOT EXISTS prices_market ON prices (market COLLATE NOCASE, arrival_date);
+CREATE TABLE IF NOT EXISTS daily_summary (  -- per date/state/commodity rollup of prices, for mandi_query.py
+    arrival_date TEXT NOT NULL,
+    state TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    modal_sum REAL,
+    modal_count INTEGER NOT NULL,
+    PRIMARY KEY (arrival_date, state, commodity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summary_dirty (  -- date/state partitions written since their rollup was built
+    arrival_date TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (arrival_date, state)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    filter_key TEXT PRIMARY KEY,    -- canonical JSON of the filters ("{}" = everything)
+    next_offset INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    anchor TEXT,                    -- key of the record at next_offset - 1
+    last_arrival_date TEXT,
+    synced_at REAL NOT NULL,
+    first_arrival_date TEXT
+);
+CREATE TABLE IF NOT EXISTS day_fetches (  -- single days pulled with an arrival_date filter (mandi_query.py)
+    filter_key TEXT NOT NULL,
+    arrival_date TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (filter_key, arrival_date)
+) WITHOUT ROWID;
+"""
+
+SQL_UPSERT = (
+    f"INSERT INTO prices ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    f"ON CONFLICT ({', '.join(KEY_FIELDS)}) DO UPDATE SET "
+    "min_price = excluded.min_price, max_price = excluded.max_price, modal_price = excluded.modal_price, "
+    "synced_at = excluded.synced_at "
+    "WHERE min_price IS NOT excluded.min_price OR max_price IS NOT excluded.max_price "
+    "OR modal_price IS NOT excluded.modal_price"
+)
+SQL_GET_STATE = ("SELECT next_offset, total, anchor, first_arrival_date, last_arrival_date, synced_at "
+                 "FROM sync_state WHERE filter_key = ?")
+SQL_PUT_STATE = ("INSERT OR REPLACE INTO sync_state "
+                 "(filter_key, next_offset, total, anchor, first_arrival_date, last_arrival_date, synced_at) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)")
+SQL_ALL_STATES = ("SELECT filter_key, next_offset, total, first_arrival_date, last_arrival_date, synced_at "
+                  "FROM sync_state ORDER BY filter_key")
+SQL_PUT_DAY = "INSERT OR REPLACE INTO day_fetches (filter_key, arrival_date, records, fetched_at) VALUES (?, ?, ?, ?)"
+SQL_GET_DAYS = "SELECT arrival_date, fetched_at FROM day_fetches WHERE filter_key = ?"
+SQL_MARK_DIRTY = "INSERT OR IGNORE INTO summary_dirty (arrival_date, state) VALUES (?, ?)"
+SQL_CLEAR_SUMMARY = "DELETE FROM daily_summary WHERE arrival_date = ? AND state = ?"
+SQL_BUILD_SUMMARY = ("INSERT INTO daily_summary SELECT arrival_date, state, commodity, COUNT(*), MIN(min_price), "
+                     "MAX(max_price), SUM(modal_price), COUNT(modal_price) FROM prices "
+                     "WHERE arrival_date = ? AND state = ? GROUP BY commodity")
+SQL_CLEAR_DIRTY = "DELETE FROM summary_dirty WHERE arrival_date = ? AND state = ?"
+SQL_DROP_BAD_DATES = "DELETE FROM {table} WHERE arrival_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+SQL_PARTITIONS = ("SELECT arrival_date, COUNT(DISTINCT state), COUNT(*) FROM prices "
+                  "GROUP BY arrival_date ORDER BY arrival_date DESC LIMIT ?")
+
+
+def iso_date(value):
+    # "17/10/2026" or "2026-10-17" -> "2026-10-17"; None for anything else
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def record_key(record):
+    # An unparseable date stays as sent here: the key still identifies the record as a sync anchor
+    date = record.get("arrival_date")
+    return [(iso_date(date) or str(date or "")) if f == "arrival_date" else str(record.get(f) or "")
+            for f in KEY_FIELDS]
+
+
+def filter_key(filters):
+    return json.dumps({k: str(v) for k, v in sorted((filters or {}).items())}, sort_keys=True)
+
+
+class MandiStore:
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): database file (default: MANDI_DB_PATH env var, else ./mandi_prices.db)
+        """
+        self.path = path or os.environ.get("MANDI_DB_PATH") or DEFAULT_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(sync_state)")}
+        if columns and "first_arrival_date" not in columns:  # stores created before date coverage was tracked
+            self.conn.execute("ALTER TABLE sync_state ADD COLUMN first_arrival_date TEXT")
+        self.conn.executescript(SCHEMA)
+        if (self.conn.execute("SELECT 1 FROM daily_summary LIMIT 1").fetchone() is None
+                and self.conn.execute("SELECT 1 FROM prices LIMIT 1").fetchone() is not None):
+            # store synced before the rollup existed: build it on the next refresh
+            self.conn.execute("INSERT OR IGNORE INTO summary_dirty SELECT DISTINCT arrival_date, state FROM prices")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # stores synced before dates were validated may hold rows with non-ISO dates: drop them once
+            for table in ("prices", "daily_summary", "summary_dirty"):
+                self.conn.execute(SQL_DROP_BAD_DATES.format(table=table))
+            self.conn.execute("PRAGMA user_version = 1")
+        self.skipped = 0  # records dropped by write() for an unrecognised arrival_date
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def state(self, filters=None):
+        row = self.conn.execute(SQL_GET_STATE, (filter_key(filters),)).fetchone()
+        if row is None:
+            return None
+        return {"next_offset": row[0], "total": row[1], "anchor": json.loads(row[2]) if row[2] else None,
+                "first_arrival_date": row[3], "last_arrival_date": row[4], "synced_at": row[5]}
+
+    def sync_states(self):
+        # Every synced filter set with the arrival dates it covers
+        return [{"filters": json.loads(k), "next_offset": o, "total": t, "first_arrival_date": f,
+                 "last_arrival_date": d, "synced_at": s}
+                for k, o, t, f, d, s in self.conn.execute(SQL_ALL_STATES)]
+
+    def write(self, records, now=None):
+        """
+        Upsert raw API records in one transaction; returns how many rows were added or changed.
+        Their date/state partitions are marked for refresh_summary() in the same transaction.
+        Records without a recognisable arrival_date are skipped and counted in self.skipped.
+        """
+        now = now or time.time()
+        rows = [record_key(r) + [price(r.get(f)) for f in PRICE_FIELDS] + [now] for r in records
+                if iso_date(r.get("arrival_date")) is not None]
+        self.skipped += len(records) - len(rows)
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(SQL_UPSERT, rows)
+            changed = self.conn.total_changes - before
+            self.conn.executemany(SQL_MARK_DIRTY, {(row[0], row[1]) for row in rows})
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return changed
+
+    def refresh_summary(self):
+        """
+        Rebuild daily_summary for the partitions written since the last refresh; returns how many.
+        Each partition is one contiguous key range of prices, so the cost follows what was written.
+        """
+        dirty = self.conn.execute("SELECT arrival_date, state FROM summary_dirty").fetchall()
+        if not dirty:
+            return 0
+        self.conn.execute("BEGIN")
+        try:
+            for statement in (SQL_CLEAR_SUMMARY, SQL_BUILD_SUMMARY, SQL_CLEAR_DIRTY):
+                self.conn.executemany(statement, dirty)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return len(dirty)
+
+    def sync(self, api, filters=None, page_size=1000, concurrency=8, batch_size=5000):
+        """
+        Pull what is new for one filter set (see the module docstring).
+
+        Args:
+            api (MandiPriceAPI): client to fetch with
+            filters (dict): API filters, e.g. {"state": "Gujarat"}; each distinct set is tracked separately
+            page_size (int): records per API request
+            concurrency (int): API requests in flight
+            batch_size (int): records per committed transaction (and progress checkpoint)
+
+        Returns:
+            dict: mode ("full", "incremental" or "up to date"), fetched, written, skipped, offset, total,
+            seconds
+        """
+        started = time.perf_counter()
+        skipped = self.skipped
+        key = filter_key(filters)
+        state = self.state(filters)
+        offset, mode, total = 0, "full", None
+        if state and state["next_offset"] > 0:
+            total, anchor = api.probe(state["next_offset"] - 1, filters)
+            if anchor is not None and record_key(anchor) == state["anchor"]:
+                offset, mode = state["next_offset"], "incremental"
+        dates = (state["first_arrival_date"], state["last_arrival_date"]) if mode == "incremental" else (None, None)
+
+        fetched = written = 0
+        anchor_key = state["anchor"] if mode == "incremental" else None
+        if mode == "incremental" and total <= offset:
+            mode = "up to date"
+        else:
+            batch = []
+            for record in api.iter_all_records(filters, page_size, concurrency, offset=offset):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    written += self.write(batch)
+                    fetched += len(batch)
+                    anchor_key, dates = self._checkpoint(key, offset + fetched, batch, dates)
+                    batch = []
+            if batch:
+                written += self.write(batch)
+                fetched += len(batch)
+                anchor_key, dates = self._checkpoint(key, offset + fetched, batch, dates)
+            total = offset + fetched
+            self.refresh_summary()
+            self.conn.execute("PRAGMA optimize")  # refresh planner statistics once the table has grown
+        self.conn.execute(SQL_PUT_STATE, (key, offset + fetched, total, json.dumps(anchor_key) if anchor_key else None,
+                                          dates[0], dates[1], time.time()))
+        return {"filters": json.loads(key), "mode": mode, "fetched": fetched, "written": written,
+                "skipped": self.skipped - skipped, "offset": offset, "total": total,
+                "first_arrival_date": dates[0], "last_arrival_date": dates[1],
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    def _checkpoint(self, key, next_offset, batch, dates):
+        anchor = record_key(batch[-1])
+        batch_dates = [d for d in (iso_date(r.get("arrival_date")) for r in batch) if d is not None]
+        if batch_dates:
+            dates = (min([dates[0]] + batch_dates if dates[0] else batch_dates),
+                     max([dates[1]] + batch_dates if dates[1] else batch_dates))
+        self.conn.execute(SQL_PUT_STATE, (key, next_offset, next_offset, json.dumps(anchor), dates[0], dates[1],
+                                          time.time()))
+        return anchor, dates
+
+    def fetch_day(self, api, filters, day, page_size=1000, concurrency=8):
+        """
+        Pull one arrival date (ISO yyyy-mm-dd) for a filter set with the API's arrival_date filter,
+        outside the offset-tracked sync, and remember that it was fetched. Returns the record count.
+        """
+        dated = dict(filters or {}, arrival_date=datetime.strptime(day, "%Y-%m-%d").strftime("%d/%m/%Y"))
+        records = list(api.iter_all_records(dated, page_size, concurrency))
+        if records:
+            self.write(records)
+            self.refresh_summary()
+        self.conn.execute(SQL_PUT_DAY, (filter_key(filters), day, len(records), time.time()))
+        return len(records)
+
+    def fetched_days(self, filters=None):
+        # {ISO date: fetched_at} pulled by fetch_day for exactly this filter set
+        return dict(self.conn.execute(SQL_GET_DAYS, (filter_key(filters),)).fetchall())
+
+    def status(self, days=10):
+        return {
+            "path": self.path,
+            "records": self.conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0],
+            "syncs": self.sync_states(),
+            "dates": [{"arrival_date": d, "states": n, "records": c}
+                      for d, n, c in self.conn.execute(SQL_PARTITIONS, (days,))],
+        }
+
+
+def load_mandi_api():
+    # "mandi api.py" is not an importable name, so load it by path
+    return load_script("mandi api.py", "mandi_api")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally sync mandi prices into a local SQLite store.")
+    parser.add_argument("command", choices=["sync", "status"])
+    parser.add_argument("--db", help="database file (default: MANDI_DB_PATH or ./mandi_prices.db)")
+    parser.add_argument("--filter", action="append", default=[], metavar="FIELD=VALUE",
+                        help="API filter, e.g. state=Gujarat (repeatable)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    with MandiStore(args.db) as store:
+        if args.command == "status":
+            print(json.dumps(store.status(), indent=2))
+            return 0
+        filters = dict(f.split("=", 1) for f in args.filter)
+        api = load_mandi_api().MandiPriceAPI(None)
+        result = store.sync(api, filters, page_size=args.page_size, concurrency=args.concurrency)
+        print(f"{result['mode']}: fetched {result['fetched']} records ({result['written']} new or changed) "
+              f"from offset {result['offset']} of {result['total']} in {result['seconds']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
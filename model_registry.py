@@ -0,0 +1,294 @@
+# model_registry.py
+"""
+Local model registry for air-gapped deployments.
+
+    python model_registry.py snapshot                                  # hub -> models/registry, pinned to the resolved commit
+    python model_registry.py snapshot --revision 3f2a1c9 --onnx       # pin a specific revision, pre-export ONNX too
+    python model_registry.py snapshot --source /mnt/usb/crop_vit      # import a copied checkpoint directory, no network
+    python model_registry.py list
+    python model_registry.py use <version>                            # switch CURRENT to another snapshot
+    python model_registry.py bench --runs 5                           # cold-start load time from the registry
+
+Layout (MODEL_REGISTRY_DIR, default ./models/registry):
+
+    <model id with / replaced by -->/
+        CURRENT                 name of the active version directory
+        <version>/              config.json, model.safetensors, preprocessor_config.json, manifest.json
+
+Once a snapshot exists, every entry point (Flask app, chatbot.py, image_detection_model.py)
+loads from it with local_files_only=True, so no hub request is ever made. Weights are stored
+as safetensors, which transformers memory-maps instead of unpickling. MODEL_DIR=<path>
+overrides the registry with an explicit directory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODEL_ID = "wambugu71/crop_leaf_diseases_vit"
+DEFAULT_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "registry")
+MANIFEST = "manifest.json"
+
+
+def registry_dir():
+    return os.environ.get("MODEL_REGISTRY_DIR") or DEFAULT_REGISTRY_DIR
+
+
+def model_dir(model_id):
+    return os.path.join(registry_dir(), model_id.replace("/", "--").replace("\\", "--").strip("-."))
+
+
+def current_snapshot(model_id):
+    # Path of the active snapshot for model_id, or None if the registry has none
+    base = model_dir(model_id)
+    try:
+        with open(os.path.join(base, "CURRENT"), encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(base, version)
+    return path if os.path.isfile(os.path.join(path, MANIFEST)) else None
+
+
+def resolve_model_source(model_id):
+    """
+    Where to load model_id from.
+
+    Returns (source, local): an existing directory is used as-is, MODEL_DIR wins for the
+    default model, then the registry's CURRENT snapshot, then the hub id itself.
+    """
+    if os.path.isdir(model_id):
+        return model_id, True
+    override = os.environ.get("MODEL_DIR")
+    if override and model_id == MODEL_ID:
+        return override, True
+    snapshot = current_snapshot(model_id)
+    if snapshot is not None:
+        return snapshot, True
+    return model_id, False
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def files_fingerprint(path):
+    # Short hash of every file's name, size and mtime under a checkpoint directory: changes when
+    # the weights are replaced in place, without reading hundreds of MB on every startup
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            h.update(f"{os.path.relpath(os.path.join(root, name), path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:12]
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_current(model_id, version):
+    base = model_dir(model_id)
+    tmp = os.path.join(base, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(base, "CURRENT"))
+
+
+# ---------------------------
+# Commands
+# ---------------------------
+def snapshot(model_id=MODEL_ID, revision=None, source=None, export_onnx=False, activate=True):
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+    load_from = source or model_id
+    kwargs = {"local_files_only": True} if source else {"revision": revision}
+    processor = AutoImageProcessor.from_pretrained(load_from, **kwargs)
+    model = AutoModelForImageClassification.from_pretrained(load_from, **kwargs)
+
+    source_manifest = read_manifest(source) if source else None
+    commit = getattr(model.config, "_commit_hash", None) or (source_manifest or {}).get("commit")
+    version = (commit or revision or "local")[:12] + time.strftime("-%Y%m%d%H%M%S")
+
+    base = model_dir(model_id)
+    os.makedirs(base, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".snapshot-", dir=base)
+    try:
+        model.save_pretrained(tmp, safe_serialization=True)
+        processor.save_pretrained(tmp)
+        if export_onnx:
+            from inference_backends import export_onnx as _export
+            _export(tmp, os.path.join(tmp, "model.onnx"), processor)
+        manifest = {
+            "model_id": model_id,
+            "revision": revision,
+            "commit": commit,
+            "version": version,
+            "source": source or "hub",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "id2label": {str(k): v for k, v in model.config.id2label.items()},
+            "files": {
+                name: {"bytes": os.path.getsize(os.path.join(tmp, name)), "sha256": _sha256(os.path.join(tmp, name))}
+                for name in sorted(os.listdir(tmp))
+            },
+        }
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        dest = os.path.join(base, version)
+        os.replace(tmp, dest)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if activate:
+        _write_current(model_id, version)
+    return dest
+
+
+def list_snapshots(model_id=MODEL_ID):
+    base = model_dir(model_id)
+    if not os.path.isdir(base):
+        return []
+    active = current_snapshot(model_id)
+    out = []
+    for name in sorted(os.listdir(base)):
+        path = os.path.join(base, name)
+        manifest = read_manifest(path)
+        if manifest is not None:
+            out.append(dict(manifest, path=path, active=(path == active)))
+    return out
+
+
+def verify(path):
+    # Returns a list of problems (empty = snapshot matches its manifest)
+    manifest = read_manifest(path)
+    if manifest is None:
+        return [f"{path}: no readable {MANIFEST}"]
+    problems = []
+    for name, info in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.isfile(file_path):
+            problems.append(f"{name}: missing")
+        elif os.path.getsize(file_path) != info["bytes"] or _sha256(file_path) != info["sha256"]:
+            problems.append(f"{name}: checksum mismatch")
+    return problems
+
+
+BENCH_SNIPPET = """
+import os, sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, {here!r})
+from inference_backends import load_backend
+backend = load_backend({backend!r}, {model!r})
+t1 = time.perf_counter()
+print(json.dumps({{"import_and_load": t1 - t0, "load": backend.load_seconds}}))
+"""
+
+
+def bench(model_id=MODEL_ID, runs=3, backend="torch", offline=True):
+    # Each run is a fresh interpreter, so the numbers include imports and page-cache-warm file loads
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    if offline:
+        env["HF_HUB_OFFLINE"] = "1"
+    results = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", BENCH_SNIPPET.format(here=here, backend=backend, model=model_id)],
+            env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "bench run failed")
+        timing = json.loads(proc.stdout.strip().splitlines()[-1])
+        timing["process_wall"] = wall
+        results.append(timing)
+    return results
+
+
+def cmd_snapshot(args):
+    dest = snapshot(args.model, args.revision, args.source, args.onnx, activate=not args.no_activate)
+    print(f"Saved {args.model} to {dest}")
+    return 0
+
+
+def cmd_list(args):
+    for snap in list_snapshots(args.model):
+        size = sum(f["bytes"] for f in snap["files"].values()) / 1e6
+        print(f"{'*' if snap['active'] else ' '} {snap['version']}  commit={snap['commit']}  "
+              f"{size:.1f} MB  created {snap['created_at']}")
+    return 0
+
+
+def cmd_use(args):
+    if read_manifest(os.path.join(model_dir(args.model), args.version)) is None:
+        print(f"No snapshot {args.version} for {args.model}", file=sys.stderr)
+        return 1
+    _write_current(args.model, args.version)
+    print(f"{args.model} now loads {args.version}")
+    return 0
+
+
+def cmd_verify(args):
+    path = os.path.join(model_dir(args.model), args.version) if args.version else current_snapshot(args.model)
+    if path is None:
+        print(f"No active snapshot for {args.model}", file=sys.stderr)
+        return 1
+    problems = verify(path)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f"{path}: {'OK' if not problems else 'FAILED'}")
+    return 1 if problems else 0
+
+
+def cmd_bench(args):
+    source, local = resolve_model_source(args.model)
+    print(f"Loading {args.model} from {source} ({'local' if local else 'hub'}), backend {args.backend}")
+    for i, r in enumerate(bench(args.model, args.runs, args.backend, offline=not args.online), 1):
+        print(f"run {i}: process {r['process_wall']:.2f}s, imports+load {r['import_and_load']:.2f}s, "
+              f"load_backend {r['load']:.2f}s")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot and manage local model artifacts.")
+    parser.add_argument("--model", default=MODEL_ID, help="model id the snapshot is registered under")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("snapshot", help="save model + processor into a new versioned directory")
+    p.add_argument("--revision", help="hub branch, tag or commit to pin (default: main)")
+    p.add_argument("--source", help="import from a local checkpoint directory instead of the hub")
+    p.add_argument("--onnx", action="store_true", help="also export model.onnx into the snapshot")
+    p.add_argument("--no-activate", action="store_true", help="do not point CURRENT at the new snapshot")
+
+    sub.add_parser("list", help="list snapshots")
+    p = sub.add_parser("use", help="make an existing snapshot the active one")
+    p.add_argument("version")
+    p = sub.add_parser("verify", help="check snapshot files against their manifest checksums")
+    p.add_argument("version", nargs="?", help="default: the active snapshot")
+    p = sub.add_parser("bench", help="measure cold-start load time in fresh processes")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--backend", default="torch")
+    p.add_argument("--online", action="store_true", help="do not force HF_HUB_OFFLINE=1")
+    args = parser.parse_args(argv)
+
+    handlers = {"snapshot": cmd_snapshot, "list": cmd_list, "use": cmd_use, "verify": cmd_verify, "bench": cmd_bench}
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
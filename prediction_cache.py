@@ -0,0 +1,202 @@
+# prediction_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------------
+# Content-addressed prediction cache
+# - Key = sha256(uploaded image bytes) + model revision, so a re-uploaded photo
+#   is recognised before any decoding happens and a model change never serves stale labels
+# - In-memory LRU with TTL, bounded by entry count and by total bytes
+# - Optional SQLite file underneath so entries survive restarts; every PURGE_EVERY writes it drops
+#   expired rows and then the oldest ones past max_disk_entries
+# ---------------------------
+
+PURGE_EVERY = 256
+
+
+class PredictionCache:
+    def __init__(self, revision, max_entries=1024, max_bytes=8 * 1024 * 1024, ttl_seconds=24 * 3600,
+                 disk_path=None, max_disk_entries=100000):
+        """
+        Args:
+            revision (str): model identifier/revision mixed into every key
+            max_entries (int): in-memory entry cap (0 disables the cache)
+            max_bytes (int): in-memory size cap, counted on the JSON-encoded values
+            ttl_seconds (float): entries older than this are treated as misses (0 = never expire)
+            disk_path (str): optional SQLite file for a persistent second level
+            max_disk_entries (int): row cap for the SQLite file (0 = no cap)
+        """
+        self.revision = str(revision)
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = max(0.0, float(ttl_seconds))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (created_at, encoded_value)
+        self._bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_purged = 0
+        self._writes_since_purge = 0
+
+        self._db = None
+        if disk_path and self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, created_at REAL, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created_at)")
+            self._db.commit()
+            with self._lock:
+                self._purge(time.time())  # rows left behind by earlier runs (and other model revisions)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def key_for(self, data):
+        h = hashlib.sha256()
+        h.update(self.revision.encode())
+        h.update(b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    def _expired(self, created_at, now):
+        return self.ttl > 0 and now - created_at > self.ttl
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def get(self, key):
+        # Returns the cached value or None
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, encoded = entry
+                if not self._expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(encoded)
+                self._drop(key)
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created_at, value FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    created_at, encoded = row
+                    if not self._expired(created_at, now):
+                        self._store(key, created_at, encoded)
+                        self.disk_hits += 1
+                        return json.loads(encoded)
+                    self._db.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.expirations += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        encoded = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._store(key, now, encoded)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, created_at, value) VALUES (?, ?, ?)",
+                    (key, now, encoded),
+                )
+                self._db.commit()
+                self._writes_since_purge += 1
+                if self._writes_since_purge >= PURGE_EVERY:
+                    self._purge(now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    # ---------------------------
+    # Internal (caller holds the lock)
+    # ---------------------------
+    @staticmethod
+    def _size(key, encoded):
+        return len(key) + len(encoded)
+
+    def _drop(self, key):
+        created_at, encoded = self._entries.pop(key)
+        self._bytes -= self._size(key, encoded)
+
+    def _purge(self, now):
+        # Expired rows first, then the oldest past the cap; amortised over PURGE_EVERY writes
+        self._writes_since_purge = 0
+        purged = 0
+        if self.ttl > 0:
+            purged += self._db.execute("DELETE FROM predictions WHERE created_at < ?", (now - self.ttl,)).rowcount
+        if self.max_disk_entries:
+            extra = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_disk_entries
+            if extra > 0:
+                purged += self._db.execute(
+                    "DELETE FROM predictions WHERE key IN "
+                    "(SELECT key FROM predictions ORDER BY created_at LIMIT ?)", (extra,)
+                ).rowcount
+        self._db.commit()
+        self.disk_purged += purged
+
+    def _store(self, key, created_at, encoded):
+        if key in self._entries:
+            self._drop(key)
+        size = self._size(key, encoded)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (created_at, encoded)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    # ---------------------------
+    # Reporting
+    # ---------------------------
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "revision": self.revision,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "disk": self._db is not None,
+                "max_disk_entries": self.max_disk_entries,
+                "disk_purged": self.disk_purged,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,172 @@
+# preprocessing.py
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from PIL import Image
+
+from batching import percentiles_ms
+
+# ---------------------------
+# Parallel decode + preprocessing stage
+# - Decoding, RGB conversion and AutoImageProcessor normalisation run in a
+#   thread or process pool, so the model thread only stacks ready tensors
+# - JPEGs are decoded with Image.draft() at the smallest DCT scale that is
+#   still >= the model input size (a 4000x3000 phone photo decodes at 1/8)
+# - Every stage is timed; StageTimings keeps rolling percentiles per stage
+# ---------------------------
+
+
+def target_size(processor):
+    # (width, height) the processor resizes to, or None if it cannot be read
+    size = getattr(processor, "size", None) or {}
+    if "height" in size and "width" in size:
+        return size["width"], size["height"]
+    if "shortest_edge" in size:
+        return size["shortest_edge"], size["shortest_edge"]
+    return None
+
+
+def decode_image(source, draft_size=None):
+    """
+    Decode an image to RGB.
+
+    Args:
+        source: raw bytes, a path, or a binary file object
+        draft_size (tuple): (width, height) lower bound for reduced-size JPEG decoding
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as im:
+        if draft_size is not None and im.format == "JPEG":
+            im.draft("RGB", draft_size)
+        return im.convert("RGB")
+
+
+class StageTimings:
+    # Rolling per-stage duration samples (seconds in, milliseconds out)
+    def __init__(self, window=2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = 0
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+
+    def record_all(self, timings):
+        for stage, seconds in timings.items():
+            self.record(stage, seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                stage: dict(percentiles_ms(samples), count=self._counts[stage])
+                for stage, samples in self._samples.items()
+            }
+
+
+# Per-process state for the process pool (set by the pool initializer)
+_worker_processor = None
+_worker_draft_size = None
+
+
+def _init_worker(processor, draft_size):
+    global _worker_processor, _worker_draft_size
+    _worker_processor = processor
+    _worker_draft_size = draft_size
+
+
+def preprocess(processor, source, draft_size=None):
+    # Returns (pixel_values ndarray [C, H, W], {"decode": s, "preprocess": s})
+    t0 = time.perf_counter()
+    image = decode_image(source, draft_size)
+    t1 = time.perf_counter()
+    pixel_values = processor(images=image, return_tensors="np")["pixel_values"][0]
+    t2 = time.perf_counter()
+    return pixel_values, {"decode": t1 - t0, "preprocess": t2 - t1}
+
+
+def _preprocess_in_worker(source):
+    return preprocess(_worker_processor, source, _worker_draft_size)
+
+
+class PreprocessPool:
+    def __init__(self, processor, workers=None, kind="thread", use_draft=True, timings=None):
+        """
+        Args:
+            processor: a loaded AutoImageProcessor
+            workers (int): pool size (default: cpu count - 1, at least 1)
+            kind (str): "thread" (PIL releases the GIL while decoding/resizing) or "process"
+            use_draft (bool): reduced-size JPEG decode via Image.draft
+            timings (StageTimings): where decode/preprocess durations are recorded
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown pool kind: {kind}")
+        self.processor = processor
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.kind = kind
+        self.draft_size = target_size(processor) if use_draft else None
+        self.timings = timings if timings is not None else StageTimings()
+        if kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(processor, self.draft_size)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preprocess")
+
+    def _submit(self, source):
+        if self.kind == "process":
+            fut = self._pool.submit(_preprocess_in_worker, source)
+        else:
+            fut = self._pool.submit(preprocess, self.processor, source, self.draft_size)
+        fut.add_done_callback(self._record)
+        return fut
+
+    def _record(self, fut):
+        if fut.exception() is None:
+            self.timings.record_all(fut.result()[1])
+
+    def submit(self, source):
+        # Future resolving to (pixel_values, stage_timings)
+        return self._submit(source)
+
+    def map_ordered(self, sources, prefetch=64):
+        """
+        Preprocess an iterable lazily, keeping at most `prefetch` items in flight.
+
+        Yields (source, pixel_values or None, stage_timings or None, error or None) in input order.
+        """
+        pending = deque()
+
+        def ready():
+            source, fut = pending.popleft()
+            try:
+                pixel_values, stage = fut.result()
+                return source, pixel_values, stage, None
+            except Exception as e:
+                return source, None, None, e
+
+        for source in sources:
+            pending.append((source, self._submit(source)))
+            if len(pending) >= prefetch:
+                yield ready()
+        while pending:
+            yield ready()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,31 @@
+# script_loader.py
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename, module_name):
+    """
+    Import a repo-root script whose file name is not a valid module name ("mandi api.py",
+    "chatbot+imagedetection_ui.py"), once per process: later calls return the same module.
+
+    Args:
+        filename (str): file name relative to the repo root (or an absolute path)
+        module_name (str): name it is registered under in sys.modules
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)  # so the script's own imports of sibling modules resolve
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
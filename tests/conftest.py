@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+
+# The modules under test live as flat scripts in the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,58 @@
+# tests/test_batching.py
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher, QueueFullError
+
+
+def wait_until_taken(batcher):
+    # The worker has pulled everything queued so far (and is now blocked in run_batch)
+    while batcher.stats()["queue_depth"]:
+        time.sleep(0.001)
+
+
+def doubler(gate=None):
+    def run_batch(items):
+        if gate is not None:
+            gate.wait(5)
+        return [item * 2 for item in items]
+    return run_batch
+
+
+def test_full_batch_admitted_while_another_request_is_queued():
+    gate = threading.Event()
+    batcher = MicroBatcher(doubler(gate), max_batch_size=1, max_wait_ms=0, max_queue=8)
+    try:
+        first = batcher.submit_async(1)
+        wait_until_taken(batcher)            # the worker holds item 1 and blocks on the gate
+        queued = batcher.submit_async(2)     # stays in the queue: only 7 free slots for the batch
+        threading.Timer(0.1, gate.set).start()
+        futures = batcher.submit_many(range(8), timeout=5)   # a full max_queue-sized batch
+        assert [f.result(timeout=5) for f in futures] == [i * 2 for i in range(8)]
+        assert first.result(timeout=5) == 2 and queued.result(timeout=5) == 4
+        assert batcher.stats()["rejected"] == 0
+    finally:
+        gate.set()
+        batcher.stop()
+
+
+def test_items_not_admitted_before_timeout_fail_individually():
+    gate = threading.Event()
+    batcher = MicroBatcher(doubler(gate), max_batch_size=1, max_wait_ms=0, max_queue=2)
+    try:
+        running = batcher.submit_async(1)
+        wait_until_taken(batcher)
+        queued = [batcher.submit_async(2), batcher.submit_async(3)]
+        futures = batcher.submit_many([4, 5], timeout=0.05)
+        for fut in futures:
+            with pytest.raises(QueueFullError):
+                fut.result(timeout=1)
+        gate.set()
+        assert running.result(timeout=5) == 2
+        assert [f.result(timeout=5) for f in queued] == [4, 6]
+        assert batcher.stats()["rejected"] == 2
+    finally:
+        gate.set()
+        batcher.stop()
@@ -0,0 +1,59 @@
+# tests/test_conversation_routes.py
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+
+from script_loader import load_script  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app_module():
+    # The model is never needed here, so it is not loaded (MODEL_LOAD=lazy)
+    saved = {name: os.environ.get(name) for name in ("MODEL_LOAD", "CONVERSATION_BACKEND")}
+    os.environ.update(MODEL_LOAD="lazy", CONVERSATION_BACKEND="memory")
+    try:
+        module = load_script("chatbot+imagedetection_ui.py", "krishisevak_test_app")
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    c = app_module.app.test_client()
+    c.post("/login", data={"username": "farmer", "password": "password123"})
+    return c
+
+
+def test_conversation_reads_answer_304_until_changed(client):
+    cid = client.post("/conversations").get_json()["id"]
+    client.post(f"/conversations/{cid}/message", json={"query": "hello"})
+    for url in ("/conversations", f"/conversations/{cid}", f"/conversations/{cid}?limit=1", "/history"):
+        first = client.get(url)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+        again = client.get(url, headers={"If-None-Match": etag})
+        assert again.status_code == 304 and again.data == b""
+        assert again.headers["ETag"] == etag
+
+    etag = client.get(f"/conversations/{cid}").headers["ETag"]
+    client.post(f"/conversations/{cid}/message", json={"query": "tomato leaf curl"})
+    changed = client.get(f"/conversations/{cid}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert len(changed.get_json()["messages"]) == 4
+
+
+def test_history_reports_has_more_in_a_header(client):
+    cid = client.post("/conversations").get_json()["id"]
+    for query in ("one", "two"):
+        client.post(f"/conversations/{cid}/message", json={"query": query})
+    page = client.get("/history?limit=2")
+    assert page.headers["X-Has-More"] == "true" and len(page.get_json()) == 2
+    assert client.get("/history?limit=4").headers["X-Has-More"] == "false"
+    assert client.get("/history?limit=x").status_code == 400
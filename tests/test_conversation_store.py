@@ -0,0 +1,174 @@
+# tests/test_conversation_store.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from conversation_store import (SQL_MESSAGES_BACKWARD, SQL_MESSAGES_FORWARD, InMemoryConversationStore,
+                                RetentionPolicy, SQLiteConversationStore)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(retention=None):
+        retention = retention or RetentionPolicy()
+        if request.param == "memory":
+            return InMemoryConversationStore(retention)
+        return SQLiteConversationStore(str(tmp_path / "conversations.db"), retention=retention)
+    return make
+
+
+def test_retention_defaults(monkeypatch):
+    for name in ("CONVERSATION_MAX_MESSAGES", "CONVERSATION_MAX_CONVERSATIONS", "CONVERSATION_IDLE_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+    sqlite = RetentionPolicy.from_env("sqlite")
+    memory = RetentionPolicy.from_env("memory")
+    assert (sqlite.max_messages, sqlite.max_conversations, sqlite.idle_seconds) == (0, 0, 0)
+    assert (memory.max_messages, memory.max_conversations, memory.idle_seconds) == (500, 0, 0)
+    monkeypatch.setenv("CONVERSATION_MAX_MESSAGES", "20")
+    assert RetentionPolicy.from_env("sqlite").max_messages == 20
+
+
+def test_trim_moves_preview_and_keeps_title(make_store):
+    store = make_store(RetentionPolicy(max_messages=2))
+    cid = store.create_conversation("u")["id"]
+    for i in range(4):
+        store.append_message("u", cid, "user", f"m{i}")
+    assert store.list_conversations("u") == [{"id": cid, "title": "m0", "preview": "m2"}]
+    assert [m["message"] for m in store.get_conversation("u", cid)["messages"]] == ["m2", "m3"]
+
+
+def test_spill_dir_created_on_first_spill(tmp_path):
+    spill_dir = tmp_path / "spill"
+    store = InMemoryConversationStore(RetentionPolicy(idle_seconds=3600, spill_dir=str(spill_dir)))
+    assert not spill_dir.exists() and store.memory_report()["users_spilled"] == 0
+    cid = store.create_conversation("u")["id"]
+    store.append_message("u", cid, "user", "hello")
+    assert store.evict_idle(now=time.monotonic() + 7200) == 1
+    assert store.memory_report()["users_spilled"] == 1
+    assert store.get_conversation("u", cid)["messages"][0]["message"] == "hello"
+
+
+def fill(store, user, count, start_ts=1000.0):
+    cid = store.create_conversation(user)["id"]
+    for i in range(count):
+        store.append_message(user, cid, "user" if i % 2 == 0 else "bot", f"m{i}", ts=start_ts + i)
+    return cid
+
+
+@pytest.mark.parametrize("paging", [
+    {},
+    {"limit": 3},
+    {"limit": 10},
+    {"limit": 3, "before": 6},
+    {"before": 1},
+    {"limit": 3, "after": 4},
+    {"after": 10},
+    {"limit": 2, "since": 1004.0},
+    {"since": 1003.5},
+    {"limit": 2, "after": 2, "since": 1004.0},
+    {"limit": 2, "after": 2, "before": 8},
+])
+def test_paging_matches_between_backends(tmp_path, paging):
+    memory = InMemoryConversationStore()
+    sqlite = SQLiteConversationStore(str(tmp_path / "conversations.db"))
+    # One conversation per fresh store, so the memory ids and SQLite's global seq agree
+    pages = [store.get_conversation("u", fill(store, "u", 10), **paging) for store in (memory, sqlite)]
+    assert pages[0] == pages[1]
+    assert sqlite.last_conversation("u", **paging) == pages[1]
+
+
+def test_paging_walks_the_whole_conversation(make_store):
+    store = make_store()
+    cid = fill(store, "u", 7)
+    seen, before = [], None
+    while True:
+        page = store.get_conversation("u", cid, limit=3, before=before)
+        seen = [m["message"] for m in page["messages"]] + seen
+        if not page["has_more"]:
+            break
+        before = page["messages"][0]["id"]
+    assert seen == [f"m{i}" for i in range(7)]
+    newer = store.get_conversation("u", cid, limit=3, after=page["messages"][-1]["id"])
+    assert [m["message"] for m in newer["messages"]] == ["m1", "m2", "m3"] and newer["has_more"]
+
+
+def test_message_pages_are_read_in_seq_order_from_the_index(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with sqlite3.connect(path) as conn:
+        # A database from before the seq index
+        conn.execute("CREATE TABLE messages (seq INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, "
+                     "conversation_id INTEGER NOT NULL, role TEXT NOT NULL, message TEXT NOT NULL, ts REAL NOT NULL)")
+        conn.execute("CREATE INDEX messages_by_conversation ON messages (user, conversation_id, ts)")
+    SQLiteConversationStore(path)
+    with sqlite3.connect(path) as conn:
+        for sql in (SQL_MESSAGES_FORWARD, SQL_MESSAGES_BACKWARD):
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, ("u", 1, 0, 9, 0, 3)))
+            assert "messages_by_conversation_seq" in plan and "TEMP B-TREE" not in plan
+
+
+def test_concurrent_appends_all_commit_in_groups(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    store = SQLiteConversationStore(path, commit_interval_ms=20)
+    cids = {user: store.create_conversation(user)["id"] for user in ("a", "b")}
+    barrier = threading.Barrier(16)
+    ids, errors = [], []
+
+    def writer(n):
+        user = "a" if n % 2 else "b"
+        barrier.wait()
+        try:
+            for i in range(10):
+                ids.append(store.append_message(user, cids[user], "user", f"{n}-{i}")["id"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(set(ids)) == 160
+    assert store.writes == 162 and store.commits < store.writes  # writes shared transactions
+
+    # Everything acknowledged is on disk, per writer in the order it was sent
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT message FROM messages ORDER BY seq").fetchall()
+    assert len(rows) == 160
+    for n in range(16):
+        assert [m for (m,) in rows if m.startswith(f"{n}-")] == [f"{n}-{i}" for i in range(10)]
+    for user in ("a", "b"):
+        messages = store.get_conversation(user, cids[user])["messages"]
+        assert len(messages) == 80 and [m["id"] for m in messages] == sorted(m["id"] for m in messages)
+
+
+def test_failing_write_does_not_sink_its_batch(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "conversations.db"), commit_interval_ms=200)
+    cid = store.create_conversation("u")["id"]
+    results = {}
+
+    def send(name, op):
+        try:
+            results[name] = store._write(op)
+        except Exception as e:
+            results[name] = e
+
+    def boom(conn):
+        conn.execute("INSERT INTO messages (user, conversation_id, role, message, ts) VALUES ('u', ?, 'user', 'x', 0)",
+                     (cid,))
+        raise RuntimeError("boom")
+
+    def rename(conn):
+        return conn.execute("UPDATE conversations SET title = 'kept' WHERE user = 'u' AND id = ?", (cid,)).rowcount
+
+    threads = [threading.Thread(target=send, args=("bad", boom)), threading.Thread(target=send, args=("good", rename))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert isinstance(results["bad"], RuntimeError) and results["good"] == 1
+    assert store.commits == 2  # create, then both ops in one transaction
+    conv = store.get_conversation("u", cid)
+    assert conv["title"] == "kept" and conv["messages"] == []  # the failed op's insert was rolled back
@@ -0,0 +1,82 @@
+# tests/test_http_cache.py
+import sqlite3
+import threading
+import time
+
+import http_cache
+from http_cache import HTTPCache, cache_key
+from mandi_stub import StubMandiServer, synthetic_records
+
+RECORDS = synthetic_records(200)
+
+
+def test_key_ignores_credentials_parameter_order_and_default_port():
+    a = cache_key("HTTPS://Example.org:443/r?b=2", {"a": 1, "api-key": "secret"})
+    b = cache_key("https://example.org/r", {"api-key": "other", "b": "2", "a": "1", "skip": None})
+    assert a == b == "https://example.org/r?a=1&b=2"
+
+
+def test_concurrent_identical_requests_make_one_upstream_call():
+    callers = 16
+    with StubMandiServer(RECORDS, latency_ms=200) as server:
+        cache = HTTPCache()
+        barrier = threading.Barrier(callers)
+        bodies = []
+
+        def call():
+            barrier.wait()
+            bodies.append(cache.get(server.url, params={"limit": 50, "api-key": "k"}).json())
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert server.requests == 1
+        assert len(bodies) == callers and all(body == bodies[0] for body in bodies)
+        stats = cache.stats()
+        assert (stats["upstream_calls"], stats["misses"], stats["coalesced"]) == (1, 1, callers - 1)
+
+
+def test_expired_entry_is_revalidated_with_a_conditional_get():
+    with StubMandiServer(RECORDS) as server:
+        cache = HTTPCache()
+        first = cache.get(server.url, params={"limit": 10}, ttl=0.05)
+        assert first.from_cache is False and first.headers["ETag"]
+        time.sleep(0.1)
+        again = cache.get(server.url, params={"limit": 10}, ttl=0.05)
+        assert server.requests == 2 and server.not_modified == 1
+        assert again.from_cache is True and again.status_code == 200 and again.content == first.content
+        assert cache.stats()["revalidated"] == 1
+
+        server.records = RECORDS[1:]  # changed upstream: the 304 no longer applies
+        time.sleep(0.1)
+        changed = cache.get(server.url, params={"limit": 10}, ttl=0.05)
+        assert changed.from_cache is False and changed.json()["records"] == RECORDS[1:11]
+        assert server.not_modified == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "http_cache.db")
+    with StubMandiServer(RECORDS) as server:
+        HTTPCache(disk_path=path).get(server.url, params={"limit": 10}, ttl=60)
+        cache = HTTPCache(disk_path=path)
+        assert cache.get(server.url, params={"limit": 10}, ttl=60).from_cache is True
+        assert server.requests == 1 and cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_drops_long_expired_rows_and_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "PURGE_EVERY", 5)
+    path = str(tmp_path / "http_cache.db")
+    with StubMandiServer(RECORDS) as server:
+        cache = HTTPCache(disk_path=path, max_disk_entries=8)
+        for i in range(20):
+            cache.get(server.url, params={"limit": 1, "offset": i}, ttl=60)
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] <= 8 + 5
+            conn.execute("UPDATE responses SET expires_at = expires_at - 3600 WHERE key LIKE '%offset=19%'")
+        HTTPCache(disk_path=path, max_disk_entries=8, disk_grace=0)
+        with sqlite3.connect(path) as conn:
+            keys = [k for (k,) in conn.execute("SELECT key FROM responses")]
+        assert len(keys) == 7 and not any("offset=19" in k for k in keys)
+        assert any("offset=18" in k for k in keys) and not any(k.endswith("offset=0") for k in keys)
@@ -0,0 +1,38 @@
+# tests/test_image_detection_model.py
+import json
+
+import numpy as np
+
+from image_detection_model import classify_batch, load_done_jsonl
+from preprocessing import StageTimings
+
+
+class Backend:
+    id2label = {0: "corn healthy", 1: "corn common rust"}
+
+    def logits(self, pixel_values):
+        # Class 1 for images whose first pixel is positive
+        return np.array([[0.0, 4.0] if p[0, 0, 0] > 0 else [4.0, 0.0] for p in pixel_values])
+
+
+def test_classify_batch_keeps_input_order_with_errors():
+    stage = {"decode": 0.001, "preprocess": 0.002}
+    image = np.ones((3, 2, 2), dtype=np.float32)
+    decoded = [
+        ("a.jpg", -image, stage, None),
+        ("b.jpg", None, None, OSError("truncated")),
+        ("c.jpg", image, stage, None),
+        ("d.jpg", None, None, ValueError("empty")),
+    ]
+    rows = classify_batch(Backend(), decoded, 2, 0.0, StageTimings())
+    assert [row["path"] for row in rows] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert rows[0]["prediction"] == "corn healthy" and rows[2]["prediction"] == "corn common rust"
+    assert rows[1]["error"] == "OSError: truncated" and rows[3]["error"] == "ValueError: empty"
+
+
+def test_load_done_jsonl_skips_lines_without_a_path(tmp_path):
+    output = tmp_path / "results.jsonl"
+    lines = [json.dumps({"path": "a.jpg"}), json.dumps({"note": "no path"}), json.dumps({"path": "b.jpg"})]
+    output.write_text("\n".join(lines) + "\n" + '{"path": "c.j')
+    assert load_done_jsonl(str(output)) == {"a.jpg", "b.jpg"}
+    assert output.read_text() == "\n".join(lines) + "\n"
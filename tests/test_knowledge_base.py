@@ -0,0 +1,32 @@
+# tests/test_knowledge_base.py
+from knowledge_base import KnowledgeBase, dataset_labels, main
+
+
+def test_every_trained_class_has_an_entry_and_no_entry_is_extra():
+    kb = KnowledgeBase.load()
+    labels = dataset_labels()
+    entries = [kb.label_entry(label) for label in labels]
+    assert None not in entries
+    assert {(e["crop"], e["disease"]) for e in entries} == {
+        (crop, disease) for crop, diseases in kb.diseases.items() for disease in diseases
+    }
+
+
+def test_cli_reports_classes_missing_from_the_file(tmp_path, capsys):
+    dataset = tmp_path / "classes"
+    dataset.write_text("Corn: Common Rust, Northern Blight\nTomato: Healthy\n")
+    assert main(["--dataset", str(dataset)]) == 1
+    err = capsys.readouterr().err
+    assert "'Corn Northern Blight'" in err and "'Tomato Healthy'" in err and "Common Rust" not in err
+    assert main([]) == 0
+
+
+def test_matcher_catches_a_doubled_letter():
+    hits = KnowledgeBase.load().matcher.lookup("my wheat has yellow russt on the leaves")
+    assert [(h["crop"], h["disease"]) for h in hits] == [("wheat", "yellow rust")]
+
+
+def test_matcher_ignores_real_words_near_a_disease_name():
+    matcher = KnowledgeBase.load().matcher
+    assert matcher.lookup("How do I improve soil health?") == []
+    assert matcher.find("the early light on my leaf last week") == []
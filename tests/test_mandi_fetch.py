@@ -0,0 +1,39 @@
+# tests/test_mandi_fetch.py
+import pytest
+
+pytest.importorskip("pandas")
+
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+mandi = load_mandi_module()
+RECORDS = synthetic_records(2500)
+
+
+def fetch(server, **kwargs):
+    api = mandi.MandiPriceAPI(None, api_url=server.url, backoff=0)
+    return api.fetch_all_records(**{"page_size": 500, "concurrency": 4, **kwargs})
+
+
+def test_server_capped_page_size_still_returns_everything():
+    with StubMandiServer(RECORDS, max_limit=300) as server:
+        assert fetch(server) == RECORDS
+
+
+def test_short_page_is_refetched():
+    with StubMandiServer(RECORDS, short_pages={1000: 1}) as server:
+        assert fetch(server) == RECORDS
+        assert server.requests == 6  # 5 pages + one refetch
+
+
+def test_page_that_stays_short_raises():
+    with StubMandiServer(RECORDS, short_pages={1000: 10}) as server:
+        with pytest.raises(mandi.IncompletePageError):
+            fetch(server)
+
+
+def test_empty_first_page_is_refetched_not_taken_as_the_page_cap():
+    with StubMandiServer(RECORDS, short_pages={0: 1}, max_limit=1) as server:
+        assert fetch(server, page_size=1, max_records=3) == RECORDS[:3]
+    with StubMandiServer(RECORDS, short_pages={0: 10}, max_limit=1) as server:
+        with pytest.raises(mandi.IncompletePageError):
+            fetch(server, page_size=1)
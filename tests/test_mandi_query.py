@@ -0,0 +1,82 @@
+# tests/test_mandi_query.py
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from http_cache import HTTPCache  # noqa: E402
+from mandi_query import MandiQuery, to_api_record  # noqa: E402
+from mandi_store import MandiStore  # noqa: E402
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+mandi = load_mandi_module()
+RECORDS = synthetic_records(3000)
+
+
+def sorted_items(record):
+    return sorted(record.items())
+
+
+def client(server):
+    return mandi.MandiPriceAPI(None, api_url=server.url, backoff=0)
+
+
+def test_records_with_unparseable_dates_are_skipped_at_sync(tmp_path):
+    bad = [dict(RECORDS[0], arrival_date="NA"), dict(RECORDS[1], arrival_date=""),
+           dict(RECORDS[2], arrival_date=date.today().isoformat())]
+    with StubMandiServer(bad + RECORDS[3:100]) as server, MandiStore(str(tmp_path / "mandi.db")) as store:
+        result = store.sync(client(server), page_size=50)
+        assert (result["fetched"], result["skipped"]) == (100, 2)
+        assert result["first_arrival_date"] <= result["last_arrival_date"] == date.today().isoformat()
+        rows = MandiQuery(store).records()
+        assert len(rows) == 98
+        assert all(to_api_record(r)["arrival_date"].count("/") == 2 for r in rows)
+
+
+def test_stores_with_bad_dates_are_cleaned_on_open(tmp_path):
+    path = str(tmp_path / "mandi.db")
+    with StubMandiServer(RECORDS[:50]) as server, MandiStore(path) as store:
+        store.sync(client(server), page_size=50)
+    with sqlite3.connect(path) as conn:  # as left behind by a sync before dates were validated
+        conn.execute("UPDATE prices SET arrival_date = '17-10-2026' WHERE market = ?", (RECORDS[0]["market"],))
+        conn.execute("PRAGMA user_version = 0")
+    with MandiStore(path) as store:
+        assert len(MandiQuery(store).records()) == 49
+
+
+def test_uncovered_query_with_dates_fetches_only_those_days(tmp_path):
+    with StubMandiServer(RECORDS) as server, MandiStore(str(tmp_path / "mandi.db")) as store:
+        query = MandiQuery(store, client(server))
+        days = [date.today() - timedelta(days=n) for n in (0, 1)]
+        yesterday = days[1].isoformat()
+        rows = query.records(date_from=yesterday, commodity="Wheat")
+        assert query.last_plan["sync"] is None and query.last_plan["days"] == [d.isoformat() for d in days]
+        wanted = {d.strftime("%d/%m/%Y") for d in days}
+        expected = [r for r in RECORDS if r["commodity"] == "Wheat" and r["arrival_date"] in wanted]
+        assert sorted(map(to_api_record, rows), key=sorted_items) == sorted(expected, key=sorted_items)
+        assert query.last_plan["remote_records"] == len(expected)
+        assert store.state({"commodity": "Wheat"}) is None  # no full pull happened
+
+        requests = server.requests
+        query.records(date_from=yesterday, commodity="Wheat")
+        assert server.requests == requests  # the days are remembered
+
+
+def test_first_lookup_answers_remotely_while_the_sync_runs_in_background(tmp_path):
+    with StubMandiServer(RECORDS, latency_ms=20) as server:
+        api = mandi.MandiPriceAPI(None, api_url=server.url, backoff=0, local_db=str(tmp_path / "mandi.db"),
+                                  cache=HTTPCache(default_ttl=0))
+        first = api.get_commodity_by_name("Wheat", limit=5)
+        assert api.local.last_plan["pending"] and len(first) == 5
+
+        deadline = time.monotonic() + 30
+        while api.local.syncing() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert api.local.sync_error is None and not api.local.syncing()
+        requests = server.requests
+        local = api.get_commodity_by_name("Wheat", limit=5)
+        assert not api.local.last_plan["pending"] and server.requests == requests
+        assert len(local) == 5 and all(r["commodity"] == "Wheat" for r in local)
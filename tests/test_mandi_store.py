@@ -0,0 +1,70 @@
+# tests/test_mandi_store.py
+import pytest
+
+pytest.importorskip("pandas")
+
+from mandi_store import MandiStore  # noqa: E402
+from mandi_stub import StubMandiServer, load_mandi_module, synthetic_records  # noqa: E402
+
+mandi = load_mandi_module()
+RECORDS = synthetic_records(2500)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def client(server, stop_after=None):
+    # stop_after: raise once that many records have been handed to the sync, like a killed process
+    api = mandi.MandiPriceAPI(None, api_url=server.url, backoff=0)
+    if stop_after is not None:
+        pages = api.iter_all_records
+
+        def interrupted(*args, **kwargs):
+            for i, record in enumerate(pages(*args, **kwargs)):
+                if i == stop_after:
+                    raise Interrupted()
+                yield record
+        api.iter_all_records = interrupted
+    return api
+
+
+def rows(store):
+    return store.conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+
+
+def test_interrupted_sync_resumes_from_the_last_checkpoint(tmp_path):
+    with StubMandiServer(RECORDS) as server, MandiStore(str(tmp_path / "mandi.db")) as store:
+        with pytest.raises(Interrupted):
+            store.sync(client(server, stop_after=1700), page_size=500, batch_size=600)
+        assert store.state()["next_offset"] == 1200  # two committed batches
+        assert rows(store) == 1200
+
+        server.requests = 0
+        result = store.sync(client(server), page_size=500, batch_size=600)
+        assert (result["mode"], result["offset"], result["fetched"], result["total"]) == ("incremental", 1200, 1300, 2500)
+        assert server.requests == 1 + 3  # anchor probe, then offsets 1200, 1700, 2200
+        assert rows(store) == 2500
+        assert store.state()["next_offset"] == 2500
+
+
+def test_repeat_sync_costs_one_request_and_growth_fetches_only_new_records(tmp_path):
+    with StubMandiServer(RECORDS[:2000]) as server, MandiStore(str(tmp_path / "mandi.db")) as store:
+        assert store.sync(client(server), page_size=500)["mode"] == "full"
+        server.requests = 0
+        assert store.sync(client(server), page_size=500)["mode"] == "up to date"
+        assert server.requests == 1
+
+        server.records = RECORDS
+        result = store.sync(client(server), page_size=500)
+        assert (result["mode"], result["fetched"]) == ("incremental", 500)
+        assert rows(store) == 2500
+
+
+def test_rotated_source_is_pulled_again_in_full(tmp_path):
+    with StubMandiServer(RECORDS[:2000]) as server, MandiStore(str(tmp_path / "mandi.db")) as store:
+        store.sync(client(server), page_size=500)
+        server.records = RECORDS[500:]
+        result = store.sync(client(server), page_size=500)
+        assert (result["mode"], result["fetched"], result["written"]) == ("full", 2000, 500)
+        assert rows(store) == 2500  # records that left the source stay in the store
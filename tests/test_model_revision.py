@@ -0,0 +1,24 @@
+# tests/test_model_revision.py
+import json
+
+import inference_backends
+from model_registry import MODEL_ID
+
+
+def test_model_dir_without_manifest_is_keyed_on_its_files(tmp_path, monkeypatch):
+    weights = tmp_path / "model.safetensors"
+    weights.write_bytes(b"v1")
+    (tmp_path / "config.json").write_text("{}")
+    monkeypatch.setenv("MODEL_DIR", str(tmp_path))
+    first = inference_backends._model_revision(MODEL_ID, None)
+    assert first.startswith(f"{MODEL_ID}@files-")
+    assert inference_backends._model_revision(MODEL_ID, None) == first
+
+    weights.write_bytes(b"v2-retrained")
+    assert inference_backends._model_revision(MODEL_ID, None) != first
+
+
+def test_manifest_revision_wins(tmp_path, monkeypatch):
+    (tmp_path / "manifest.json").write_text(json.dumps({"model_id": MODEL_ID, "commit": "abc123", "version": "v"}))
+    monkeypatch.setenv("MODEL_DIR", str(tmp_path))
+    assert inference_backends._model_revision(MODEL_ID, None) == f"{MODEL_ID}@abc123"
@@ -0,0 +1,31 @@
+# tests/test_prediction_cache.py
+import sqlite3
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def test_disk_tier_is_capped_on_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(prediction_cache, "PURGE_EVERY", 10)
+    path = str(tmp_path / "predictions.db")
+    cache = PredictionCache("rev", disk_path=path, max_disk_entries=25)
+    for i in range(100):
+        cache.put(f"k{i}", {"label": i})
+    assert disk_rows(path) <= 25 + 10
+    assert cache.stats()["disk_purged"] >= 100 - 35
+    fresh = PredictionCache("rev", disk_path=path, max_disk_entries=25)
+    assert fresh.get("k99") == {"label": 99} and fresh.get("k0") is None  # newest kept, oldest dropped
+
+
+def test_expired_rows_are_deleted_on_open(tmp_path):
+    path = str(tmp_path / "predictions.db")
+    PredictionCache("rev", disk_path=path).put("old", {"label": "x"})
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE predictions SET created_at = created_at - 7200")
+    PredictionCache("rev", disk_path=path, ttl_seconds=3600)
+    assert disk_rows(path) == 0
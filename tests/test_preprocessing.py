@@ -0,0 +1,47 @@
+# tests/test_preprocessing.py
+import io
+
+import numpy as np
+import pytest
+
+transformers = pytest.importorskip("transformers")
+from PIL import Image  # noqa: E402
+
+import inference_backends  # noqa: E402
+from preprocessing import PreprocessPool  # noqa: E402
+
+
+@pytest.fixture
+def processor(tmp_path):
+    # A ViT processor saved to disk, loaded back the way every backend loads it
+    transformers.ViTImageProcessor(size={"height": 32, "width": 32}).save_pretrained(tmp_path)
+    return inference_backends._load_processor(str(tmp_path))
+
+
+def jpeg(size=(64, 48)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (120, 200, 40)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_pool_returns_numpy_pixel_values(processor):
+    with PreprocessPool(processor, workers=2) as pool:
+        pixel_values, stage = pool.submit(jpeg()).result(timeout=30)
+    assert isinstance(pixel_values, np.ndarray)
+    assert pixel_values.shape == (3, 32, 32)
+    assert set(stage) == {"decode", "preprocess"}
+
+
+def test_warm_up_runs_the_processor(processor):
+    class Backend:
+        def __init__(self):
+            self.processor = processor
+            self.seen = []
+
+        def logits(self, pixel_values):
+            self.seen.append(pixel_values.shape)
+            return np.zeros((len(pixel_values), 2), dtype=np.float32)
+
+    backend = Backend()
+    inference_backends.warm_up(backend, batch_sizes=(1, 4))
+    assert backend.seen == [(1, 3, 32, 32), (4, 3, 32, 32)]
@@ -1,6 +1,7 @@
 # weatherapitest.py
 import os
-import requests
+
+from http_cache import shared_cache
 
 # Optional: load from .env if you prefer that workflow
 try:
@@ -11,14 +12,17 @@ except Exception:
 
 API_KEY = os.getenv("6998c995bdc891add712737369e24063")
 BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+# Conditions change every few minutes and OpenWeather refreshes them about every 10
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
 
 def get_current_weather_by_city(city: str, units: str = "metric", lang: str = "en"):
     if not API_KEY:
         raise RuntimeError("OPENWEATHER_API_KEY is not set")
-    params = {"q": city, "appid": API_KEY, "units": units, "lang": lang}
+    # City names are case-insensitive upstream; normalising them lets "London" and "london " share a cache entry
+    params = {"q": city.strip().lower(), "appid": API_KEY, "units": units, "lang": lang}
     # Optional: print the final URL once for debugging
     # print("Requesting:", requests.Request("GET", BASE_URL, params=params).prepare().url)
-    r = requests.get(BASE_URL, params=params, timeout=15)
+    r = shared_cache().get(BASE_URL, params=params, ttl=WEATHER_CACHE_TTL, timeout=15)
     if r.status_code == 401:
         raise RuntimeError(f"401 Unauthorized from OpenWeather. Response: {r.text}")
     r.raise_for_status()
@@ -0,0 +1,47 @@
+# wsgi.py
+"""
+Production entry point for the KrishiSevak app (chatbot+imagedetection_ui.py).
+
+    waitress-serve --threads 16 --port 8000 wsgi:app                   # Windows or Linux
+    gunicorn -c gunicorn.conf.py wsgi:app                               # Linux, pre-forked workers
+    uvicorn asgi:app --port 8000                                        # ASGI, see asgi.py
+    python wsgi.py                                                      # waitress if installed, else Flask's threaded server
+
+One process holds one model. Request threads never run the model themselves: /predict
+hands decoding to the preprocess pool and the forward pass to the micro-batcher's worker
+thread (a bounded queue, 503 when full), then waits on a future, so chat requests are never
+stuck behind inference. Every thread shares the same loaded backend; nothing is copied per
+thread. Scale request concurrency with threads first; for more processes use
+gunicorn.conf.py, whose workers inherit one model loaded in the master instead of each
+loading a copy.
+
+Load test a running server with benchmarks/load_test.py.
+"""
+import os
+
+from script_loader import load_script
+
+APP_FILE = "chatbot+imagedetection_ui.py"
+MODULE_NAME = "krishisevak_app"
+
+
+def load_app_module():
+    # The app file name is not importable ("+"), so load it by path, once per process
+    return load_script(APP_FILE, MODULE_NAME)
+
+
+app = load_app_module().app
+
+
+if __name__ == "__main__":
+    host = os.environ.get("HOST", "127.0.0.1")
+    port = int(os.environ.get("PORT", "8000"))
+    threads = int(os.environ.get("SERVER_THREADS", "16"))
+    try:
+        from waitress import serve
+    except ImportError:
+        print(f"waitress not installed; using Flask's threaded server on http://{host}:{port}")
+        app.run(host=host, port=port, threaded=True, debug=False)
+    else:
+        print(f"Serving with waitress on http://{host}:{port} ({threads} threads)")
+        serve(app, host=host, port=port, threads=threads)